@@ -0,0 +1,72 @@
+"""
+Nabeeh runtime settings.
+Read from NABEEH_* environment variables (or a .env file).
+"""
+from typing import Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="NABEEH_", env_file=".env", extra="ignore")
+
+    # Where events live between restarts: "memory" (seed data only), "sqlite",
+    # or "generated" (synthetic load-testing data, see app.data.generator)
+    storage_backend: Literal["memory", "sqlite", "generated"] = "memory"
+    sqlite_path: str = "nabeeh.db"
+    # Days of events the sqlite backend loads into memory (0 = all). Older ones
+    # stay on disk: whole hours come from the rollup, and row reads reaching
+    # past the loaded days (edge hours, distinct inspectors, listings) query
+    # SQLite. Above the longest rolling window (30 days) those stay in memory
+    sqlite_resident_days: int = 0
+    generator_ports: int = 12
+    generator_days: int = 30
+    generator_scale: float = 1.0
+    generator_seed: int = 42
+    generator_workers: int = 1
+
+    # Binary snapshot mapped at start-up and rewritten at shutdown (unset = off)
+    snapshot_path: Optional[str] = None
+
+    # Analytics response cache
+    cache_max_entries: int = 512
+    cache_ttl_seconds: float = 60.0
+
+    # Rolling windows (?window=24h|7d|30d): "now" is snapped down to this
+    window_granularity_seconds: int = 60
+
+    # POST /api/events:batch: largest batch accepted in one request
+    ingest_max_batch: int = 50_000
+
+    # POST /api/events:stream: events per queued chunk, queue depth in chunks,
+    # and the longest NDJSON line accepted
+    ingest_chunk_size: int = 1000
+    ingest_queue_chunks: int = 8
+    ingest_max_line_bytes: int = 65_536
+
+    # GET /api/export: events read and encoded per streamed chunk
+    export_chunk_rows: int = 10_000
+
+    # GET /api/live: how often new versions are checked for, messages a slow
+    # subscriber may fall behind before it is disconnected, and the keep-alive
+    # interval for idle streams
+    live_poll_seconds: float = 1.0
+    live_queue_messages: int = 32
+    live_heartbeat_seconds: float = 15.0
+
+    # Share one mapped copy of the store between worker processes through this
+    # directory (unset = each process loads its own, see app.data.shared): how
+    # often the writer publishes new versions and readers look for them, and
+    # how long a reader waits at start-up for the writer's first snapshot
+    shared_dir: Optional[str] = None
+    shared_publish_seconds: float = 1.0
+    shared_attach_timeout_seconds: float = 120.0
+
+    # Analytics responses expected to read at least offload_min_rows event rows
+    # are computed in a pool of offload_workers processes attached to the
+    # shared store (needs shared_dir; 0 workers = always inline)
+    offload_workers: int = 0
+    offload_min_rows: int = 500_000
+
+
+settings = Settings()
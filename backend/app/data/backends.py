@@ -0,0 +1,513 @@
+"""
+Storage backends for the Nabeeh store.
+A backend is where ports, inspectors and events live between restarts;
+the store keeps its columnar working set and hourly rollup in memory and
+writes every accepted batch through to the backend first.
+
+- MemoryBackend: nothing is persisted; data is regenerated from seed.py.
+- SQLiteBackend: a WAL-mode SQLite file, seeded on first open. The
+  hourly rollup is computed with GROUP BY in SQL rather than from rows,
+  so it covers all history even when only the last `resident_days` are
+  loaded; older rows are read through the covering indexes on demand.
+  Several processes may write to one file (see app.data.shared).
+- GeneratedBackend: synthetic data at load-testing scale (app.data.generator),
+  bulk-loaded as columns.
+"""
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.data.columns import EventRecord, EventTable, from_epoch_us, to_epoch_us
+from app.data.generator import DAY_US, PortBatch, generate_ports, generate_range, load_batches
+from app.data.rollup import HOUR_US, CellTotals, group_cells, pack_cells
+from app.data.seed import seed_all
+from app.models import Inspector, Port
+
+
+class StorageBackend:
+    """Durable home of the store's data."""
+
+    name = "base"
+    # Whether data survives a restart (a snapshot then only needs the tail since it was taken)
+    durable = False
+    # (before_ts, position): after load_into, stored rows older than before_ts up to
+    # `position` that it left on disk, read with load_history; None when it loaded all
+    history_bounds: Optional[Tuple[int, int]] = None
+
+    def load_entities(self) -> Tuple[List[Port], List[Inspector]]:
+        raise NotImplementedError
+
+    def load_events(self, batch_size: int = 50_000, after: int = 0) -> Iterator[List[EventRecord]]:
+        """Stored events past position `after`, in batches."""
+        raise NotImplementedError
+
+    def load_into(self, events: EventTable) -> None:
+        """Bulk-load what is stored (everything unless history_bounds says otherwise) into an empty table."""
+        for batch in self.load_events():
+            events.append(batch)
+
+    def load_history(
+        self,
+        from_us: int,
+        to_us: int,
+        bounds: Tuple[int, int],
+        batch_size: int = 50_000,
+        **values: Optional[str],
+    ) -> Iterator[List[EventRecord]]:
+        """
+        Rows in [from_us, to_us] of those `bounds` left on disk, in time
+        order and batches, matching the given port_id / inspector_id / type /
+        severity values. Safe to call from any thread.
+        """
+        raise NotImplementedError
+
+    def position(self) -> int:
+        """Monotonic marker of how much has been stored (for snapshots)."""
+        return 0
+
+    def load_tail(self, after: int) -> Tuple[List[EventRecord], int]:
+        """Events stored past position `after` (possibly by other processes) and the position they reach."""
+        return [], after
+
+    @contextmanager
+    def consistent(self) -> Iterator[None]:
+        """Reads made inside see one state of the backend while other processes write."""
+        yield
+
+    def save(self, events: List[EventRecord], inspectors: List[Inspector]) -> List[EventRecord]:
+        """
+        Persist a batch of events and any newly registered inspectors
+        atomically. Returns the events stored: backends that can tell leave
+        out ids they already hold (a retried batch).
+        """
+        raise NotImplementedError
+
+    def _unseen(self, events: List[EventRecord], saved: Set[str]) -> List[EventRecord]:
+        """
+        For backends that keep nothing to query: the events of a batch that
+        were neither loaded (see `_loaded`) nor in `saved`, which takes their ids.
+        """
+        new = [e for e in events if e.id not in saved and not self._loaded(e.id)]
+        saved.update(e.id for e in new)
+        return new
+
+    def _loaded(self, event_id: str) -> bool:
+        """Whether `event_id` is one of the events load_events yields."""
+        return False
+
+    def hourly_cells(
+        self,
+        events: EventTable,
+        type_weights: Dict[str, float],
+        severity_multipliers: Dict[str, float],
+    ) -> Optional[Iterator[Tuple[int, CellTotals]]]:
+        """
+        Per-hour cell totals computed by the backend, coded with `events`'
+        dictionaries; None when the rollup should be built from rows instead.
+        """
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StorageBackend):
+    """Seed data only; writes are kept in memory and lost on restart."""
+
+    name = "memory"
+
+    def __init__(self, days_back: int = 30, seed_value: int = 42):
+        self.days_back = days_back
+        self.seed_value = seed_value
+        self._seed = None
+        self._seed_ids: Optional[Set[str]] = None
+        # Ids of the events saved since start, so a retried batch is not added twice
+        self._saved: Set[str] = set()
+
+    def _seeded(self):
+        if self._seed is None:
+            ports, inspectors, events = seed_all(self.days_back, self.seed_value)
+            self._seed = ports, inspectors, [EventRecord.from_event(e) for e in events]
+        return self._seed
+
+    def load_entities(self) -> Tuple[List[Port], List[Inspector]]:
+        ports, inspectors, _ = self._seeded()
+        return ports, inspectors
+
+    def load_events(self, batch_size: int = 50_000, after: int = 0) -> Iterator[List[EventRecord]]:
+        events = self._seeded()[2]
+        for start in range(0, len(events), batch_size):
+            yield events[start:start + batch_size]
+
+    def save(self, events: List[EventRecord], inspectors: List[Inspector]) -> List[EventRecord]:
+        return self._unseen(events, self._saved)
+
+    def _loaded(self, event_id: str) -> bool:
+        if self._seed_ids is None:
+            self._seed_ids = {e.id for e in self._seeded()[2]}
+        return event_id in self._seed_ids
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ports (
+    id TEXT PRIMARY KEY,
+    name_ar TEXT NOT NULL,
+    name_en TEXT NOT NULL,
+    country TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inspectors (
+    id TEXT PRIMARY KEY,
+    port_id TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT NOT NULL UNIQUE,
+    port_id TEXT NOT NULL,
+    inspector_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    short_description TEXT
+);
+-- Covering indexes: time-window scans and per-port / per-inspector
+-- lookups are answered from the index without touching the table
+CREATE INDEX IF NOT EXISTS ix_events_ts
+    ON events (ts, port_id, type, severity, confidence);
+CREATE INDEX IF NOT EXISTS ix_events_port_ts
+    ON events (port_id, ts, type, severity, confidence, inspector_id);
+CREATE INDEX IF NOT EXISTS ix_events_inspector_ts
+    ON events (inspector_id, ts, port_id, type, severity, confidence);
+"""
+
+# Files created before event ids were unique keep their first copy of each id
+_UNIQUE_IDS = """
+DELETE FROM events WHERE rowid NOT IN (SELECT MIN(rowid) FROM events GROUP BY id);
+CREATE UNIQUE INDEX ux_events_id ON events (id);
+"""
+
+_EVENT_COLUMNS = "id, port_id, inspector_id, ts, source, type, severity, confidence, short_description"
+
+# Covering index that serves load_history when this column is constrained
+_HISTORY_INDEXES = {"port_id": "ix_events_port_ts", "inspector_id": "ix_events_inspector_ts"}
+
+# Bound parameters per statement (SQLite's default limit before 3.32 is 999)
+_MAX_PARAMS = 900
+
+# Contributions are weight * multiplier * confidence, as in app.services.risk;
+# weights arrive as temp tables so the sum runs inside SQLite
+_HOURLY_CELLS = f"""
+SELECT e.ts / {HOUR_US} AS hour, e.port_id, e.type, e.severity,
+       COUNT(*), SUM(COALESCE(w.weight, 1.0) * COALESCE(m.multiplier, 0.3) * ROUND(e.confidence, 6)), MAX(e.ts)
+FROM events AS e INDEXED BY ix_events_ts
+LEFT JOIN temp.type_weights AS w ON w.type = e.type
+LEFT JOIN temp.severity_multipliers AS m ON m.severity = e.severity
+GROUP BY hour, e.port_id, e.type, e.severity
+ORDER BY hour
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Events, ports and inspectors in one SQLite file (WAL journal).
+    Each saved batch is one transaction with executemany inserts; event
+    ids are unique, and ids already stored are skipped.
+    Writers are serialized by the store, so one connection is shared.
+    """
+
+    name = "sqlite"
+    durable = True
+
+    def __init__(self, path: str, days_back: int = 30, seed_value: int = 42, resident_days: int = 0):
+        self.path = path
+        # Days of events load_into loads (0 = all); older ones stay on disk
+        self.resident_days = resident_days
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # One write transaction, so of several processes opening a new file only one seeds it
+        with self._transaction(immediate=True):
+            if not self._has_unique_ids():
+                for statement in _UNIQUE_IDS.strip().split(";\n"):
+                    self._conn.execute(statement)
+            if not self._conn.execute("SELECT 1 FROM ports LIMIT 1").fetchone():
+                ports, inspectors, events = seed_all(days_back, seed_value)
+                self._save_ports(ports)
+                self.save([EventRecord.from_event(e) for e in events], inspectors)
+
+    def _has_unique_ids(self) -> bool:
+        for _, name, unique, *_ in self._conn.execute("PRAGMA index_list(events)"):
+            if unique and [r[2] for r in self._conn.execute(f"PRAGMA index_info({name})")] == ["id"]:
+                return True
+        return False
+
+    def _save_ports(self, ports: List[Port]) -> None:
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT INTO ports VALUES (?, ?, ?, ?, ?, ?)",
+                [(p.id, p.name_ar, p.name_en, p.country, p.lat, p.lng) for p in ports],
+            )
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False):
+        """
+        BEGIN ... COMMIT, rolled back on error (the connection itself is in
+        autocommit mode). `immediate` takes the write lock up front, so what
+        is read inside cannot change before the writes that depend on it.
+        """
+        if self._conn.in_transaction:
+            # Nested in an open transaction (see consistent): it commits or rolls back the lot
+            yield
+            return
+        self._conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def load_entities(self) -> Tuple[List[Port], List[Inspector]]:
+        ports = [
+            Port(id=r[0], name_ar=r[1], name_en=r[2], country=r[3], lat=r[4], lng=r[5])
+            for r in self._conn.execute("SELECT id, name_ar, name_en, country, lat, lng FROM ports ORDER BY rowid")
+        ]
+        inspectors = [
+            Inspector(id=r[0], port_id=r[1], created_at=from_epoch_us(r[2]))
+            for r in self._conn.execute("SELECT id, port_id, created_at FROM inspectors ORDER BY rowid")
+        ]
+        return ports, inspectors
+
+    def load_events(self, batch_size: int = 50_000, after: int = 0) -> Iterator[List[EventRecord]]:
+        cursor = self._conn.execute(f"SELECT {_EVENT_COLUMNS} FROM events WHERE rowid > ? ORDER BY rowid", (after,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [EventRecord(*r) for r in rows]
+
+    def load_into(self, events: EventTable) -> None:
+        if not self.resident_days:
+            return super().load_into(events)
+        before = to_epoch_us(datetime.now(timezone.utc)) - self.resident_days * DAY_US
+        position = self.position()
+        # Values of the rows left on disk get codes now, so reading them later only looks codes up
+        for column, dictionary in (
+            ("port_id", events.ports), ("inspector_id", events.inspectors),
+            ("type", events.types), ("short_description", events.descriptions),
+        ):
+            for (value,) in self._conn.execute(
+                f"SELECT DISTINCT {column} FROM events WHERE ts < ? AND rowid <= ?", (before, position)
+            ):
+                if value is not None:
+                    dictionary.encode(value)
+        cursor = self._conn.execute(
+            f"SELECT {_EVENT_COLUMNS} FROM events INDEXED BY ix_events_ts WHERE ts >= ? AND rowid <= ? ORDER BY ts",
+            (before, position),
+        )
+        while True:
+            rows = cursor.fetchmany(50_000)
+            if not rows:
+                break
+            events.append([EventRecord(*r) for r in rows])
+        self.history_bounds = (before, position)
+
+    def load_history(
+        self,
+        from_us: int,
+        to_us: int,
+        bounds: Tuple[int, int],
+        batch_size: int = 50_000,
+        **values: Optional[str],
+    ) -> Iterator[List[EventRecord]]:
+        before, position = bounds
+        criteria = {column: value for column, value in values.items() if value is not None}
+        # A port or inspector narrows the scan to its slice of the matching covering index
+        index = next((_HISTORY_INDEXES[c] for c in ("port_id", "inspector_id") if c in criteria), "ix_events_ts")
+        where = " ".join(f"AND {column} = ?" for column in criteria)
+        # Its own connection: requests read while the store writes through the shared one
+        with closing(sqlite3.connect(self.path)) as conn:
+            cursor = conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM events INDEXED BY {index}"
+                f" WHERE ts >= ? AND ts <= ? AND rowid <= ? {where} ORDER BY ts",
+                (from_us, min(to_us, before - 1), position, *criteria.values()),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [EventRecord(*r) for r in rows]
+
+    def position(self) -> int:
+        """Largest event rowid (rows are only ever appended)."""
+        return self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM events").fetchone()[0]
+
+    def load_tail(self, after: int) -> Tuple[List[EventRecord], int]:
+        # Bounded by the position read first, so rows committed meanwhile wait for the next call
+        position = self.position()
+        rows = self._conn.execute(
+            f"SELECT {_EVENT_COLUMNS} FROM events WHERE rowid > ? AND rowid <= ? ORDER BY rowid", (after, position)
+        ).fetchall()
+        return [EventRecord(*r) for r in rows], position
+
+    @contextmanager
+    def consistent(self) -> Iterator[None]:
+        # One read transaction: in WAL mode it sees a fixed snapshot and does not block writers
+        with self._transaction():
+            yield
+
+    def save(self, events: List[EventRecord], inspectors: List[Inspector]) -> List[EventRecord]:
+        with self._transaction(immediate=True):
+            stored = set()
+            ids = [e.id for e in events]
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                stored.update(r[0] for r in self._conn.execute(
+                    f"SELECT id FROM events WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+            events = [e for e in events if e.id not in stored]
+            if inspectors:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO inspectors VALUES (?, ?, ?)",
+                    [(i.id, i.port_id, to_epoch_us(i.created_at)) for i in inspectors],
+                )
+            self._conn.executemany(
+                f"INSERT INTO events ({_EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (e.id, e.port_id, e.inspector_id, e.ts, e.source, e.type, e.severity, e.confidence, e.short_description)
+                    for e in events
+                ],
+            )
+        return events
+
+    def hourly_cells(
+        self,
+        events: EventTable,
+        type_weights: Dict[str, float],
+        severity_multipliers: Dict[str, float],
+    ) -> Iterator[Tuple[int, CellTotals]]:
+        conn = self._conn
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS type_weights (type TEXT PRIMARY KEY, weight REAL)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS severity_multipliers (severity TEXT PRIMARY KEY, multiplier REAL)")
+        with self._transaction():
+            conn.execute("DELETE FROM temp.type_weights")
+            conn.execute("DELETE FROM temp.severity_multipliers")
+            conn.executemany("INSERT INTO temp.type_weights VALUES (?, ?)", type_weights.items())
+            conn.executemany("INSERT INTO temp.severity_multipliers VALUES (?, ?)", severity_multipliers.items())
+            rows = conn.execute(_HOURLY_CELLS).fetchall()
+
+        for hour, group in groupby(rows, key=lambda r: r[0]):
+            group = list(group)
+            port = events.ports.encode_many([r[1] for r in group], np.int32)
+            type_ = events.types.encode_many([r[2] for r in group], np.int16)
+            severity = events.severities.encode_many([r[3] for r in group], np.int8)
+            yield hour, group_cells(
+                pack_cells(port, type_, severity),
+                np.array([r[4] for r in group], dtype=np.int64),
+                np.array([r[5] for r in group], dtype=np.float64),
+                np.array([r[6] for r in group], dtype=np.int64),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class GeneratedBackend(StorageBackend):
+    """
+    Synthetic data at configurable scale; nothing is persisted.
+    With workers > 1 ports are generated in a process pool.
+    """
+
+    name = "generated"
+
+    def __init__(
+        self,
+        n_ports: int = 12,
+        days: int = 30,
+        scale: float = 1.0,
+        seed: int = 42,
+        workers: int = 1,
+        end: Optional[datetime] = None,
+    ):
+        self.n_ports = n_ports
+        self.days = days
+        self.scale = scale
+        self.seed = seed
+        self.workers = workers
+        self.end_us = to_epoch_us(end or datetime.now(timezone.utc))
+        self.ports = generate_ports(n_ports)
+        self._batches: Optional[List[PortBatch]] = None
+        # Ids of the events saved since start, so a retried batch is not added twice
+        self._saved: Set[str] = set()
+
+    def _generate(self) -> List[PortBatch]:
+        if self._batches is None:
+            indexes = list(range(self.n_ports))
+            if self.workers <= 1:
+                self._batches = generate_range(self.seed, indexes, self.days, self.end_us, self.scale)
+            else:
+                chunks = [indexes[w::self.workers] for w in range(self.workers)]
+                with ProcessPoolExecutor(self.workers) as pool:
+                    results = pool.map(
+                        generate_range,
+                        [self.seed] * len(chunks), chunks, [self.days] * len(chunks),
+                        [self.end_us] * len(chunks), [self.scale] * len(chunks),
+                    )
+                    self._batches = sorted((b for part in results for b in part), key=lambda b: b.index)
+        return self._batches
+
+    def load_entities(self) -> Tuple[List[Port], List[Inspector]]:
+        inspectors = [
+            Inspector(id=inspector_id, port_id=self.ports[b.index].id, created_at=from_epoch_us(created))
+            for b in self._generate()
+            for inspector_id, created in zip(b.inspector_ids, b.inspector_created_us.tolist())
+        ]
+        return list(self.ports), inspectors
+
+    def load_into(self, events: EventTable) -> None:
+        load_batches(events, self.ports, self._generate())
+
+    def load_events(self, batch_size: int = 50_000, after: int = 0) -> Iterator[List[EventRecord]]:
+        table = EventTable()
+        self.load_into(table)
+        for start in range(0, len(table), batch_size):
+            yield table.take(slice(start, start + batch_size)).to_rows()
+
+    def save(self, events: List[EventRecord], inspectors: List[Inspector]) -> List[EventRecord]:
+        return self._unseen(events, self._saved)
+
+    def _loaded(self, event_id: str) -> bool:
+        # Generated ids are "gen_<port index>_<serial>", zero-padded, so each port's are sorted
+        prefix, _, serial = event_id.rpartition("_")
+        if not prefix.startswith("gen_") or not prefix[4:].isdigit() or not serial.isdigit():
+            return False
+        index = int(prefix[4:])
+        if index >= self.n_ports:
+            return False
+        ids = self._generate()[index].ids
+        i = int(np.searchsorted(ids, event_id.encode()))
+        return i < len(ids) and ids[i] == event_id.encode()
+
+
+def create_backend(settings, days_back: int = 30, seed_value: int = 42) -> StorageBackend:
+    """Backend selected by settings.storage_backend."""
+    if settings.storage_backend == "sqlite":
+        return SQLiteBackend(settings.sqlite_path, days_back, seed_value, settings.sqlite_resident_days)
+    if settings.storage_backend == "generated":
+        return GeneratedBackend(
+            n_ports=settings.generator_ports,
+            days=settings.generator_days,
+            scale=settings.generator_scale,
+            seed=settings.generator_seed,
+            workers=settings.generator_workers,
+        )
+    return MemoryBackend(days_back, seed_value)
@@ -0,0 +1,939 @@
+"""
+Columnar event table backing the Nabeeh store.
+Timestamps are int64 microseconds since the Unix epoch (UTC); string
+attributes are dictionary-encoded into small integer codes.
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.models import Event, EventSource, Severity, ViolationType
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+# float32 keeps ~7 significant digits; round back when materializing
+CONFIDENCE_DECIMALS = 6
+
+# Code used for "no value" in nullable dictionary-encoded columns
+NULL_CODE = -1
+
+# Smallest buffer allocated for appendable columns and posting lists
+_MIN_CAPACITY = 1024
+
+# Late rows are merged into the main columns once the late segment holds more
+# than this many rows, or more than 1/_LATE_FRACTION of the main rows
+_LATE_MIN_ROWS = 4096
+_LATE_FRACTION = 32
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """Datetime -> microseconds since epoch. Naive values are taken as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // _ONE_US
+
+
+def from_epoch_us(us: int) -> datetime:
+    """Microseconds since epoch -> tz-aware UTC datetime."""
+    return EPOCH + timedelta(microseconds=int(us))
+
+
+class EventRecord:
+    """
+    Compact internal form of one event: strings interned (so each port,
+    inspector, type and enum value is held once per process), the
+    timestamp as epoch microseconds and enums as their string values.
+    Backends and the store pass these around; Event models are built only
+    at the API boundary.
+    """
+    __slots__ = (
+        "id", "port_id", "inspector_id", "ts", "source", "type", "severity", "confidence", "short_description",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        port_id: str,
+        inspector_id: str,
+        ts: int,
+        source: str,
+        type: str,
+        severity: str,
+        confidence: float,
+        short_description: Optional[str] = None,
+    ):
+        self.id = id
+        self.port_id = sys.intern(port_id)
+        self.inspector_id = sys.intern(inspector_id)
+        self.ts = ts
+        self.source = sys.intern(source)
+        self.type = sys.intern(type)
+        self.severity = sys.intern(severity)
+        self.confidence = confidence
+        self.short_description = short_description
+
+    @classmethod
+    def from_event(cls, event: Event) -> "EventRecord":
+        return cls(
+            event.id,
+            event.port_id,
+            event.inspector_id,
+            to_epoch_us(event.timestamp),
+            event.source.value,
+            event.type,
+            event.severity.value,
+            event.confidence,
+            event.short_description,
+        )
+
+    def to_event(self) -> Event:
+        return Event.model_construct(
+            id=self.id,
+            port_id=self.port_id,
+            inspector_id=self.inspector_id,
+            timestamp=from_epoch_us(self.ts),
+            source=EventSource(self.source),
+            type=self.type,
+            severity=Severity(self.severity),
+            confidence=self.confidence,
+            short_description=self.short_description,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EventRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"EventRecord(id={self.id!r}, port_id={self.port_id!r}, ts={self.ts})"
+
+
+def _extend(buffers: Dict, key, current: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    current + values as a prefix view of buffers[key], growing the buffer
+    geometrically so repeated appends cost O(len(values)) amortized.
+    Rows already in `current` are never written, so earlier views stay valid.
+    """
+    n, k = len(current), len(values)
+    dtype = np.promote_types(current.dtype, values.dtype)  # widens fixed-width byte strings
+    buffer = buffers.get(key)
+    if buffer is None or current.base is not buffer or len(buffer) < n + k or buffer.dtype != dtype:
+        buffer = np.empty(max(n + k, 2 * n, _MIN_CAPACITY), dtype=dtype)
+        buffer[:n] = current
+        buffers[key] = buffer
+    buffer[n:n + k] = values
+    return buffer[:n + k]
+
+
+class Dictionary:
+    """Maps string values to dense integer codes and back."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        # sort_ranks() as of the last call, recomputed once values were added
+        self._ranks = np.zeros(0, dtype=np.int64)
+        for value in values:
+            self.encode(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        """Code for value, assigning a new one if unseen."""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values: List[str], dtype) -> np.ndarray:
+        """Codes for a batch of values, assigning new ones in first-seen order."""
+        codes = self.codes
+        if not codes.keys() >= set(values):
+            for value in values:
+                self.encode(value)
+        return np.fromiter(map(codes.__getitem__, values), dtype=dtype, count=len(values))
+
+    def lookup(self, value: str) -> int:
+        """Code for value, or NULL_CODE if it has never been seen."""
+        return self.codes.get(value, NULL_CODE)
+
+    def lookup_many(self, values: List[Optional[str]], dtype) -> np.ndarray:
+        """Codes for a batch of values without assigning any (unseen values and None give NULL_CODE)."""
+        return np.fromiter((self.codes.get(v, NULL_CODE) for v in values), dtype=dtype, count=len(values))
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
+
+    def sort_ranks(self) -> np.ndarray:
+        """Position of each code's value in the sorted values: orders codes by value, not first-seen order."""
+        ranks = self._ranks
+        n = len(self.values)
+        if len(ranks) != n:
+            ranks = np.empty(n, dtype=np.int64)
+            ranks[np.argsort(np.array(self.values[:n], dtype=str), kind="stable")] = np.arange(n)
+            self._ranks = ranks
+        return ranks
+
+
+def _stable_order(codes: np.ndarray) -> np.ndarray:
+    """Stable argsort of dictionary codes; codes that fit in 16 bits use NumPy's radix sort."""
+    if len(codes) and codes.min() >= 0 and codes.max() <= 0xFFFF:
+        codes = codes.astype(np.uint16)
+    return np.argsort(codes, kind="stable")
+
+
+class PostingIndex:
+    """
+    Dictionary code -> ascending row positions.
+    Rows are time-ordered, so every posting list is time-ordered too.
+    add() only extends lists past their current end, so a reader bounded
+    to an earlier row count can keep using the index while rows are
+    appended; bounded() gives such a reader lists cut at its row count, for
+    the operations that read whole lists. merged() builds a new index
+    instead of renumbering this one.
+    """
+
+    def __init__(self):
+        self.positions: Dict[int, np.ndarray] = {}
+        self._buffers: Dict[int, np.ndarray] = {}
+        # (keys, offsets, rows) not yet split into per-code views; see from_csr()
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        # Index whose lists this one holds cut at row _limit, not yet taken over; see bounded()
+        self._source: Optional["PostingIndex"] = None
+        self._limit = 0
+
+    @classmethod
+    def from_csr(cls, keys: np.ndarray, offsets: np.ndarray, rows: np.ndarray) -> "PostingIndex":
+        """
+        Index over compressed sparse rows: code keys[i] owns
+        rows[offsets[i]:offsets[i + 1]]. Lists are sliced out on first use.
+        """
+        index = cls()
+        index._csr = (keys, offsets, rows)
+        return index
+
+    def bounded(self, limit: int) -> "PostingIndex":
+        """
+        This index as of a table of `limit` rows, while rows keep being added
+        to this one: lists are cut below `limit` on first use, copying nothing.
+        Rows added to the result go to lists of its own.
+        """
+        index = PostingIndex()
+        index._source = self
+        index._limit = limit
+        return index
+
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self._expand()
+        keys = np.array(sorted(self.positions), dtype=np.int64)
+        lists = [self.positions[code] for code in keys.tolist()]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(rows) for rows in lists], out=offsets[1:])
+        rows = np.concatenate(lists) if lists else _NO_ROWS
+        return keys, offsets, rows
+
+    def _lists(self) -> Dict[int, np.ndarray]:
+        """Every list as it stands, expanding nothing, so it is safe beside a writer adding rows."""
+        # Read before the lists: both are cleared only once every list is in place
+        source, csr = self._source, self._csr
+        positions = dict(self.positions)
+        if source is not None:
+            limit = self._limit
+            for code, rows in source._lists().items():
+                if code not in positions:
+                    positions[code] = rows[:int(np.searchsorted(rows, limit))]
+        elif csr is not None:
+            keys, offsets, rows = csr
+            bounds = offsets.tolist()
+            for i, code in enumerate(keys.tolist()):
+                positions.setdefault(code, rows[bounds[i]:bounds[i + 1]])
+        return positions
+
+    def _expand(self) -> None:
+        if self._source is None and self._csr is None:
+            return
+        for code, rows in self._lists().items():
+            self.positions.setdefault(code, rows)
+        # Cleared last: get() falls back to them until every list is in place
+        self._source = None
+        self._csr = None
+
+    def get(self, code: int) -> np.ndarray:
+        source, csr = self._source, self._csr
+        rows = self.positions.get(code)
+        if rows is None and source is not None:
+            rows = source.get(code)
+            rows = self.positions[code] = rows[:int(np.searchsorted(rows, self._limit))]
+        elif rows is None and csr is not None:
+            keys, offsets, all_rows = csr
+            i = int(np.searchsorted(keys, code))
+            if i < len(keys) and keys[i] == code:
+                rows = self.positions[code] = all_rows[offsets[i]:offsets[i + 1]]
+        return _NO_ROWS if rows is None else rows
+
+    def add(self, codes: np.ndarray, positions: np.ndarray) -> None:
+        """Record rows; positions must be ascending and past any existing rows for each code."""
+        self._expand()
+        order = _stable_order(codes)
+        keys, starts = np.unique(codes[order], return_index=True)
+        for code, rows in zip(keys.tolist(), np.split(positions[order], starts[1:])):
+            self.positions[code] = _extend(self._buffers, code, self.positions.get(code, _NO_ROWS), rows)
+
+    def merged(self, at: np.ndarray, codes: np.ndarray) -> "PostingIndex":
+        """
+        Index for the table after np.insert(column, at, new_rows): existing
+        rows shift past the rows inserted before them. This index is left
+        as it was, for readers of the table before the insert.
+        """
+        self._expand()
+        merged = PostingIndex()
+        for code, rows in list(self.positions.items()):
+            merged.positions[code] = rows + np.searchsorted(at, rows, side="right")
+        new_positions = at + np.arange(len(at))
+        order = _stable_order(codes)
+        keys, starts = np.unique(codes[order], return_index=True)
+        for code, rows in zip(keys.tolist(), np.split(new_positions[order], starts[1:])):
+            current = merged.positions.get(code)
+            merged.positions[code] = (
+                rows if current is None else np.sort(np.concatenate([current, rows]), kind="mergesort")
+            )
+        return merged
+
+
+_NO_ROWS = np.empty(0, dtype=np.int64)
+_NO_ROWS.flags.writeable = False
+
+
+class _Positions:
+    """Row positions [start, stop) materialized one slice at a time."""
+    __slots__ = ("start", "stop")
+
+    def __init__(self, start: int, stop: int):
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, part: slice) -> np.ndarray:
+        return np.arange(self.start + part.start, self.start + part.stop)
+
+
+class EventTable:
+    """
+    Events stored column-wise, ordered by timestamp.
+    Subsets produced by take() share the parent's dictionaries,
+    so codes stay comparable between a table and its selections.
+
+    Event ids are UTF-8 in a fixed-width bytes column (widened as longer
+    ids arrive); event_ids() decodes them.
+
+    `contribution` holds each event's risk contribution, computed at
+    ingest by `scorer` and tagged with `contribution_version` (the weight
+    table it was computed under).
+
+    Rows older than the newest row already held (late events), and rows
+    added with append_aside(), do not touch the columns: they go to
+    `late`, a small time-sorted side table with its own indexes. Late
+    events are merged into the main columns in one pass once the side
+    table outgrows a fraction of them. Row queries (select, scan,
+    latest, take, len) see both parts as one time-ordered table, the late
+    rows ordered after main rows with equal timestamps; positions past the
+    main rows address the late ones. The column attributes and `indexes`
+    hold the main rows only; compacted() gives a single-part table.
+    """
+
+    COLUMNS = (
+        "ids", "ts", "port", "inspector", "type", "severity", "source", "confidence", "description", "contribution",
+    )
+    INDEXED = ("port", "inspector", "type")
+    DICTIONARIES = ("ports", "inspectors", "types", "severities", "sources", "descriptions")
+    # Code columns, in DICTIONARIES order
+    CODED = ("port", "inspector", "type", "severity", "source", "description")
+
+    def __init__(self, scorer: Optional[Callable[["EventTable"], np.ndarray]] = None, scorer_version: int = 0):
+        self.ports = Dictionary()
+        self.inspectors = Dictionary()
+        self.types = Dictionary(t.value for t in ViolationType)
+        self.severities = Dictionary(s.value for s in Severity)
+        self.sources = Dictionary(s.value for s in EventSource)
+        self.descriptions = Dictionary()
+
+        self.ids = np.empty(0, dtype="S1")
+        self.ts = np.empty(0, dtype=np.int64)
+        self.port = np.empty(0, dtype=np.int32)
+        self.inspector = np.empty(0, dtype=np.int32)
+        self.type = np.empty(0, dtype=np.int16)
+        self.severity = np.empty(0, dtype=np.int8)
+        self.source = np.empty(0, dtype=np.int8)
+        self.confidence = np.empty(0, dtype=np.float32)
+        self.description = np.empty(0, dtype=np.int32)
+        self.contribution = np.empty(0, dtype=np.float64)
+
+        self.scorer = scorer
+        self.contribution_version = scorer_version if scorer else None
+        self.indexes: Dict[str, PostingIndex] = {name: PostingIndex() for name in self.INDEXED}
+        self._buffers: Dict[str, np.ndarray] = {}
+        # Late rows not yet merged into the columns above; never itself has a late part
+        self.late: Optional[EventTable] = None
+
+    def __len__(self) -> int:
+        return len(self.ts) + (len(self.late.ts) if self.late is not None else 0)
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "EventTable":
+        table = cls()
+        table.append(events)
+        return table
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Dict[str, np.ndarray],
+        dictionaries: Dict[str, List[str]],
+        indexes: Dict[str, PostingIndex],
+        scorer: Optional[Callable[["EventTable"], np.ndarray]] = None,
+        contribution_version: Optional[int] = None,
+    ) -> "EventTable":
+        """Table over existing (e.g. memory-mapped) columns; nothing is copied until rows are added."""
+        table = cls(scorer=scorer)
+        for name in cls.DICTIONARIES:
+            setattr(table, name, Dictionary(dictionaries[name]))
+        for name in cls.COLUMNS:
+            setattr(table, name, columns[name])
+        table.indexes = indexes
+        table.contribution_version = contribution_version
+        return table
+
+    def append(self, events: Iterable[Union[EventRecord, Event]]) -> "EventTable":
+        """
+        Encode records (Event models are converted first) and merge them in,
+        keeping timestamp order. Returns the encoded batch (time-sorted) for
+        downstream maintenance.
+        """
+        events = [e if isinstance(e, EventRecord) else EventRecord.from_event(e) for e in events]
+        if not events:
+            return self.take(slice(0, 0))
+        return self.append_columns(self._encode(events, lookup=False))
+
+    def coded(self, records: List[EventRecord]) -> "EventTable":
+        """
+        Records as a time-sorted table sharing this table's dictionaries,
+        which are only read (values they lack code as NULL_CODE), so it is
+        safe beside a writer. Contributions are left for the caller to score.
+        """
+        table = self.empty()
+        if records:
+            new = self._encode(records, lookup=True)
+            order = np.argsort(new["ts"], kind="stable")
+            new = {name: values[order] for name, values in new.items()}
+            new["contribution"] = np.zeros(len(records), dtype=np.float64)
+            table._merge(new)
+        return table
+
+    def _encode(self, events: List[EventRecord], lookup: bool) -> Dict[str, np.ndarray]:
+        """Columns for records; `lookup` only reads the dictionaries instead of assigning new codes."""
+        def codes(dictionary: Dictionary, values: List[str], dtype) -> np.ndarray:
+            return dictionary.lookup_many(values, dtype) if lookup else dictionary.encode_many(values, dtype)
+
+        descriptions = [e.short_description for e in events]
+        return {
+            "ids": np.array([e.id.encode() for e in events], dtype=bytes),
+            "ts": np.fromiter((e.ts for e in events), dtype=np.int64, count=len(events)),
+            "port": codes(self.ports, [e.port_id for e in events], np.int32),
+            "inspector": codes(self.inspectors, [e.inspector_id for e in events], np.int32),
+            "type": codes(self.types, [e.type for e in events], np.int16),
+            "severity": codes(self.severities, [e.severity for e in events], np.int8),
+            "source": codes(self.sources, [e.source for e in events], np.int8),
+            "confidence": np.fromiter((e.confidence for e in events), dtype=np.float32, count=len(events)),
+            "description": self.descriptions.lookup_many(descriptions, np.int32) if lookup else np.fromiter(
+                (NULL_CODE if d is None else self.descriptions.encode(d) for d in descriptions),
+                dtype=np.int32,
+                count=len(events),
+            ),
+        }
+
+    def append_columns(self, new: Dict[str, np.ndarray]) -> "EventTable":
+        """
+        Bulk path for pre-encoded rows: one array per column, codes taken
+        from this table's dictionaries, any order. `contribution` may be
+        omitted (it is computed by the scorer). Returns the time-sorted batch.
+        """
+        n = len(new["ts"])
+        if not n:
+            return self.take(slice(0, 0))
+        order = np.argsort(new["ts"], kind="stable")
+        new = {name: new[name][order] for name in self.COLUMNS if name in new}
+        new.setdefault("contribution", np.zeros(n, dtype=np.float64))
+        batch = self.take(slice(0, 0))
+        for name in self.COLUMNS:
+            setattr(batch, name, new[name])
+        if self.scorer:
+            batch.contribution = new["contribution"] = self.scorer(batch)
+
+        if not len(self.ts) or new["ts"][0] >= self.ts[-1]:
+            # Common case: events arrive in time order, so this is a plain append
+            self._merge(new)
+            return batch
+        # Rows older than the newest main row go to the late part; the rest append
+        cut = int(np.searchsorted(new["ts"], self.ts[-1], side="left"))
+        if cut < n:
+            self._merge({name: values[cut:] for name, values in new.items()})
+        if self.late is None:
+            self.late = self.empty()
+        self.late._merge({name: values[:cut] for name, values in new.items()})
+        if len(self.late.ts) > max(_LATE_MIN_ROWS, len(self.ts) // _LATE_FRACTION):
+            self.compact()
+        return batch
+
+    def _merge(self, new: Dict[str, np.ndarray]) -> None:
+        """Merge sorted rows into the main columns, keeping timestamp order."""
+        n, k = len(self.ts), len(new["ts"])
+        if not n or new["ts"][0] >= self.ts[-1]:
+            # Appended into preallocated column buffers
+            positions = np.arange(n, n + k, dtype=np.int64)
+            columns = {name: _extend(self._buffers, name, getattr(self, name), new[name]) for name in self.COLUMNS}
+            for name in self.COLUMNS:
+                setattr(self, name, columns[name])
+            for name, index in self.indexes.items():
+                index.add(new[name], positions)
+            return
+
+        # Merged into place (new rows go after existing equal timestamps) in
+        # fresh buffers with room to append into, so views of the old columns stay valid
+        at = np.searchsorted(self.ts, new["ts"], side="right")
+        inserted = at + np.arange(k)
+        kept = np.ones(n + k, dtype=bool)
+        kept[inserted] = False
+        self._buffers = {}
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            dtype = np.promote_types(column.dtype, new[name].dtype)
+            buffer = self._buffers[name] = np.empty(max(2 * (n + k), _MIN_CAPACITY), dtype=dtype)
+            merged = buffer[:n + k]
+            merged[kept] = column
+            merged[inserted] = new[name]
+            setattr(self, name, merged)
+        self.indexes = {name: index.merged(at, new[name]) for name, index in self.indexes.items()}
+
+    def empty(self) -> "EventTable":
+        """An empty, indexed table sharing this one's dictionaries (rows added to it keep their contributions)."""
+        table = self._take_main(slice(0, 0))
+        table.indexes = {name: PostingIndex() for name in self.INDEXED}
+        return table
+
+    def recoded(self) -> "EventTable":
+        """
+        These rows in one part, coded with fresh dictionaries holding only the
+        values they use: self-contained, e.g. to hand to another process.
+        """
+        table = self.compacted()
+        recoded = EventTable()
+        recoded.contribution_version = table.contribution_version
+        columns = {name: getattr(table, name) for name in self.COLUMNS}
+        for column, name in zip(self.CODED, self.DICTIONARIES):
+            codes = columns[column]
+            present = codes != NULL_CODE
+            used, local = np.unique(codes[present], return_inverse=True)
+            values = getattr(table, name).values
+            setattr(recoded, name, Dictionary(values[code] for code in used.tolist()))
+            columns[column] = np.full(len(codes), NULL_CODE, dtype=codes.dtype)
+            columns[column][present] = local
+        recoded._merge(columns)
+        return recoded
+
+    def append_aside(self, rows: "EventTable") -> "EventTable":
+        """
+        Add the time-sorted rows of `rows` (coded with its own dictionaries,
+        e.g. a recoded() table from another process) to the late part
+        whatever their timestamps, and return them coded with this table's
+        dictionaries. The main columns are left untouched, so they can stay
+        mapped from a shared file; nothing is compacted.
+        """
+        new = {name: getattr(rows, name) for name in self.COLUMNS}
+        for column, name in zip(self.CODED, self.DICTIONARIES):
+            dictionary = getattr(self, name)
+            codes = [dictionary.encode(value) for value in getattr(rows, name).values]
+            # NULL_CODE (-1) picks the trailing NULL_CODE
+            new[column] = np.array(codes + [NULL_CODE], dtype=new[column].dtype)[new[column]]
+        if self.late is None:
+            self.late = self.empty()
+        self.late._merge(new)
+        batch = self._take_main(slice(0, 0))
+        for name in self.COLUMNS:
+            setattr(batch, name, new[name])
+        return batch
+
+    def compact(self) -> None:
+        """Merge the late rows into the main columns (one O(rows) pass)."""
+        late, self.late = self.late, None
+        if late is not None and len(late.ts):
+            self._merge({name: getattr(late, name) for name in self.COLUMNS})
+
+    def compacted(self) -> "EventTable":
+        """This table as a single part: itself if nothing is late, else a merged copy."""
+        if self.late is None or not len(self.late.ts):
+            return self
+        table = self._take_main(slice(0, len(self.ts)))
+        table.scorer = self.scorer
+        table.indexes = {name: index.bounded(len(self.ts)) for name, index in self.indexes.items()}
+        table._merge({name: getattr(self.late, name) for name in self.COLUMNS})
+        return table
+
+    def rescore(self, scorer: Callable[["EventTable"], np.ndarray], version: int) -> None:
+        """Rebuild the contribution column in bulk under a new weight table."""
+        self.scorer = scorer
+        self.contribution = scorer(self)
+        self.contribution_version = version
+        if self.late is not None:
+            self.late.rescore(scorer, version)
+
+    def time_range(self, from_us: Optional[int] = None, to_us: Optional[int] = None) -> slice:
+        """Bisect the sorted timestamps: main rows with from_us <= ts <= to_us."""
+        start = 0 if from_us is None else int(np.searchsorted(self.ts, from_us, side="left"))
+        stop = len(self.ts) if to_us is None else int(np.searchsorted(self.ts, to_us, side="right"))
+        return slice(start, max(start, stop))
+
+    def take(self, idx) -> "EventTable":
+        """Subset by boolean mask, index array or slice (over main then late rows)."""
+        if self.late is None or not len(self.late.ts):
+            return self._take_main(idx)
+        if not (isinstance(idx, np.ndarray) and idx.dtype.kind in "iu"):
+            idx = np.arange(len(self))[idx]
+        n = len(self.ts)
+        main = idx < n
+        subset = self._take_main(idx[main])
+        late = self.late._take_main(idx[~main] - n)
+        for name in self.COLUMNS:
+            column, late_column = getattr(subset, name), getattr(late, name)
+            values = np.empty(len(idx), dtype=np.promote_types(column.dtype, late_column.dtype))
+            values[main] = column
+            values[~main] = late_column
+            setattr(subset, name, values)
+        return subset
+
+    def _take_main(self, idx) -> "EventTable":
+        subset = object.__new__(EventTable)
+        subset.ports = self.ports
+        subset.inspectors = self.inspectors
+        subset.types = self.types
+        subset.severities = self.severities
+        subset.sources = self.sources
+        subset.descriptions = self.descriptions
+        subset.scorer = None
+        subset.contribution_version = self.contribution_version
+        subset.indexes = {}
+        subset._buffers = {}
+        subset.late = None
+        for name in self.COLUMNS:
+            setattr(subset, name, getattr(self, name)[idx])
+        return subset
+
+    def frozen(self) -> "EventTable":
+        """
+        Read-only view of the rows present now, sharing columns, dictionaries
+        and indexes (nothing is copied). Later appends to this table do not
+        show through: the view's indexes are bounded to its row count.
+        """
+        n = len(self.ts)
+        view = self._take_main(slice(0, n))
+        for name in self.COLUMNS:
+            getattr(view, name).flags.writeable = False
+        view.indexes = {name: index.bounded(n) for name, index in self.indexes.items()}
+        if self.late is not None and len(self.late.ts):
+            view.late = self.late.frozen()
+        return view
+
+    def _plan(self, from_us: Optional[int], to_us: Optional[int], equals: Dict[str, Optional[int]]):
+        """
+        Candidate rows for a select (a posting-list slice or the time window)
+        and the criteria still to check on them; None when nothing can match.
+        The shortest posting list clipped to the window drives the scan.
+        """
+        window = self.time_range(from_us, to_us)
+        criteria = {name: code for name, code in equals.items() if code is not None}
+        if NULL_CODE in criteria.values():
+            return None
+
+        candidates = []
+        for name in self.INDEXED:
+            if name in criteria and name in self.indexes:
+                rows = self.indexes[name].get(criteria[name])
+                lo, hi = np.searchsorted(rows, [window.start, window.stop])
+                candidates.append((hi - lo, name, rows[lo:hi]))
+        if candidates:
+            _, driver, rows = min(candidates, key=lambda c: c[0])
+            del criteria[driver]
+            return rows, criteria
+        return window, criteria
+
+    def scan_size(self, from_us: Optional[int] = None, to_us: Optional[int] = None, **equals: Optional[int]) -> int:
+        """Rows a select with these arguments reads, found without reading them."""
+        plan = self._plan(from_us, to_us, equals)
+        late = self.late.scan_size(from_us, to_us, **equals) if self.late is not None else 0
+        if plan is None:
+            return late
+        rows, _ = plan
+        return late + (rows.stop - rows.start if isinstance(rows, slice) else len(rows))
+
+    def select(
+        self,
+        from_us: Optional[int] = None,
+        to_us: Optional[int] = None,
+        **equals: Optional[int],
+    ) -> "EventTable":
+        """
+        Rows inside [from_us, to_us] whose code columns equal the given codes
+        (None = no constraint, NULL_CODE = matches nothing).
+        When an indexed column is constrained, the shortest posting list
+        clipped to the window drives the scan, so cost follows result size.
+        """
+        plan = self._plan(from_us, to_us, equals)
+        if plan is None:
+            return self._take_main(slice(0, 0))
+        rows, criteria = plan
+        result = self._take_main(rows)
+        if criteria:
+            mask = np.ones(len(result), dtype=bool)
+            for name, code in criteria.items():
+                mask &= getattr(result, name) == code
+            result = result.take(mask)
+        if self.late is not None and len(self.late.ts):
+            result = interleave(result, self.late.select(from_us, to_us, **equals))
+        return result
+
+    def scan(
+        self,
+        chunk_rows: int,
+        from_us: Optional[int] = None,
+        to_us: Optional[int] = None,
+        **equals: Optional[int],
+    ) -> Iterator["EventTable"]:
+        """
+        The rows `select` would return, oldest first, as tables of at most
+        `chunk_rows` candidates each (plus the late rows falling among them),
+        so memory stays bounded by the chunk size however many rows match.
+        """
+        late = self.late.select(from_us, to_us, **equals) if self.late is not None else None
+        plan = self._plan(from_us, to_us, equals)
+        if plan is None:
+            rows, criteria = slice(0, 0), {}
+        else:
+            rows, criteria = plan
+        if isinstance(rows, slice):
+            starts = np.arange(rows.start, rows.stop, chunk_rows)
+            parts = [slice(start, min(start + chunk_rows, rows.stop)) for start in starts.tolist()]
+            firsts = self.ts[starts]
+        else:
+            parts = [rows[start:start + chunk_rows] for start in range(0, len(rows), chunk_rows)]
+            firsts = self.ts[rows[::chunk_rows]]
+        taken = 0
+        for i, part in enumerate(parts):
+            chunk = self._take_main(part)
+            if criteria:
+                mask = np.ones(len(chunk), dtype=bool)
+                for name, code in criteria.items():
+                    mask &= getattr(chunk, name) == code
+                chunk = chunk.take(mask)
+            if late is not None and taken < len(late):
+                # Late rows older than the next chunk's first candidate join this one
+                upto = len(late) if i + 1 == len(parts) else int(np.searchsorted(late.ts, firsts[i + 1], side="left"))
+                chunk = interleave(chunk, late.take(slice(taken, upto)))
+                taken = upto
+            if len(chunk):
+                yield chunk
+        if not parts and late is not None:
+            for start in range(0, len(late), chunk_rows):
+                yield late.take(slice(start, start + chunk_rows))
+
+    def latest(
+        self,
+        limit: int,
+        from_us: Optional[int] = None,
+        to_us: Optional[int] = None,
+        **equals: Optional[int],
+    ) -> "EventTable":
+        """The `limit` most recent rows that `select` would return, newest first."""
+        return self.take(self.latest_rows(limit, from_us, to_us, **equals))
+
+    def latest_rows(
+        self,
+        limit: int,
+        from_us: Optional[int] = None,
+        to_us: Optional[int] = None,
+        **equals: Optional[int],
+    ) -> np.ndarray:
+        """
+        Positions of the `latest` rows. Candidates are read backwards off the
+        time order in growing chunks until enough match, so with an index and
+        no other criteria this is O(limit) however many rows the window holds.
+        """
+        found = self._latest_main(limit, from_us, to_us, equals)
+        if self.late is None or not len(self.late.ts):
+            return found
+        # Newest first over both parts; late rows sort after main ones, so they lead on ties
+        found = np.concatenate([found, self.late._latest_main(limit, from_us, to_us, equals) + len(self.ts)])
+        n = len(self.ts)
+        late = found >= n
+        ts = np.empty(len(found), dtype=np.int64)
+        ts[~late] = self.ts[found[~late]]
+        ts[late] = self.late.ts[found[late] - n]
+        return found[np.lexsort((found, ts))[::-1][:limit]]
+
+    def _latest_main(
+        self, limit: int, from_us: Optional[int], to_us: Optional[int], equals: Dict[str, Optional[int]],
+    ) -> np.ndarray:
+        plan = self._plan(from_us, to_us, equals)
+        if plan is None or limit <= 0:
+            return np.arange(0)
+        rows, criteria = plan
+        if isinstance(rows, slice):
+            rows = _Positions(rows.start, rows.stop)
+        found: List[np.ndarray] = [np.arange(0)]
+        needed = limit
+        stop = len(rows)
+        chunk = limit
+        while needed > 0 and stop > 0:
+            start = max(stop - chunk, 0)
+            part = rows[start:stop][::-1]
+            if criteria:
+                mask = np.ones(len(part), dtype=bool)
+                for name, code in criteria.items():
+                    mask &= getattr(self, name)[part] == code
+                part = part[mask]
+            found.append(part[:needed])
+            needed -= len(found[-1])
+            stop = start
+            chunk *= 2
+        return np.concatenate(found)
+
+    def event_ids(self) -> List[str]:
+        return [event_id.decode() for event_id in self.compacted().ids.tolist()]
+
+    def to_rows(self) -> List[EventRecord]:
+        """Rows as compact EventRecords (strings shared with the dictionaries)."""
+        table = self.compacted()
+        ports = table.ports.values
+        inspectors = table.inspectors.values
+        types = table.types.values
+        severities = table.severities.values
+        sources = table.sources.values
+        descriptions = table.descriptions.values
+        confidence = np.round(table.confidence.astype(np.float64), CONFIDENCE_DECIMALS)
+        return [
+            EventRecord(
+                event_id.decode(), ports[p], inspectors[i], t, sources[src], types[ty], severities[sev], c,
+                None if d == NULL_CODE else descriptions[d],
+            )
+            for event_id, t, p, i, ty, sev, src, c, d in zip(
+                table.ids.tolist(),
+                table.ts.tolist(),
+                table.port.tolist(),
+                table.inspector.tolist(),
+                table.type.tolist(),
+                table.severity.tolist(),
+                table.source.tolist(),
+                confidence.tolist(),
+                table.description.tolist(),
+            )
+        ]
+
+    def to_records(self) -> List[dict]:
+        """
+        Rows as JSON-ready dicts, equal to Event.model_dump(mode="json")
+        but without building models.
+        """
+        table = self.compacted()
+        ports = table.ports.values
+        inspectors = table.inspectors.values
+        types = table.types.values
+        severities = table.severities.values
+        sources = table.sources.values
+        descriptions = table.descriptions.values
+        confidence = np.round(table.confidence.astype(np.float64), CONFIDENCE_DECIMALS)
+        return [
+            {
+                "id": event_id.decode(),
+                "port_id": ports[p],
+                "inspector_id": inspectors[i],
+                "timestamp": from_epoch_us(t).isoformat().replace("+00:00", "Z"),
+                "source": sources[src],
+                "type": types[ty],
+                "severity": severities[sev],
+                "confidence": c,
+                "short_description": None if d == NULL_CODE else descriptions[d],
+            }
+            for event_id, t, p, i, ty, sev, src, c, d in zip(
+                table.ids.tolist(),
+                table.ts.tolist(),
+                table.port.tolist(),
+                table.inspector.tolist(),
+                table.type.tolist(),
+                table.severity.tolist(),
+                table.source.tolist(),
+                confidence.tolist(),
+                table.description.tolist(),
+            )
+        ]
+
+    def to_events(self) -> List[Event]:
+        """Materialize rows as public Event models."""
+        table = self.compacted()
+        ports = table.ports.values
+        inspectors = table.inspectors.values
+        types = table.types.values
+        severities = [Severity(v) for v in table.severities.values]
+        sources = [EventSource(v) for v in table.sources.values]
+        descriptions = table.descriptions.values
+        confidence = np.round(table.confidence.astype(np.float64), CONFIDENCE_DECIMALS)
+        return [
+            Event.model_construct(
+                id=event_id.decode(),
+                port_id=ports[p],
+                inspector_id=inspectors[i],
+                timestamp=from_epoch_us(t),
+                source=sources[src],
+                type=types[ty],
+                severity=severities[sev],
+                confidence=c,
+                short_description=None if d == NULL_CODE else descriptions[d],
+            )
+            for event_id, t, p, i, ty, sev, src, c, d in zip(
+                table.ids.tolist(),
+                table.ts.tolist(),
+                table.port.tolist(),
+                table.inspector.tolist(),
+                table.type.tolist(),
+                table.severity.tolist(),
+                table.source.tolist(),
+                confidence.tolist(),
+                table.description.tolist(),
+            )
+        ]
+
+
+def interleave(first: EventTable, second: EventTable) -> EventTable:
+    """Rows of two time-sorted tables in time order; `first` wins ties."""
+    if not len(second):
+        return first
+    if not len(first):
+        return second
+    at = np.searchsorted(first.ts, second.ts, side="right")
+    merged = first.take(slice(0, 0))
+    for name in EventTable.COLUMNS:
+        column, values = getattr(first, name), getattr(second, name)
+        setattr(merged, name, np.insert(column.astype(np.promote_types(column.dtype, values.dtype)), at, values))
+    return merged
+
+
+def count_by(codes: np.ndarray, dictionary: Dictionary) -> Dict[str, int]:
+    """Count occurrences per dictionary value (values with zero count omitted)."""
+    counts = np.bincount(codes, minlength=len(dictionary))
+    return {dictionary.values[c]: int(n) for c, n in enumerate(counts.tolist()) if n}
+
@@ -0,0 +1,183 @@
+"""
+Vectorized synthetic data for load testing and capacity planning.
+Same distributions as seed.py (PORT_PROFILES and the bias tables), but
+drawn with NumPy per port instead of one random.choices call per event,
+and scalable to thousands of ports and tens of millions of events.
+
+Every port gets its own RNG streams from SeedSequence(seed, spawn_key=(i,)),
+so port i's inspectors and events depend only on (seed, i): any subset of
+ports can be generated in another process and the results concatenated.
+Output is column arrays, loaded with EventTable.append_columns()
+(see GeneratedBackend in app.data.backends).
+"""
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from app.data.columns import NULL_CODE, EventTable
+from app.data.seed import (
+    ALL_TYPES,
+    PORT_PROFILES,
+    PORTS,
+    SEVERITY_WEIGHTS,
+    VIOLATION_TYPES_AUDIO,
+    VIOLATION_WEIGHTS_BY_BIAS,
+)
+from app.models import EventSource, Port, Severity
+
+DAY_US = 86_400 * 1_000_000
+
+SEVERITIES = [Severity.LOW.value, Severity.MEDIUM.value, Severity.HIGH.value]
+SOURCES = [EventSource.VIDEO.value, EventSource.AUDIO.value]
+
+_AUDIO = np.array([t in VIOLATION_TYPES_AUDIO for t in ALL_TYPES])
+_TYPE_PROBS = {
+    bias: np.array([weights[t] for t in ALL_TYPES], dtype=np.float64) / sum(weights.values())
+    for bias, weights in VIOLATION_WEIGHTS_BY_BIAS.items()
+}
+_SEVERITY_PROBS = {bias: np.array(w) / sum(w) for bias, w in SEVERITY_WEIGHTS.items()}
+
+# Inspector codes: (port, n) scrambled by an odd multiplier that is also
+# coprime to 3, i.e. a bijection on 6 base-36 digits, so codes stay unique
+_CODE_SPACE = 36 ** 6
+_CODE_MULTIPLIER = 2_654_435_761
+_BASE36 = np.array(list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+
+class PortBatch(NamedTuple):
+    """One port's generated inspectors and events (types, severities, sources as list indexes)."""
+    index: int
+    inspector_ids: List[str]
+    inspector_created_us: np.ndarray
+    ids: np.ndarray
+    ts: np.ndarray
+    inspector: np.ndarray
+    type: np.ndarray
+    severity: np.ndarray
+    source: np.ndarray
+    confidence: np.ndarray
+
+
+def generate_ports(n_ports: int) -> List[Port]:
+    """The 12 real ports, then synthetic ones placed around them (deterministic)."""
+    ports = PORTS[:n_ports]
+    for i in range(len(ports), n_ports):
+        base = PORTS[i % len(PORTS)]
+        angle = i * 2.399963  # golden angle, spreads copies around their base port
+        radius = 0.05 * (i // len(PORTS))
+        ports.append(Port(
+            id=f"port_{i + 1:02d}",
+            name_ar=f"{base.name_ar} {i + 1}",
+            name_en=f"{base.name_en} {i + 1}",
+            country=base.country,
+            lat=round(base.lat + radius * np.sin(angle), 4),
+            lng=round(base.lng + radius * np.cos(angle), 4),
+        ))
+    return ports
+
+
+def port_profile(index: int) -> dict:
+    """Profile of the real port this port index is modelled on."""
+    return PORT_PROFILES[PORTS[index % len(PORTS)].id]
+
+
+def _inspector_codes(index: int, count: int) -> List[str]:
+    serial = (np.int64(index) << 8) + np.arange(count, dtype=np.int64)
+    codes = (serial * _CODE_MULTIPLIER) % _CODE_SPACE
+    digits = (codes[:, None] // 36 ** np.arange(5, -1, -1)) % 36
+    return ["INS-" + "".join(row) for row in _BASE36[digits]]
+
+
+def _serial_ids(prefix: str, n: int) -> np.ndarray:
+    """prefix + zero-padded 0..n-1 as a fixed-width bytes column, built without per-row formatting."""
+    head = prefix.encode()
+    width = len(str(max(n - 1, 0)))
+    chars = np.empty((n, len(head) + width), dtype=np.uint8)
+    chars[:, :len(head)] = np.frombuffer(head, dtype=np.uint8)
+    chars[:, len(head):] = ord("0") + (np.arange(n)[:, None] // 10 ** np.arange(width - 1, -1, -1)) % 10
+    return chars.view(f"S{chars.shape[1]}").ravel()
+
+
+def generate_port(
+    seed: int,
+    index: int,
+    days: int,
+    end_us: int,
+    scale: float = 1.0,
+) -> PortBatch:
+    """Inspectors and events for port `index`, from that port's own RNG streams."""
+    inspector_rng, event_rng = (
+        np.random.default_rng(s) for s in np.random.SeedSequence(seed, spawn_key=(index,)).spawn(2)
+    )
+    profile = port_profile(index)
+    bias = profile["risk_bias"]
+
+    min_insp, max_insp = profile["inspectors"]
+    n_inspectors = int(inspector_rng.integers(min_insp, max_insp + 1))
+    created = end_us - inspector_rng.integers(60, 366, n_inspectors) * DAY_US
+
+    # Incidents per day: fewer on the Friday/Saturday weekend, as in seed.py
+    day_starts = (end_us // DAY_US - np.arange(days, dtype=np.int64)) * DAY_US
+    weekday = (day_starts // DAY_US + 3) % 7  # 1970-01-01 was a Thursday (3)
+    max_weekly = profile["weekly_incidents"][1]
+    upper = np.where((weekday == 4) | (weekday == 5), max(1, max_weekly // 10), max(1, (max_weekly * 2) // 7))
+    per_day = np.rint(event_rng.integers(0, upper + 1) * scale).astype(np.int64)
+    n = int(per_day.sum())
+
+    # Working hours 07:00-22:59, second resolution
+    seconds = (
+        event_rng.integers(7, 23, n) * 3600
+        + event_rng.integers(0, 60, n) * 60
+        + event_rng.integers(0, 60, n)
+    )
+    ts = np.repeat(day_starts, per_day) + seconds * 1_000_000
+    types = event_rng.choice(len(ALL_TYPES), size=n, p=_TYPE_PROBS[bias])
+    low, high = (0.80, 0.98) if bias in ("HIGH", "MEDIUM_HIGH") else (0.70, 0.95)
+    inspector = event_rng.integers(0, n_inspectors, n)
+    severity = event_rng.choice(len(SEVERITIES), size=n, p=_SEVERITY_PROBS[bias])
+    confidence = np.round(event_rng.uniform(low, high, n), 2)
+
+    past = ts <= end_us  # today's later working hours have not happened yet
+    return PortBatch(
+        index=index,
+        inspector_ids=_inspector_codes(index, n_inspectors),
+        inspector_created_us=created,
+        ids=_serial_ids(f"gen_{index}_", n)[past],
+        ts=ts[past],
+        inspector=inspector[past],
+        type=types[past],
+        severity=severity[past],
+        source=_AUDIO[types[past]].astype(np.int64),
+        confidence=confidence[past],
+    )
+
+
+def generate_range(seed: int, indexes: Sequence[int], days: int, end_us: int, scale: float = 1.0) -> List[PortBatch]:
+    """Batches for several ports; the unit of work handed to a worker process."""
+    return [generate_port(seed, i, days, end_us, scale) for i in indexes]
+
+
+def load_batches(table: EventTable, ports: List[Port], batches: Sequence[PortBatch]) -> int:
+    """Encode generated batches with the table's dictionaries and bulk-append them; returns rows added."""
+    type_codes = table.types.encode_many(ALL_TYPES, np.int16)
+    severity_codes = table.severities.encode_many(SEVERITIES, np.int8)
+    source_codes = table.sources.encode_many(SOURCES, np.int8)
+    parts = []
+    for b in batches:
+        port_code = table.ports.encode(ports[b.index].id)
+        inspector_codes = table.inspectors.encode_many(b.inspector_ids, np.int32)
+        parts.append({
+            "ids": b.ids,
+            "ts": b.ts,
+            "port": np.full(len(b.ts), port_code, dtype=np.int32),
+            "inspector": inspector_codes[b.inspector],
+            "type": type_codes[b.type],
+            "severity": severity_codes[b.severity],
+            "source": source_codes[b.source],
+            "confidence": b.confidence.astype(np.float32),
+            "description": np.full(len(b.ts), NULL_CODE, dtype=np.int32),
+        })
+    if not parts:
+        return 0
+    columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+    return len(table.append_columns(columns))
@@ -0,0 +1,163 @@
+"""
+Hourly rollup of event counts and risk contributions.
+Cells are (port, violation type, severity) code triples packed into one
+int64; each hour keeps only its non-empty cells, so memory follows the
+data rather than ports x types x hours.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+HOUR_US = 3600 * 1_000_000
+
+_PORT_SHIFT = 20
+_TYPE_SHIFT = 4
+_TYPE_MASK = 0xFFFF
+_SEVERITY_MASK = 0xF
+
+
+def pack_cells(port: np.ndarray, type_: np.ndarray, severity: np.ndarray) -> np.ndarray:
+    return (
+        (port.astype(np.int64) << _PORT_SHIFT)
+        | (type_.astype(np.int64) << _TYPE_SHIFT)
+        | severity.astype(np.int64)
+    )
+
+
+class CellTotals(NamedTuple):
+    """Counts, summed contributions and latest timestamp per cell (cells unique)."""
+    cells: np.ndarray
+    counts: np.ndarray
+    sums: np.ndarray
+    last_ts: np.ndarray
+
+    @property
+    def port(self) -> np.ndarray:
+        return self.cells >> _PORT_SHIFT
+
+    @property
+    def type(self) -> np.ndarray:
+        return (self.cells >> _TYPE_SHIFT) & _TYPE_MASK
+
+    @property
+    def severity(self) -> np.ndarray:
+        return self.cells & _SEVERITY_MASK
+
+    def where(
+        self,
+        port: Optional[int] = None,
+        type: Optional[int] = None,
+        severity: Optional[int] = None,
+    ) -> "CellTotals":
+        """Keep cells matching the given codes (None = any)."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if port is not None:
+            mask &= self.port == port
+        if type is not None:
+            mask &= self.type == type
+        if severity is not None:
+            mask &= self.severity == severity
+        return CellTotals(*(col[mask] for col in self))
+
+
+EMPTY_CELLS = CellTotals(
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.float64),
+    np.empty(0, dtype=np.int64),
+)
+
+
+def group_cells(cells: np.ndarray, counts: np.ndarray, sums: np.ndarray, last_ts: np.ndarray) -> CellTotals:
+    """Combine rows that share a cell."""
+    if not len(cells):
+        return EMPTY_CELLS
+    keys, inverse = np.unique(cells, return_inverse=True)
+    last = np.full(len(keys), np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last, inverse, last_ts)
+    return CellTotals(
+        keys,
+        np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64),
+        np.bincount(inverse, weights=sums, minlength=len(keys)),
+        last,
+    )
+
+
+def concat_cells(*parts: CellTotals) -> CellTotals:
+    parts = [p for p in parts if len(p.cells)]
+    if not parts:
+        return EMPTY_CELLS
+    return group_cells(*(np.concatenate(cols) for cols in zip(*parts)))
+
+
+class HourlyRollup:
+    """Per-hour CellTotals, updated as events are ingested."""
+
+    def __init__(self):
+        self.hours: Dict[int, CellTotals] = {}
+        self._sorted_hours: List[int] = []
+
+    def add(self, ts: np.ndarray, cells: np.ndarray, contributions: np.ndarray) -> None:
+        """Fold a batch of events (timestamps, packed cells, contributions) into its hours."""
+        if not len(ts):
+            return
+        hours = ts // HOUR_US
+        order = np.argsort(hours, kind="stable")
+        hours, ts, cells, contributions = hours[order], ts[order], cells[order], contributions[order]
+        keys, starts = np.unique(hours, return_index=True)
+        bounds = list(starts[1:]) + [len(hours)]
+        for hour, lo, hi in zip(keys.tolist(), starts.tolist(), bounds):
+            batch = group_cells(cells[lo:hi], np.ones(hi - lo, dtype=np.int64), contributions[lo:hi], ts[lo:hi])
+            current = self.hours.get(hour)
+            if current is None:
+                insort(self._sorted_hours, hour)
+                self.hours[hour] = batch
+            else:
+                self.hours[hour] = concat_cells(current, batch)
+
+    @classmethod
+    def from_arrays(cls, hours: np.ndarray, offsets: np.ndarray, *columns: np.ndarray) -> "HourlyRollup":
+        """Inverse of to_arrays(): hour i owns rows offsets[i]:offsets[i + 1] of each cell column."""
+        rollup = cls()
+        bounds = offsets.tolist()
+        for i, hour in enumerate(hours.tolist()):
+            rollup.hours[hour] = CellTotals(*(col[bounds[i]:bounds[i + 1]] for col in columns))
+        rollup._sorted_hours = sorted(rollup.hours)
+        return rollup
+
+    def to_arrays(self) -> tuple:
+        """(hours, offsets, cells, counts, sums, last_ts) with hours ascending."""
+        parts = [self.hours[h] for h in self._sorted_hours]
+        offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum([len(p.cells) for p in parts], out=offsets[1:])
+        columns = [np.concatenate(cols) for cols in zip(*parts)] if parts else list(EMPTY_CELLS)
+        return (np.array(self._sorted_hours, dtype=np.int64), offsets, *columns)
+
+    def copy(self) -> "HourlyRollup":
+        """
+        Copy sharing the per-hour totals; add() and put() replace totals
+        rather than modify them, so changing the copy leaves this one intact.
+        """
+        rollup = HourlyRollup()
+        rollup.hours = dict(self.hours)
+        rollup._sorted_hours = list(self._sorted_hours)
+        return rollup
+
+    def put(self, hour: int, totals: CellTotals) -> None:
+        """Set an hour's cells from totals aggregated elsewhere."""
+        if hour not in self.hours:
+            insort(self._sorted_hours, hour)
+        self.hours[hour] = totals
+
+    def totals(self, first_hour: int, last_hour: int, **codes: Optional[int]) -> CellTotals:
+        """Combined cells for hours in [first_hour, last_hour), filtered by codes."""
+        lo = bisect_left(self._sorted_hours, first_hour)
+        hi = bisect_left(self._sorted_hours, last_hour)
+        parts = [self.hours[h] for h in self._sorted_hours[lo:hi]]
+        if not parts:
+            return EMPTY_CELLS
+        merged = CellTotals(*(np.concatenate(cols) for cols in zip(*parts)))
+        if any(code is not None for code in codes.values()):
+            merged = merged.where(**codes)
+        return group_cells(*merged)
@@ -0,0 +1,296 @@
+"""
+Nabeeh shared store: one copy of the event columns for every worker process.
+With `shared_dir` set, the workers of one host (uvicorn --workers N) race
+for an exclusive lock on `writer.lock` in that directory. The winner
+loads the store as usual and becomes the writer; the others attach
+read-only. The writer publishes a full binary snapshot (app.data.snapshot)
+of the store, the base, and then points the `CURRENT` manifest at it.
+Readers map that file, so the columns sit in the page cache once however
+many workers map them, and take over the writer's version number, so data
+versions, ETags and cache keys agree across workers.
+
+Later versions are published as deltas: a snapshot of only the rows and
+inspectors added since the previous publish (coded with dictionaries of
+their own), listed in the manifest after the base. Readers copy each
+delta's rows into their table's late part and fold them into their rollup,
+leaving the mapped base alone. Costs, per publish:
+
+- delta: O(rows since the last publish) to write and to apply, in every
+  reader. Readers hold the delta rows in private memory.
+- base: O(store) to write (~80 bytes per event; at 10M events ~800 MB and
+  about a second), and each reader maps the new file and drops its deltas.
+  Written on load, after a rescore or a change of writer, and once the
+  deltas hold more than 1/_REBASE_FRACTION of the base's rows or number
+  _MAX_DELTAS, so rewrites stay a small fraction of publish time and the
+  private part of a reader stays small. Until a reader lets go of the
+  previous base both stay mapped, but only pages in use are resident.
+
+Writes that reach a reader go to the (durable) backend only; the writer
+tails the backend and publishes them with its next version. If the
+writer exits, the next reader to take the lock carries on from the
+snapshot it has mapped. The lock is an fcntl lock, so this is POSIX only.
+
+    CURRENT:  {"version": 14, "file": "store-12.snap", "base_version": 12,
+               "deltas": [{"version": 13, "file": "delta-13.snap"}, ...],
+               "writer": <pid>, "log": [[version, earliest_ts], ...]}
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Set
+
+from app.config import settings
+from app.data.rollup import HourlyRollup
+from app.data.snapshot import SnapshotError, read_snapshot, write_snapshot
+from app.data.store import (
+    attach,
+    become_writer,
+    extend,
+    get_view,
+    history_bounds,
+    ingest_backend_tail,
+    init_store,
+    unpublished_state,
+)
+from app.services.risk import compute_contributions
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "CURRENT"
+LOCK = "writer.lock"
+# A new base is written once the deltas on top of the current one hold more
+# than 1/_REBASE_FRACTION of its rows, or there are _MAX_DELTAS of them
+_REBASE_FRACTION = 8
+_MAX_DELTAS = 64
+# Write log entries carried in the manifest
+_LOG_ENTRIES = 256
+
+
+class SharedStore:
+    """This process's side of a store shared through `directory`."""
+
+    def __init__(self, directory: Optional[str], publish_seconds: float, attach_timeout_seconds: float):
+        self.directory = directory
+        self.publish_seconds = publish_seconds
+        self.attach_timeout_seconds = attach_timeout_seconds
+        # None until opened, then "writer" or "reader"
+        self.role: Optional[str] = None
+        # Version last published (writer) or attached (reader)
+        self.version = 0
+        self.publishes = 0
+        self.rebases = 0
+        self.attaches = 0
+        # Base snapshot published (writer) or mapped (reader), and the writer's deltas on top of it
+        self._base: Optional[str] = None
+        self._base_version = 0
+        self._base_rows = 0
+        self._deltas: List[dict] = []
+        self._delta_rows = 0
+        # Inspectors registered as of the last publish; deltas carry only later ones
+        self._inspectors = 0
+        # Files the previous manifest named, kept for readers still opening it
+        self._previous: Set[str] = set()
+        self._lock_fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def open(self) -> None:
+        """
+        Become the writer, or attach to what the writer publishes (waiting up
+        to `attach_timeout_seconds` for its first snapshot).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if self._try_lock():
+            manifest = self._read_manifest()
+            init_store()
+            # A restarted writer continues numbering above the last published version
+            become_writer(manifest["version"] if manifest else 0)
+            self.role = "writer"
+            self.publish()
+            return
+        self.role = "reader"
+        deadline = time.monotonic() + self.attach_timeout_seconds
+        while not self.refresh():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"no shared store was published in {self.directory}")
+            time.sleep(0.1)
+
+    def _try_lock(self) -> bool:
+        fd = os.open(self._path(LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self._path(MANIFEST), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def publish(self) -> bool:
+        """Writer: publish the current view if it moved since the last publish, as a delta when it can."""
+        view, position, log, rows = unpublished_state()
+        if view.version == self.version:
+            return False
+        rebase = (
+            rows is None
+            or self._base is None
+            or len(self._deltas) >= _MAX_DELTAS
+            or (self._delta_rows + len(rows)) * _REBASE_FRACTION > self._base_rows
+        )
+        if rebase:
+            # No deltas go on top of a base that failed to write
+            self._base = None
+            name = f"store-{view.version}.snap"
+            write_snapshot(
+                self._path(name), list(view.ports), list(view.inspectors), view.events, view.rollup, position,
+                history_bounds(),
+            )
+            self._base, self._base_version, self._base_rows = name, view.version, len(view.events)
+            self._deltas, self._delta_rows = [], 0
+            self.rebases += 1
+        else:
+            name = f"delta-{view.version}.snap"
+            inspectors = list(view.inspectors[self._inspectors:])
+            try:
+                write_snapshot(self._path(name), [], inspectors, rows.recoded(), HourlyRollup(), position)
+            except Exception:
+                # These rows are in no delta now: the next publish writes a base
+                self._base = None
+                raise
+            self._deltas.append({"version": view.version, "file": name})
+            self._delta_rows += len(rows)
+        manifest = {
+            "version": view.version,
+            "file": self._base,
+            "base_version": self._base_version,
+            "deltas": self._deltas,
+            "writer": os.getpid(),
+            "log": log[-_LOG_ENTRIES:],
+        }
+        tmp = self._path(f"{MANIFEST}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._path(MANIFEST))
+        self.version = view.version
+        self._inspectors = len(view.inspectors)
+        self.publishes += 1
+        self._prune(_files(manifest))
+        return True
+
+    def _prune(self, current: Set[str]) -> None:
+        # Readers that mapped a removed file keep their mapping; the space is freed once they let go
+        keep = current | self._previous
+        for name in os.listdir(self.directory):
+            if name.endswith(".snap") and name not in keep:
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+        self._previous = current
+
+    def refresh(self) -> bool:
+        """Reader: catch up with the latest published version if it is not the one served."""
+        manifest = self._read_manifest()
+        if manifest is None or manifest["version"] == self.version:
+            return False
+        rebase = manifest["file"] != self._base
+        try:
+            # Open everything before serving any of it, so a pruned file leaves this version in place
+            base = read_snapshot(self._path(manifest["file"]), scorer=compute_contributions) if rebase else None
+            deltas = [
+                (delta["version"], read_snapshot(self._path(delta["file"])))
+                for delta in manifest["deltas"]
+                if rebase or delta["version"] > self.version
+            ]
+        except SnapshotError as e:
+            # Pruned between reading the manifest and opening it: the next poll finds a newer one
+            logger.info("shared store not attached yet: %s", e)
+            return False
+        log = [tuple(entry) for entry in manifest["log"]]
+        if base is not None:
+            attach(base, manifest["base_version"], log)
+            self._base = manifest["file"]
+        for version, delta in deltas:
+            extend(delta, version, log)
+        self._deltas = manifest["deltas"]
+        self.version = manifest["version"]
+        self.attaches += 1
+        return True
+
+    def step(self) -> None:
+        """One poll: a reader takes over if the writer is gone; the writer publishes the backend tail."""
+        if self.role == "reader" and self._try_lock():
+            self.refresh()
+            manifest = self._read_manifest()
+            become_writer(manifest["version"] if manifest else 0)
+            self.role = "writer"
+            logger.info("took over as shared store writer at version %d", get_view().version)
+        if self.role == "writer":
+            ingest_backend_tail()
+            self.publish()
+        else:
+            self.refresh()
+
+    def start(self) -> None:
+        """Start polling on the running event loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            if self.role == "writer":
+                await asyncio.to_thread(self.step)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.publish_seconds)
+            try:
+                await asyncio.to_thread(self.step)
+            except Exception:  # keep serving the version we have; the next poll retries
+                logger.exception("shared store update failed")
+
+    def stats(self) -> dict:
+        return {
+            "role": self.role,
+            "version": self.version,
+            "serving_version": get_view().version,
+            "publishes": self.publishes,
+            "rebases": self.rebases,
+            "attaches": self.attaches,
+            "base": self._base,
+            "deltas": len(self._deltas),
+        }
+
+
+def _files(manifest: dict) -> Set[str]:
+    return {manifest["file"], *(delta["file"] for delta in manifest["deltas"])}
+
+
+shared_store = SharedStore(settings.shared_dir, settings.shared_publish_seconds, settings.shared_attach_timeout_seconds)
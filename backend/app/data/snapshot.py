@@ -0,0 +1,149 @@
+"""
+Binary snapshots of the Nabeeh store.
+One file: a fixed prelude, a JSON header (format version, dictionaries,
+entities, block table) and 64-byte-aligned fixed-width blocks holding the
+event columns, posting lists (CSR) and hourly rollup. Loading maps the
+file and wraps the blocks as read-only arrays, so start-up cost does not
+grow with the number of events; pages are read as queries touch them.
+
+    prelude:  magic (8) | format version u32 | reserved u32 | header length u64
+    header:   UTF-8 JSON
+    blocks:   at data_start + offset, data_start = prelude + header rounded up to 64
+"""
+import json
+import mmap
+import os
+import struct
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.data.columns import EventTable, PostingIndex
+from app.data.rollup import HourlyRollup
+from app.models import Inspector, Port
+
+MAGIC = b"NABEEHSN"
+FORMAT_VERSION = 1
+
+_PRELUDE = struct.Struct("<8sIIQ")
+_ALIGN = 64
+_ROLLUP_ARRAYS = ("hours", "offsets", "cells", "counts", "sums", "last_ts")
+
+
+class SnapshotError(ValueError):
+    """Missing, truncated or incompatible snapshot file."""
+
+
+class Snapshot(NamedTuple):
+    ports: List[Port]
+    inspectors: List[Inspector]
+    events: EventTable
+    rollup: HourlyRollup
+    # Backend position (see StorageBackend.position) the snapshot is current to
+    backend_position: int
+    # Rows the backend holds that were never loaded (see StorageBackend.history_bounds)
+    history: Optional[Tuple[int, int]] = None
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def write_snapshot(
+    path: str,
+    ports: List[Port],
+    inspectors: List[Inspector],
+    events: EventTable,
+    rollup: HourlyRollup,
+    backend_position: int = 0,
+    history: Optional[Tuple[int, int]] = None,
+) -> None:
+    """Write atomically (temp file + rename); readers of an older snapshot keep their mapping."""
+    events = events.compacted()
+    blocks: List[Tuple[str, np.ndarray]] = [(f"column.{name}", getattr(events, name)) for name in EventTable.COLUMNS]
+    for name in EventTable.INDEXED:
+        for part, array in zip(("keys", "offsets", "rows"), events.indexes[name].to_csr()):
+            blocks.append((f"index.{name}.{part}", array))
+    for part, array in zip(_ROLLUP_ARRAYS, rollup.to_arrays()):
+        blocks.append((f"rollup.{part}", array))
+
+    table = {}
+    offset = 0
+    for name, array in blocks:
+        array = np.ascontiguousarray(array)
+        table[name] = {"dtype": array.dtype.str, "count": len(array), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "rows": len(events),
+        "contribution_version": events.contribution_version,
+        "backend_position": backend_position,
+        "history": history,
+        "dictionaries": {name: getattr(events, name).values for name in EventTable.DICTIONARIES},
+        "ports": [p.model_dump(mode="json") for p in ports],
+        "inspectors": [i.model_dump(mode="json") for i in inspectors],
+        "blocks": table,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(_PRELUDE.size + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PRELUDE.pack(MAGIC, FORMAT_VERSION, 0, len(header)))
+        f.write(header)
+        for name, array in blocks:
+            f.seek(data_start + table[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(
+    path: str,
+    scorer: Optional[Callable[[EventTable], np.ndarray]] = None,
+) -> Snapshot:
+    """Map a snapshot. Columns stay backed by the file until rows are added to the table."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"cannot map {path}: {e}") from e
+    if len(buffer) < _PRELUDE.size:
+        raise SnapshotError(f"{path} is truncated")
+    magic, version, _, header_len = _PRELUDE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a Nabeeh snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"{path} has format {version}, expected {FORMAT_VERSION}")
+    header = json.loads(bytes(buffer[_PRELUDE.size:_PRELUDE.size + header_len]))
+    data_start = _aligned(_PRELUDE.size + header_len)
+
+    def block(name: str) -> np.ndarray:
+        spec = header["blocks"][name]
+        dtype = np.dtype(spec["dtype"])
+        end = data_start + spec["offset"] + spec["count"] * dtype.itemsize
+        if end > len(buffer):
+            raise SnapshotError(f"{path} is truncated")
+        return np.frombuffer(buffer, dtype=dtype, count=spec["count"], offset=data_start + spec["offset"])
+
+    indexes: Dict[str, PostingIndex] = {
+        name: PostingIndex.from_csr(*(block(f"index.{name}.{part}") for part in ("keys", "offsets", "rows")))
+        for name in EventTable.INDEXED
+    }
+    events = EventTable.from_columns(
+        {name: block(f"column.{name}") for name in EventTable.COLUMNS},
+        header["dictionaries"],
+        indexes,
+        scorer=scorer,
+        contribution_version=header["contribution_version"],
+    )
+    return Snapshot(
+        ports=[Port.model_validate(p) for p in header["ports"]],
+        inspectors=[Inspector.model_validate(i) for i in header["inspectors"]],
+        events=events,
+        rollup=HourlyRollup.from_arrays(*(block(f"rollup.{part}") for part in _ROLLUP_ARRAYS)),
+        backend_position=header["backend_position"],
+        history=tuple(header["history"]) if header.get("history") else None,
+    )
@@ -1,68 +1,521 @@
 """
 In-memory data store for Nabeeh MVP.
-Initialized at startup from seed data.
+Loaded at startup from the configured storage backend (see
+app.data.backends): seed data only, or a durable SQLite file, or mapped
+from a binary snapshot (app.data.snapshot). Writes go to the backend
+first, then to the in-memory working set.
+Events are kept column-wise (see app.data.columns) and move between the
+store and its backend as compact EventRecords; Event models exist only at
+the API boundary (incoming batches, and the list-returning getters).
+
+Readers see the store through a StoreView: an immutable, versioned state
+that writers replace in one reference assignment after each write. A view
+shares the column arrays, posting lists and rollup hours of the store
+(appends go past the view's last row; late rows go to a side segment
+and merges into the columns and rollup updates copy on write), so taking one costs nothing and a reader never sees half
+of a write.
+
+Several worker processes can share one store (app.data.shared): one
+writer owns the working table as above, the others attach the snapshots
+(and the deltas of rows on top of them) it publishes read-only and leave
+their writes to the backend.
 """
-from typing import List, Optional, Dict
+import logging
+import os
+import threading
+from collections import deque
+from types import MappingProxyType
+from typing import Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
-from app.data.seed import seed_all
+from app.config import settings
+from app.data.backends import StorageBackend, create_backend
+from app.data.columns import NULL_CODE, EventRecord, EventTable, from_epoch_us, interleave
+from app.data.rollup import HourlyRollup, pack_cells
+from app.data.snapshot import Snapshot, SnapshotError, read_snapshot, write_snapshot
 from app.models import Event, Inspector, Port
+from app.services.risk import compute_contributions, weight_tables, weights_version
+
+logger = logging.getLogger(__name__)
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """A write reached a worker attached to a shared store it cannot write through."""
+
+
+class Ingested(NamedTuple):
+    """What add_events did with a batch."""
+    # Version to read the batch at (in a shared store, a later one may publish it)
+    version: int
+    # Events stored: those the backend already held are not counted
+    stored: int
+
+
+class StoreView(NamedTuple):
+    """One published version of the store. Treat every field as read-only."""
+    # Bumped on every write; response caches key on it
+    version: int
+    events: EventTable
+    rollup: HourlyRollup
+    ports: Tuple[Port, ...]
+    inspectors: Tuple[Inspector, ...]
+    ports_by_id: Mapping[str, Port]
+    inspectors_by_id: Mapping[str, Inspector]
+    inspectors_by_port: Mapping[str, Tuple[Inspector, ...]]
+
 
-_ports: List[Port] = []
-_inspectors: List[Inspector] = []
-_events: List[Event] = []
+_EMPTY_MAP: Mapping = MappingProxyType({})
+
+# Writer-owned working table; readers only ever see frozen views of it
+_events: EventTable = EventTable()
+_view = StoreView(0, _events.frozen(), HourlyRollup(), (), (), _EMPTY_MAP, _EMPTY_MAP, _EMPTY_MAP)
 _initialized: bool = False
+_backend: Optional[StorageBackend] = None
+# "local" (this process owns the store), or "writer" / "reader" of a shared store
+_role: str = "local"
+# Backend position the working table is current to
+_position: int = 0
+# Rows the backend holds but the store never loaded (see StorageBackend.history_bounds)
+_history: Optional[Tuple[int, int]] = None
+
+# (version, earliest timestamp written) for recent writes, so incremental
+# consumers can tell whether a write landed inside data they already read
+_write_log: Deque[Tuple[int, int]] = deque(maxlen=1024)
+_EVERYTHING = -(2 ** 63)
+_UNBOUNDED = 2 ** 63 - 1
+# Rows read from backend history per query batch
+_HISTORY_BATCH_ROWS = 50_000
+
+# Rows ingested since the shared store last took them (see unpublished_state);
+# None once the view changed as a whole
+_unpublished: Optional[EventTable] = None
 
+# Serializes writers; readers go lock-free against the published view
+_write_lock = threading.RLock()
 
-def init_store(days_back: int = 30, seed_value: int = 42) -> None:
-    """Initialize the store with seed data."""
-    global _ports, _inspectors, _events, _initialized
+
+def init_store(days_back: int = 30, seed_value: int = 42, backend: Optional[StorageBackend] = None) -> None:
+    """
+    Load the store from `backend` (default: the one configured in settings).
+    When a snapshot is configured and readable it is mapped instead of
+    loading rows; a durable backend then only replays what was stored
+    after the snapshot was taken.
+    """
+    global _events, _initialized, _backend, _position, _history
     if _initialized:
         return
-    _ports, _inspectors, _events = seed_all(days_back, seed_value)
+    _backend = backend or create_backend(settings, days_back, seed_value)
+    snapshot = _read_snapshot()
+    tail = ()
+    # Other processes may be writing to the backend: load, and note how far, from one state of it
+    with _backend.consistent():
+        if snapshot is None:
+            ports, inspectors = _backend.load_entities()
+            _events = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+            _backend.load_into(_events)
+            _history = _backend.history_bounds
+            rollup = _build_rollup()
+        else:
+            _events, rollup, _history = snapshot.events, snapshot.rollup, snapshot.history
+            if _backend.durable:
+                ports, inspectors = _backend.load_entities()
+                tail = list(_backend.load_events(after=snapshot.backend_position))
+            else:
+                ports, inspectors = snapshot.ports, snapshot.inspectors
+        _position = _backend.position()
+    with _write_lock:
+        _publish(_EVERYTHING, rollup=rollup, **_entities(ports, inspectors))
+        for batch in tail:
+            _ingest(batch)
     _initialized = True
 
 
-def get_all_ports() -> List[Port]:
-    return _ports.copy()
+def _read_snapshot() -> Optional[Snapshot]:
+    path = settings.snapshot_path
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return read_snapshot(path, scorer=compute_contributions)
+    except SnapshotError as e:
+        logger.warning("ignoring snapshot: %s", e)
+        return None
+
+
+def save_snapshot(path: Optional[str] = None) -> str:
+    """Write the current store to a binary snapshot (default: settings.snapshot_path)."""
+    path = path or settings.snapshot_path
+    if not path:
+        raise ValueError("no snapshot path configured")
+    with _write_lock:
+        view, position, _ = published_state()
+        write_snapshot(path, list(view.ports), list(view.inspectors), view.events, view.rollup, position, _history)
+    return path
+
+
+def published_state() -> Tuple[StoreView, int, List[Tuple[int, int]]]:
+    """The current view, the backend position it is current to, and the write log, taken together."""
+    with _write_lock:
+        _refresh_contributions()
+        return _view, _position, list(_write_log)
+
+
+def unpublished_state() -> Tuple[StoreView, int, List[Tuple[int, int]], Optional[EventTable]]:
+    """
+    published_state() plus the rows ingested since the previous call, which
+    start collecting afresh. The rows are None when the view changed as a
+    whole since then (load, rescore) and only a full copy describes it.
+    """
+    global _unpublished
+    with _write_lock:
+        view, position, log = published_state()
+        rows, _unpublished = _unpublished, _events.empty()
+        return view, position, log, rows
+
+
+def become_writer(min_version: int = 0) -> None:
+    """
+    Make this process the writer of a shared store. Versions continue above
+    `min_version` (the last one published by any writer) so that no worker
+    ever sees a version number twice.
+    """
+    global _role, _view
+    with _write_lock:
+        _role = "writer"
+        if _view.version < min_version:
+            _view = _view._replace(version=min_version)
+            _publish(_EVERYTHING)
+
+
+def attach(snapshot: Snapshot, version: int, log: Sequence[Tuple[int, int]]) -> None:
+    """
+    Reader of a shared store: serve `snapshot`, published by the writer as
+    `version`. The writer's log entries are carried over so incremental
+    consumers invalidate only what changed; a gap invalidates everything.
+    """
+    global _events, _view, _role, _position, _initialized, _backend, _history
+    with _write_lock:
+        if _backend is None:
+            _backend = create_backend(settings)
+        _carry_log(version, log)
+        _events, _position, _role = snapshot.events, snapshot.backend_position, "reader"
+        _history = snapshot.history
+        _view = StoreView(
+            version, _events.frozen(), snapshot.rollup, **_entities(snapshot.ports, snapshot.inspectors),
+        )
+        _initialized = True
+
+
+def extend(delta: Snapshot, version: int, log: Sequence[Tuple[int, int]]) -> None:
+    """
+    Reader of a shared store: serve `delta`, the rows (and inspectors) the
+    writer published as `version` on top of the version served. The rows
+    go to the table's late part, so the attached columns stay mapped.
+    """
+    global _view, _position
+    with _write_lock:
+        _carry_log(version, log)
+        rows = _events.append_aside(delta.events)
+        rollup = _view.rollup.copy()
+        rollup.add(rows.ts, pack_cells(rows.port, rows.type, rows.severity), rows.contribution)
+        _position = delta.backend_position
+        entities = _entities(_view.ports, _view.inspectors + tuple(delta.inspectors))
+        _view = StoreView(version, _events.frozen(), rollup, **entities)
+
+
+def _carry_log(version: int, log: Sequence[Tuple[int, int]]) -> None:
+    """Take over the writer's log entries up to `version`; a gap invalidates everything."""
+    if version != _view.version:
+        written = [(v, ts) for v, ts in log if _view.version < v <= version]
+        if not written or written[0][0] > _view.version + 1:
+            written.append((version, _EVERYTHING))
+        _write_log.extend(written)
+
+
+def ingest_backend_tail() -> int:
+    """
+    Writer of a shared store: publish what other workers saved to the
+    backend since the last call (one version for all of it). Returns the
+    current version.
+    """
+    global _position
+    with _write_lock:
+        records, position = _backend.load_tail(_position)
+        if records:
+            _refresh_contributions()
+            inspectors = _new_inspectors(records)
+            _ingest(records, **(_entities(_view.ports, _view.inspectors + tuple(inspectors)) if inspectors else {}))
+        _position = position
+        return _view.version
+
+
+def _entities(ports: Sequence[Port], inspectors: Sequence[Inspector]) -> dict:
+    """StoreView entity fields for these lists, with read-only lookup maps."""
+    by_port: Dict[str, List[Inspector]] = {}
+    for i in inspectors:
+        by_port.setdefault(i.port_id, []).append(i)
+    return {
+        "ports": tuple(ports),
+        "inspectors": tuple(inspectors),
+        "ports_by_id": MappingProxyType({p.id: p for p in ports}),
+        "inspectors_by_id": MappingProxyType({i.id: i for i in inspectors}),
+        "inspectors_by_port": MappingProxyType({port_id: tuple(group) for port_id, group in by_port.items()}),
+    }
+
+
+def _publish(changed_from_us: int, **fields) -> None:
+    """
+    Make the working table (and any replaced fields) the next version.
+    The write is logged first, so a reader holding the new view always
+    finds it in the log.
+    """
+    global _view, _unpublished
+    version = _view.version + 1
+    _write_log.append((version, changed_from_us))
+    if changed_from_us == _EVERYTHING:
+        _unpublished = None
+    _view = _view._replace(version=version, events=_events.frozen(), **fields)
+
+
+def _build_rollup() -> HourlyRollup:
+    """Hourly rollup of everything loaded: pushed down to the backend when it can aggregate."""
+    _events.compact()
+    rollup = HourlyRollup()
+    hours = _backend.hourly_cells(_events, *weight_tables()) if _backend else None
+    if hours is None:
+        rollup.add(_events.ts, pack_cells(_events.port, _events.type, _events.severity), _events.contribution)
+    else:
+        for hour, cells in hours:
+            rollup.put(hour, cells)
+    return rollup
+
+
+def _ingest(events: List[EventRecord], **fields) -> None:
+    """Append events (scored at ingest), fold them into a copy of the rollup and publish."""
+    batch = _events.append(events)
+    if not len(batch):
+        return
+    rollup = _view.rollup.copy()
+    rollup.add(batch.ts, pack_cells(batch.port, batch.type, batch.severity), batch.contribution)
+    if _unpublished is not None:
+        _unpublished.append_columns({name: getattr(batch, name) for name in EventTable.COLUMNS})
+    _publish(int(batch.ts[0]), rollup=rollup, **fields)
+
+
+def add_events(events: List[Event]) -> Ingested:
+    """
+    Persist a validated batch, then publish it as one new version; returns
+    that version and the number of events stored. Posting indexes, the
+    rollup and the write log are updated incrementally; inspectors seen for
+    the first time are registered against the event's port. Events the
+    backend already holds (a retried batch) are not added again.
+
+    In a shared store with a durable backend every worker only saves the
+    batch; the writer publishes it with whatever else is in the backend's
+    tail, so a reader returns the version it currently serves and the
+    batch shows up in a later one. Readers refuse writes otherwise.
+    """
+    global _position
+    records = [EventRecord.from_event(e) for e in events]
+    with _write_lock:
+        _refresh_contributions()
+        inspectors = _new_inspectors(records)
+        shared = _role != "local" and _backend is not None and _backend.durable
+        if _role == "reader" and not shared:
+            raise ReadOnlyStoreError("this worker serves a shared store read-only and the backend is not durable")
+        if shared:
+            stored = _backend.save(records, inspectors)
+            return Ingested(ingest_backend_tail() if _role == "writer" else _view.version, len(stored))
+        if _backend:
+            records = _backend.save(records, inspectors)
+            _position = _backend.position()
+        entities = _entities(_view.ports, _view.inspectors + tuple(inspectors)) if inspectors else {}
+        _ingest(records, **entities)
+        return Ingested(_view.version, len(records))
+
+
+def _new_inspectors(events: List[EventRecord]) -> List[Inspector]:
+    known = _view.inspectors_by_id
+    new: Dict[str, Inspector] = {}
+    for e in events:
+        if e.inspector_id not in known and e.inspector_id not in new:
+            new[e.inspector_id] = Inspector(id=e.inspector_id, port_id=e.port_id, created_at=from_epoch_us(e.ts))
+    return list(new.values())
+
+
+def _refresh_contributions() -> None:
+    """Rebuild contributions and the rollup in bulk if the weight table changed."""
+    version = weights_version()
+    if _events.contribution_version == version or _role == "reader":
+        # Readers take rescored columns from the writer
+        return
+    with _write_lock:
+        if _events.contribution_version == version:
+            return
+        _events.rescore(compute_contributions, version)
+        _publish(_EVERYTHING, rollup=_build_rollup())
+
+
+def history_bounds() -> Optional[Tuple[int, int]]:
+    """Bounds of the rows the backend holds but the store never loaded, carried in snapshots."""
+    return _history
+
+
+def stored_history(
+    events: EventTable,
+    from_us: Optional[int] = None,
+    to_us: Optional[int] = None,
+    **codes: Optional[int],
+) -> Optional[EventTable]:
+    """
+    Rows `events.select(from_us, to_us, **codes)` misses because the
+    backend kept them on disk (older than the loaded days), coded with
+    `events`' dictionaries; None when the window reaches no such rows.
+    """
+    batches = _history_batches(events, _HISTORY_BATCH_ROWS, from_us, to_us, codes)
+    if batches is None:
+        return None
+    return _scored(events.coded([record for batch in batches for record in batch]))
+
+
+def reaches_history(from_us: Optional[int] = None, **codes: Optional[int]) -> bool:
+    """Whether a window starting at `from_us` can match rows the backend kept on disk."""
+    history = _history
+    return history is not None and (from_us is None or from_us < history[0]) and NULL_CODE not in codes.values()
+
+
+def select_with_history(
+    events: EventTable,
+    from_us: Optional[int] = None,
+    to_us: Optional[int] = None,
+    **codes: Optional[int],
+) -> EventTable:
+    """`events.select(...)` with the stored_history() rows the window reaches, in time order."""
+    selected = events.select(from_us, to_us, **codes)
+    history = stored_history(events, from_us, to_us, **codes)
+    return selected if history is None else interleave(history, selected)
+
+
+def scan_history(
+    events: EventTable,
+    chunk_rows: int,
+    from_us: Optional[int] = None,
+    to_us: Optional[int] = None,
+    **codes: Optional[int],
+) -> Optional[Iterator[EventTable]]:
+    """stored_history() in tables of at most `chunk_rows` rows, oldest first."""
+    batches = _history_batches(events, chunk_rows, from_us, to_us, codes)
+    if batches is None:
+        return None
+    return (_scored(events.coded(batch)) for batch in batches)
+
+
+def _history_batches(
+    events: EventTable, batch_size: int, from_us: Optional[int], to_us: Optional[int], codes: Dict[str, Optional[int]]
+) -> Optional[Iterator[List[EventRecord]]]:
+    history = _history
+    if history is None or not reaches_history(from_us, **codes):
+        return None
+    # Dictionaries were primed with every stored value at load, so the codes decode
+    values = {
+        column: dictionary.decode(codes[name])
+        for name, column, dictionary in (
+            ("port", "port_id", events.ports),
+            ("inspector", "inspector_id", events.inspectors),
+            ("type", "type", events.types),
+            ("severity", "severity", events.severities),
+        )
+        if codes.get(name) is not None
+    }
+    return _backend.load_history(
+        _EVERYTHING if from_us is None else from_us,
+        _UNBOUNDED if to_us is None else to_us,
+        history,
+        batch_size=batch_size,
+        **values,
+    )
+
+
+def _scored(rows: EventTable) -> EventTable:
+    rows.rescore(compute_contributions, weights_version())
+    return rows
+
+
+def get_view() -> StoreView:
+    """
+    The current version of the store. Take it once and read everything
+    from it to get one consistent version across several lookups.
+    """
+    _refresh_contributions()
+    return _view
+
+
+def get_data_version() -> int:
+    """Counter bumped on every write (including weight-table rescoring)."""
+    return get_view().version
+
+
+def get_earliest_write_since(version: int) -> Optional[int]:
+    """
+    Earliest event timestamp written after `version`, or None if nothing
+    was. When the log no longer reaches back that far, every timestamp
+    is reported as possibly changed.
+    """
+    if version >= get_view().version:
+        return None
+    log = list(_write_log)
+    if not log or log[0][0] > version + 1:
+        return _EVERYTHING
+    written = [ts for v, ts in log if v > version]
+    return min(written) if written else None
+
+
+def get_all_ports() -> Sequence[Port]:
+    return _view.ports
 
 
 def get_port_by_id(port_id: str) -> Optional[Port]:
-    for p in _ports:
-        if p.id == port_id:
-            return p
-    return None
+    return _view.ports_by_id.get(port_id)
 
 
-def get_all_inspectors() -> List[Inspector]:
-    return _inspectors.copy()
+def get_all_inspectors() -> Sequence[Inspector]:
+    return _view.inspectors
 
 
 def get_inspector_by_id(inspector_id: str) -> Optional[Inspector]:
-    for i in _inspectors:
-        if i.id == inspector_id:
-            return i
-    return None
+    return _view.inspectors_by_id.get(inspector_id)
+
+
+def get_inspectors_by_port(port_id: str) -> Sequence[Inspector]:
+    return _view.inspectors_by_port.get(port_id, ())
+
+
+def get_event_table() -> EventTable:
+    """Read-only columnar view of all events at the current version."""
+    return get_view().events
 
 
-def get_inspectors_by_port(port_id: str) -> List[Inspector]:
-    return [i for i in _inspectors if i.port_id == port_id]
+def get_rollup() -> HourlyRollup:
+    """Hourly pre-aggregates matching get_event_table(). Read-only for callers."""
+    return get_view().rollup
 
 
 def get_all_events() -> List[Event]:
-    return _events.copy()
+    """Every event as a model (this materializes; prefer get_event_table())."""
+    return get_event_table().to_events()
 
 
 def get_events_by_port(port_id: str) -> List[Event]:
-    return [e for e in _events if e.port_id == port_id]
+    events = get_event_table()
+    return events.select(port=events.ports.lookup(port_id)).to_events()
 
 
 def get_events_by_inspector(inspector_id: str) -> List[Event]:
-    return [e for e in _events if e.inspector_id == inspector_id]
+    events = get_event_table()
+    return events.select(inspector=events.inspectors.lookup(inspector_id)).to_events()
 
 
-def get_ports_map() -> Dict[str, Port]:
-    return {p.id: p for p in _ports}
+def get_ports_map() -> Mapping[str, Port]:
+    return _view.ports_by_id
 
 
-def get_inspectors_map() -> Dict[str, Inspector]:
-    return {i.id: i for i in _inspectors}
+def get_inspectors_map() -> Mapping[str, Inspector]:
+    return _view.inspectors_by_id
@@ -5,15 +5,44 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.data.store import init_store
-from app.routes import analytics, ports
+from app.config import settings
+from app.data.shared import shared_store
+from app.data.store import (
+    get_all_inspectors,
+    get_all_ports,
+    get_data_version,
+    get_event_table,
+    get_rollup,
+    init_store,
+    save_snapshot,
+)
+from app.routes import analytics, events, live, ports
+from app.services.cache import response_cache
+from app.services.ingest import ingest_writer
+from app.services.live import live_hub
+from app.services.metrics import MetricsMiddleware, metrics
+from app.services.offload import offloader
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_store()
+    if shared_store.enabled:
+        shared_store.open()
+        shared_store.start()
+    else:
+        init_store()
+    ingest_writer.start()
+    live_hub.start()
+    offloader.start(settings.shared_dir)
     yield
+    offloader.stop()
+    await live_hub.stop()
+    await ingest_writer.stop()
+    await shared_store.stop()
+    if settings.snapshot_path and shared_store.role != "reader":
+        save_snapshot()
 
 
 app = FastAPI(
@@ -42,12 +71,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
+# Outermost, so Server-Timing and latencies cover the whole stack
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 app.include_router(analytics.router)
 app.include_router(ports.router)
+app.include_router(events.router)
+app.include_router(live.router)
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+metrics.gauge("nabeeh_store_size", "Rows and entities held in memory.", lambda: {
+    "events": len(get_event_table()),
+    "ports": len(get_all_ports()),
+    "inspectors": len(get_all_inspectors()),
+    "rollup_hours": len(get_rollup().hours),
+})
+metrics.gauge("nabeeh_data_version", "Store write counter.", lambda: {"": get_data_version()})
+metrics.gauge("nabeeh_response_cache", "Response cache occupancy and lookups.", lambda: {
+    k: v for k, v in response_cache.stats().items() if k in ("entries", "hits", "misses", "evictions")
+})
+metrics.gauge("nabeeh_ingest_queued_chunks", "Stream ingest chunks waiting for the writer.", lambda: {
+    "": ingest_writer.stats()["queued_chunks"],
+})
+metrics.gauge("nabeeh_shared_store", "Shared store versions published (writer) or attached (reader).", lambda: {
+    k: v for k, v in shared_store.stats().items() if k in ("publishes", "attaches")
+} if shared_store.enabled else {})
+metrics.gauge("nabeeh_live", "Live update topics and open subscriber streams.", lambda: {
+    k: v for k, v in live_hub.stats().items() if k in ("topics", "subscribers")
+})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of request, stage and store metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -125,6 +125,11 @@ class PortDetail(BaseModel):
     recent_incidents: List[dict]
 
 
+class IngestResult(BaseModel):
+    accepted: int
+    data_version: int
+
+
 # Violation taxonomy (video + audio)
 VIDEO_VIOLATIONS = frozenset({
     "violence",
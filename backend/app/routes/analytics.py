@@ -3,28 +3,32 @@ Analytics API: Summary, Ports, Port Details, Inspectors.
 Implements proper KPI semantics: unique inspectors vs incident counts.
 """
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Callable, Hashable, Optional, List, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from app.data.store import (
-    get_all_events,
-    get_all_ports,
-    get_all_inspectors,
-    get_port_by_id,
-    get_inspector_by_id,
-    get_ports_map,
-)
+from app.config import settings
+from app.data.columns import EventTable, count_by, from_epoch_us, to_epoch_us
+from app.data.store import StoreView, get_view, reaches_history, scan_history, select_with_history
 from app.models import (
     Event,
     NationwideSummary,
     PortSummary,
     PortDetail,
-    InspectorSummary,
     InspectorDetail,
     ALL_VIOLATION_TYPES,
 )
+from app.services.aggregate import InspectorStats, PortAggregate, aggregate_by_inspector, port_scores, window_cells
+from app.services.cache import etag_matches, response_cache
+from app.services.encoding import dumps, join_array, join_object, with_port
+from app.services.export import FORMATS, arrow_available
+from app.services.metrics import record_scanned, stage
+from app.services.offload import offloader
+from app.services.pagination import CursorError, incidents_page, inspectors_page
 from app.services.risk import compute_risk_score, risk_level
+from app.services.rolling import ROLLING_WINDOWS, resolve_window, rolling_aggregator
 
 router = APIRouter(prefix="/api", tags=["analytics"])
 
@@ -40,60 +44,286 @@ def _parse_dt(s: str) -> datetime:
         )
 
 
+@stage("parse")
+def _resolve_range(
+    from_: Optional[str],
+    to: Optional[str],
+    window: Optional[str] = None,
+) -> Tuple[datetime, datetime]:
+    """Explicit from/to, or a rolling window ending at the snapped current time."""
+    if window:
+        if window not in ROLLING_WINDOWS:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "invalid_window", "message": f"window must be one of {', '.join(ROLLING_WINDOWS)}"}
+            )
+        from_us, to_us = resolve_window(window)
+        return from_epoch_us(from_us), from_epoch_us(to_us)
+    
+    if not from_ or not to:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "missing_range", "message": "from and to (or window) are required"}
+        )
+    from_ts = _parse_dt(from_)
+    to_ts = _parse_dt(to)
+    
+    if from_ts > to_ts:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_range", "message": "from must be before to"}
+        )
+    return from_ts, to_ts
+
+
+def _filter_codes(
+    events: EventTable,
+    from_ts: Optional[datetime] = None,
+    to_ts: Optional[datetime] = None,
+    port_id: Optional[str] = None,
+    violation_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    inspector_id: Optional[str] = None,
+) -> dict:
+    """Filter criteria as `EventTable.select` arguments."""
+    return dict(
+        from_us=to_epoch_us(from_ts) if from_ts else None,
+        to_us=to_epoch_us(to_ts) if to_ts else None,
+        port=events.ports.lookup(port_id) if port_id else None,
+        type=events.types.lookup(violation_type) if violation_type else None,
+        severity=events.severities.lookup(severity) if severity else None,
+        inspector=events.inspectors.lookup(inspector_id) if inspector_id else None,
+    )
+
+
+@stage("filter")
 def _filter_events(
-    events: List[Event],
+    events: EventTable,
     from_ts: Optional[datetime] = None,
     to_ts: Optional[datetime] = None,
     port_id: Optional[str] = None,
     violation_type: Optional[str] = None,
     severity: Optional[str] = None,
     inspector_id: Optional[str] = None,
-) -> List[Event]:
-    """Filter events by multiple criteria."""
-    result = events
-    
-    if from_ts:
-        result = [e for e in result if e.timestamp >= from_ts]
-    if to_ts:
-        result = [e for e in result if e.timestamp <= to_ts]
-    if port_id:
-        result = [e for e in result if e.port_id == port_id]
-    if violation_type:
-        result = [e for e in result if e.type == violation_type]
-    if severity:
-        result = [e for e in result if e.severity.value == severity]
-    if inspector_id:
-        result = [e for e in result if e.inspector_id == inspector_id]
-    
-    return result
+) -> EventTable:
+    """
+    Filter events by multiple criteria.
+    The time window is bisected off the time-ordered table and port /
+    inspector / type constraints go through the store's posting indexes.
+    Rows older than the store loaded are read from the backend.
+    """
+    selected = select_with_history(
+        events, **_filter_codes(events, from_ts, to_ts, port_id, violation_type, severity, inspector_id)
+    )
+    record_scanned(len(selected))
+    return selected
+
+
+def _scan_cost(view: StoreView, from_ts: datetime, to_ts: datetime, **filters: Optional[str]) -> int:
+    """Event rows a build filtering on these criteria reads; decides whether it is offloaded."""
+    events = view.events
+    return events.scan_size(**_filter_codes(events, from_ts, to_ts, **filters))
+
+
+def _cursor_error(exc: CursorError) -> HTTPException:
+    return HTTPException(status_code=400, detail={"error": "invalid_cursor", "message": str(exc)})
+
+
+@stage("filter")
+def _incidents_page(
+    events: EventTable, limit: int, cursor: Optional[str], **filters
+) -> Tuple[EventTable, Optional[str]]:
+    """One page of matching events, newest first, and the next page's cursor."""
+    codes = _filter_codes(events, **filters)
+    if reaches_history(**codes):
+        # The window reaches rows left on disk: page over its matches, stored ones included
+        events = select_with_history(events, **codes)
+    try:
+        page, next_cursor = incidents_page(events, limit, cursor, **codes)
+    except CursorError as exc:
+        raise _cursor_error(exc) from exc
+    record_scanned(len(page))
+    return page, next_cursor
+
+
+@stage("score")
+def _window_cells(
+    view: StoreView,
+    from_ts: datetime,
+    to_ts: datetime,
+    port_id: Optional[str] = None,
+    violation_type: Optional[str] = None,
+    severity: Optional[str] = None,
+):
+    """Pre-aggregated counts/scores for a window, answered from the hourly rollup."""
+    events = view.events
+    return window_cells(
+        events,
+        view.rollup,
+        to_epoch_us(from_ts),
+        to_epoch_us(to_ts),
+        port=events.ports.lookup(port_id) if port_id else None,
+        type=events.types.lookup(violation_type) if violation_type else None,
+        severity=events.severities.lookup(severity) if severity else None,
+    )
+
+
+def _port_aggregate(
+    view: StoreView,
+    from_ts: datetime,
+    to_ts: datetime,
+    window: Optional[str] = None,
+    violation_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    filtered: Optional[EventTable] = None,
+) -> PortAggregate:
+    """
+    Per-port aggregate for the window; rolling windows advance incrementally.
+    `filtered` is the window already filtered by the same criteria, when the
+    caller has it.
+    """
+    events = view.events
+    if window:
+        with stage("score"):
+            return rolling_aggregator.aggregate(
+                view,
+                to_epoch_us(to_ts) - to_epoch_us(from_ts),
+                to_epoch_us(to_ts),
+                type=events.types.lookup(violation_type) if violation_type else None,
+                severity=events.severities.lookup(severity) if severity else None,
+            )
+    if filtered is None:
+        filtered = _filter_events(
+            events,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            violation_type=violation_type,
+            severity=severity,
+        )
+    cells = _window_cells(view, from_ts, to_ts, violation_type=violation_type, severity=severity)
+    with stage("score"):
+        return PortAggregate(filtered, cells)
 
 
-def _get_unique_inspectors(events: List[Event]) -> set:
-    """Get set of unique inspector IDs from events."""
-    return {e.inspector_id for e in events}
+def _get_unique_inspectors(events: EventTable) -> np.ndarray:
+    """Get unique inspector codes from events."""
+    return np.unique(events.inspector)
 
 
-def _get_violations_breakdown(events: List[Event]) -> dict:
+def _get_violations_breakdown(events: EventTable) -> dict:
     """Count events by violation type."""
-    counts = {}
-    for e in events:
-        counts[e.type] = counts.get(e.type, 0) + 1
-    return counts
+    return count_by(events.type, events.types)
 
 
-def _get_severity_breakdown(events: List[Event]) -> dict:
+def _get_severity_breakdown(events: EventTable) -> dict:
     """Count events by severity."""
     counts = {"LOW": 0, "MEDIUM": 0, "HIGH": 0}
-    for e in events:
-        counts[e.severity.value] = counts.get(e.severity.value, 0) + 1
+    counts.update(count_by(events.severity, events.severities))
     return counts
 
 
-def _get_last_incident_at(events: List[Event]) -> Optional[str]:
+def _get_last_incident_at(events: EventTable) -> Optional[str]:
     """Get timestamp of most recent event."""
-    if not events:
+    if not len(events):
         return None
-    return max(e.timestamp for e in events).isoformat()
+    return from_epoch_us(events.ts[-1]).isoformat()
+
+
+def _get_most_recent(events: EventTable, limit: int) -> List[Event]:
+    """Most recent events first (read backwards off the time order)."""
+    return events.latest(limit).to_events()
+
+
+def _summary_payload(agg: PortAggregate) -> dict:
+    return {
+        "total_risk_score": round(agg.total_score, 2),
+        "total_incidents": agg.total_incidents,
+        "total_inspectors_impacted": agg.total_inspectors,
+        "total_ports_affected": agg.ports_affected,
+        "last_incident_at": agg.last_incident_at,
+        "incidents_by_severity": agg.severity_breakdown(),
+        "incidents_by_violation": agg.violations_breakdown(),
+    }
+
+
+def _ports_payload(view: StoreView, agg: PortAggregate) -> bytes:
+    result = []
+    for port in view.ports:
+        stats = agg.port(port.id)
+        result.append(with_port(port, {
+            "risk_score": round(stats.score, 2),
+            "risk_level": risk_level(stats.score),
+            "incident_count": stats.incident_count,
+            "unique_inspectors_count": stats.unique_inspectors,
+            "last_incident_at": stats.last_incident_at,
+        }))
+    return join_array(result)
+
+
+def _heat_points(view: StoreView, scores: np.ndarray) -> List[list]:
+    events = view.events
+    heat_points = []
+    for port in view.ports:
+        code = events.ports.lookup(port.id)
+        score = float(scores[code]) if 0 <= code < len(scores) else 0.0
+        # intensity 0-1 for leaflet.heat; normalize by 50 for demo
+        intensity = min(1.0, score / 50.0) if score else 0
+        heat_points.append([port.lat, port.lng, intensity])
+    return heat_points
+
+
+def _inspector_summaries(ranked: List[InspectorStats]) -> List[dict]:
+    return [
+        {
+            "id": insp.id,
+            "risk_score": round(insp.score, 2),
+            "risk_level": risk_level(insp.score),
+            "incident_count": insp.incident_count,
+            "last_incident_at": insp.last_incident_at,
+        }
+        for insp in ranked
+    ]
+
+
+def _cache_key(
+    view: StoreView,
+    endpoint: str,
+    from_ts: datetime,
+    to_ts: datetime,
+    **filters: Any,
+) -> Hashable:
+    """Normalized filter tuple plus the version of the store view being read."""
+    return (
+        endpoint,
+        from_ts.isoformat(),
+        to_ts.isoformat(),
+        tuple(sorted((k, v) for k, v in filters.items() if v is not None)),
+        view.version,
+    )
+
+
+def _respond(request: Request, key: Hashable, build: Callable[[], Any]) -> Response:
+    """
+    Serve from the response cache (computing on a miss), with ETag / 304 support.
+    `build` returns plain JSON-ready data, or bytes it already encoded; the
+    body is sent as is, without a pass through the route's response_model.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        with stage("build"):
+            result = build()
+        with stage("encode"):
+            body = result if isinstance(result, bytes) else dumps(result)
+        entry = response_cache.put(key, body)
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _build_summary(view: StoreView, from_ts, to_ts, window, violation_type, severity) -> dict:
+    return _summary_payload(_port_aggregate(view, from_ts, to_ts, window, violation_type, severity))
 
 
 # =============================================================================
@@ -101,8 +331,10 @@ def _get_last_incident_at(events: List[Event]) -> Optional[str]:
 # =============================================================================
 @router.get("/summary", response_model=NationwideSummary)
 def get_summary(
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
 ):
@@ -110,37 +342,19 @@ def get_summary(
     Get nationwide summary with proper KPI semantics.
     Returns: total risk, incident count, UNIQUE inspectors impacted.
     """
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    events = get_all_events()
-    filtered = _filter_events(
-        events,
-        from_ts=from_ts,
-        to_ts=to_ts,
-        violation_type=violation_type,
-        severity=severity,
-    )
+    def build():
+        # Rolling windows advance incrementally, so only fixed ranges scan the window
+        cost = 0 if window else _scan_cost(view, from_ts, to_ts, violation_type=violation_type, severity=severity)
+        return offloader.run(view, cost, _build_summary, from_ts, to_ts, window, violation_type, severity)
     
-    unique_inspectors = _get_unique_inspectors(filtered)
-    ports_affected = {e.port_id for e in filtered}
-    total_score = compute_risk_score(filtered)
-    
-    return NationwideSummary(
-        total_risk_score=round(total_score, 2),
-        total_incidents=len(filtered),
-        total_inspectors_impacted=len(unique_inspectors),
-        total_ports_affected=len(ports_affected),
-        last_incident_at=_get_last_incident_at(filtered),
-        incidents_by_severity=_get_severity_breakdown(filtered),
-        incidents_by_violation=_get_violations_breakdown(filtered),
-    )
+    return _respond(request, _cache_key(view, "summary", from_ts, to_ts, violation_type=violation_type, severity=severity), build)
+
+
+def _build_ports(view: StoreView, from_ts, to_ts, window, violation_type, severity) -> bytes:
+    return _ports_payload(view, _port_aggregate(view, from_ts, to_ts, window, violation_type, severity))
 
 
 # =============================================================================
@@ -148,55 +362,24 @@ def get_summary(
 # =============================================================================
 @router.get("/ports", response_model=List[PortSummary])
 def get_ports_list(
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
 ):
     """
     Get all ports with risk scores and UNIQUE inspector counts.
     """
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    ports = get_all_ports()
-    all_events = get_all_events()
+    def build():
+        cost = 0 if window else _scan_cost(view, from_ts, to_ts, violation_type=violation_type, severity=severity)
+        return offloader.run(view, cost, _build_ports, from_ts, to_ts, window, violation_type, severity)
     
-    result = []
-    for port in ports:
-        port_events = _filter_events(
-            all_events,
-            from_ts=from_ts,
-            to_ts=to_ts,
-            port_id=port.id,
-            violation_type=violation_type,
-            severity=severity,
-        )
-        
-        unique_inspectors = _get_unique_inspectors(port_events)
-        score = compute_risk_score(port_events)
-        level = risk_level(score)
-        
-        result.append(PortSummary(
-            id=port.id,
-            name_ar=port.name_ar,
-            name_en=port.name_en,
-            lat=port.lat,
-            lng=port.lng,
-            risk_score=round(score, 2),
-            risk_level=level,
-            incident_count=len(port_events),
-            unique_inspectors_count=len(unique_inspectors),
-            last_incident_at=_get_last_incident_at(port_events),
-        ))
-    
-    return result
+    return _respond(request, _cache_key(view, "ports", from_ts, to_ts, violation_type=violation_type, severity=severity), build)
 
 
 # =============================================================================
@@ -204,95 +387,81 @@ def get_ports_list(
 # =============================================================================
 @router.get("/ports/{port_id}/details", response_model=PortDetail)
 def get_port_details(
+    request: Request,
     port_id: str,
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
 ):
     """
     Get detailed port info with top inspectors and recent incidents.
     """
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    port = get_port_by_id(port_id)
+    port = view.ports_by_id.get(port_id)
     if not port:
         raise HTTPException(
             status_code=404,
             detail={"error": "not_found", "message": f"Port {port_id} not found"}
         )
     
-    all_events = get_all_events()
-    port_events = _filter_events(
-        all_events,
-        from_ts=from_ts,
-        to_ts=to_ts,
-        port_id=port_id,
-        violation_type=violation_type,
-        severity=severity,
-    )
+    def build():
+        all_events = view.events
+        port_events = _filter_events(
+            all_events,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            port_id=port_id,
+            violation_type=violation_type,
+            severity=severity,
+        )
     
-    unique_inspectors = _get_unique_inspectors(port_events)
-    score = compute_risk_score(port_events)
-    level = risk_level(score)
-    
-    # Build top inspectors list (by incident count)
-    inspector_incidents = {}
-    for e in port_events:
-        inspector_incidents.setdefault(e.inspector_id, []).append(e)
-    
-    top_inspectors = []
-    for insp_id, insp_events in sorted(
-        inspector_incidents.items(),
-        key=lambda x: len(x[1]),
-        reverse=True
-    )[:10]:
-        insp_score = compute_risk_score(insp_events)
-        top_inspectors.append(InspectorSummary(
-            id=insp_id,
-            risk_level=risk_level(insp_score),
-            risk_score=round(insp_score, 2),
-            incident_count=len(insp_events),
-            last_incident_at=_get_last_incident_at(insp_events),
-        ))
-    
-    # Recent incidents
-    sorted_events = sorted(port_events, key=lambda e: e.timestamp, reverse=True)[:10]
-    recent_incidents = [
-        {
-            "id": e.id,
-            "timestamp": e.timestamp.isoformat(),
-            "type": e.type,
-            "severity": e.severity.value,
-            "inspector_id": e.inspector_id,
-            "confidence": e.confidence,
-        }
-        for e in sorted_events
-    ]
+        unique_inspectors = _get_unique_inspectors(port_events)
+        score = compute_risk_score(port_events)
+        level = risk_level(score)
     
-    return PortDetail(
-        id=port.id,
-        name_ar=port.name_ar,
-        name_en=port.name_en,
-        lat=port.lat,
-        lng=port.lng,
-        risk_score=round(score, 2),
-        risk_level=level,
-        incident_count=len(port_events),
-        unique_inspectors_count=len(unique_inspectors),
-        last_incident_at=_get_last_incident_at(port_events),
-        violations_breakdown=_get_violations_breakdown(port_events),
-        severity_breakdown=_get_severity_breakdown(port_events),
-        top_inspectors=top_inspectors,
-        recent_incidents=recent_incidents,
-    )
+        # Build top inspectors list (by incident count)
+        top_inspectors = [
+            {
+                "id": insp.id,
+                "risk_level": risk_level(insp.score),
+                "risk_score": round(insp.score, 2),
+                "incident_count": insp.incident_count,
+                "last_incident_at": insp.last_incident_at,
+            }
+            for insp in aggregate_by_inspector(port_events, limit=10)
+        ]
+    
+        # Recent incidents
+        sorted_events = _get_most_recent(port_events, 10)
+        recent_incidents = [
+            {
+                "id": e.id,
+                "timestamp": e.timestamp.isoformat(),
+                "type": e.type,
+                "severity": e.severity.value,
+                "inspector_id": e.inspector_id,
+                "confidence": e.confidence,
+            }
+            for e in sorted_events
+        ]
+    
+        return with_port(port, {
+            "risk_score": round(score, 2),
+            "risk_level": level,
+            "incident_count": len(port_events),
+            "unique_inspectors_count": len(unique_inspectors),
+            "last_incident_at": _get_last_incident_at(port_events),
+            "violations_breakdown": _get_violations_breakdown(port_events),
+            "severity_breakdown": _get_severity_breakdown(port_events),
+            "top_inspectors": top_inspectors,
+            "recent_incidents": recent_incidents,
+        })
+    
+    return _respond(request, _cache_key(view, "port_details", from_ts, to_ts, port_id=port_id, violation_type=violation_type, severity=severity), build)
 
 
 # =============================================================================
@@ -300,9 +469,11 @@ def get_port_details(
 # =============================================================================
 @router.get("/inspectors/{inspector_id}", response_model=InspectorDetail)
 def get_inspector_details(
+    request: Request,
     inspector_id: str,
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     port_id: Optional[str] = Query(None),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
@@ -310,65 +481,87 @@ def get_inspector_details(
     """
     Get inspector analytics with violation breakdown and recent incidents.
     """
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    inspector = get_inspector_by_id(inspector_id)
+    inspector = view.inspectors_by_id.get(inspector_id)
     if not inspector:
         raise HTTPException(
             status_code=404,
             detail={"error": "not_found", "message": f"Inspector {inspector_id} not found"}
         )
     
-    all_events = get_all_events()
-    insp_events = _filter_events(
-        all_events,
+    def build():
+        all_events = view.events
+        insp_events = _filter_events(
+            all_events,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            inspector_id=inspector_id,
+            port_id=port_id,
+            violation_type=violation_type,
+            severity=severity,
+        )
+    
+        score = compute_risk_score(insp_events)
+        level = risk_level(score)
+        ports_affected = [insp_events.ports.decode(c) for c in np.unique(insp_events.port).tolist()]
+    
+        # Recent incidents
+        sorted_events = _get_most_recent(insp_events, 20)
+        ports_map = view.ports_by_id
+        recent_incidents = [
+            {
+                "id": e.id,
+                "timestamp": e.timestamp.isoformat(),
+                "type": e.type,
+                "severity": e.severity.value,
+                "port_id": e.port_id,
+                "port_name_ar": ports_map.get(e.port_id, {}).name_ar if ports_map.get(e.port_id) else "",
+                "port_name_en": ports_map.get(e.port_id, {}).name_en if ports_map.get(e.port_id) else "",
+                "confidence": e.confidence,
+            }
+            for e in sorted_events
+        ]
+    
+        return {
+            "id": inspector_id,
+            "risk_score": round(score, 2),
+            "risk_level": level,
+            "total_incidents": len(insp_events),
+            "last_incident_at": _get_last_incident_at(insp_events),
+            "violations_breakdown": _get_violations_breakdown(insp_events),
+            "severity_breakdown": _get_severity_breakdown(insp_events),
+            "ports_affected": ports_affected,
+            "recent_incidents": recent_incidents,
+        }
+    
+    return _respond(request, _cache_key(
+        view, "inspector_details", from_ts, to_ts,
+        inspector_id=inspector_id, port_id=port_id, violation_type=violation_type, severity=severity,
+    ), build)
+
+
+def _build_inspectors(view: StoreView, from_ts, to_ts, port_id, violation_type, severity, limit, cursor) -> dict:
+    filtered = _filter_events(
+        view.events,
         from_ts=from_ts,
         to_ts=to_ts,
-        inspector_id=inspector_id,
         port_id=port_id,
         violation_type=violation_type,
         severity=severity,
     )
-    
-    score = compute_risk_score(insp_events)
-    level = risk_level(score)
-    ports_affected = list({e.port_id for e in insp_events})
-    
-    # Recent incidents
-    sorted_events = sorted(insp_events, key=lambda e: e.timestamp, reverse=True)[:20]
-    ports_map = get_ports_map()
-    recent_incidents = [
-        {
-            "id": e.id,
-            "timestamp": e.timestamp.isoformat(),
-            "type": e.type,
-            "severity": e.severity.value,
-            "port_id": e.port_id,
-            "port_name_ar": ports_map.get(e.port_id, {}).name_ar if ports_map.get(e.port_id) else "",
-            "port_name_en": ports_map.get(e.port_id, {}).name_en if ports_map.get(e.port_id) else "",
-            "confidence": e.confidence,
-        }
-        for e in sorted_events
-    ]
-    
-    return InspectorDetail(
-        id=inspector_id,
-        risk_score=round(score, 2),
-        risk_level=level,
-        total_incidents=len(insp_events),
-        last_incident_at=_get_last_incident_at(insp_events),
-        violations_breakdown=_get_violations_breakdown(insp_events),
-        severity_breakdown=_get_severity_breakdown(insp_events),
-        ports_affected=ports_affected,
-        recent_incidents=recent_incidents,
-    )
+
+    # Build summaries sorted by incident count
+    try:
+        ranked, next_cursor = inspectors_page(filtered, limit, cursor)
+    except CursorError as exc:
+        raise _cursor_error(exc) from exc
+    return {
+        "total_unique_inspectors": len(_get_unique_inspectors(filtered)),
+        "inspectors": _inspector_summaries(ranked),
+        "next_cursor": next_cursor,
+    }
 
 
 # =============================================================================
@@ -376,201 +569,297 @@ def get_inspector_details(
 # =============================================================================
 @router.get("/inspectors")
 def get_inspectors_list(
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     port_id: Optional[str] = Query(None),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """
     Get list of inspectors with incidents in the given filters.
     Returns UNIQUE inspectors who have at least one incident.
     """
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
+    def build():
+        cost = _scan_cost(view, from_ts, to_ts, port_id=port_id, violation_type=violation_type, severity=severity)
+        return offloader.run(
+            view, cost, _build_inspectors, from_ts, to_ts, port_id, violation_type, severity, limit, cursor,
         )
     
-    all_events = get_all_events()
+    return _respond(request, _cache_key(
+        view, "inspectors", from_ts, to_ts,
+        port_id=port_id, violation_type=violation_type, severity=severity, limit=limit, cursor=cursor,
+    ), build)
+
+
+# =============================================================================
+# Legacy endpoints for backward compatibility
+# =============================================================================
+@router.get("/heatmap")
+def get_heatmap(
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
+    violation_type: Optional[str] = Query(None, alias="violationType"),
+    severity: Optional[str] = Query(None),
+):
+    """Generate heatmap points with risk intensity."""
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
+    
+    def build():
+        events = view.events
+        if window:
+            scores = _port_aggregate(view, from_ts, to_ts, window, violation_type, severity).scores
+        else:
+            cells = _window_cells(view, from_ts, to_ts, violation_type=violation_type, severity=severity)
+            scores = port_scores(cells, len(events.ports))
+    
+        return {
+            "points": _heat_points(view, scores),
+            "from": from_ts.isoformat(),
+            "to": to_ts.isoformat(),
+        }
+    
+    return _respond(request, _cache_key(view, "heatmap", from_ts, to_ts, violation_type=violation_type, severity=severity), build)
+
+
+def _build_dashboard(view: StoreView, from_ts, to_ts, window, violation_type, severity, inspectors_limit) -> bytes:
     filtered = _filter_events(
-        all_events,
+        view.events,
         from_ts=from_ts,
         to_ts=to_ts,
-        port_id=port_id,
         violation_type=violation_type,
         severity=severity,
     )
-    
-    # Group by inspector
-    inspector_events = {}
-    for e in filtered:
-        inspector_events.setdefault(e.inspector_id, []).append(e)
-    
-    # Build summaries sorted by incident count
-    inspectors = []
-    for insp_id, events in sorted(
-        inspector_events.items(),
-        key=lambda x: len(x[1]),
-        reverse=True
-    )[:limit]:
-        score = compute_risk_score(events)
-        inspectors.append({
-            "id": insp_id,
-            "risk_score": round(score, 2),
-            "risk_level": risk_level(score),
-            "incident_count": len(events),
-            "last_incident_at": _get_last_incident_at(events),
-        })
-    
-    return {
-        "total_unique_inspectors": len(inspector_events),
-        "inspectors": inspectors,
-    }
+    agg = _port_aggregate(view, from_ts, to_ts, window, violation_type, severity, filtered=filtered)
+    with stage("score"):
+        ranked, next_cursor = inspectors_page(filtered, inspectors_limit)
+
+    return join_object({
+        "summary": dumps(_summary_payload(agg)),
+        "ports": _ports_payload(view, agg),
+        "heatmap": dumps({
+            "points": _heat_points(view, agg.scores),
+            "from": from_ts.isoformat(),
+            "to": to_ts.isoformat(),
+        }),
+        "inspectors": dumps({
+            "total_unique_inspectors": agg.total_inspectors,
+            "inspectors": _inspector_summaries(ranked),
+            "next_cursor": next_cursor,
+        }),
+    })
 
 
 # =============================================================================
-# Legacy endpoints for backward compatibility
+# GET /api/dashboard - Summary, ports, heatmap and top inspectors together
 # =============================================================================
-@router.get("/heatmap")
-def get_heatmap(
-    from_: str = Query(..., alias="from", description="ISO date"),
-    to: str = Query(..., description="ISO date"),
+@router.get("/dashboard")
+def get_dashboard(
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
+    inspectors_limit: int = Query(10, ge=1, le=200),
 ):
-    """Generate heatmap points with risk intensity."""
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
+    """
+    Everything the heatmap page shows, from one filtered pass: the bodies of
+    /api/summary, /api/ports and /api/heatmap, and the first page of
+    /api/inspectors, under one set of filters.
+    """
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
+    
+    def build():
+        # The inspector ranking scans the filtered window even for rolling windows
+        cost = _scan_cost(view, from_ts, to_ts, violation_type=violation_type, severity=severity)
+        return offloader.run(
+            view, cost, _build_dashboard, from_ts, to_ts, window, violation_type, severity, inspectors_limit,
         )
     
-    ports = get_all_ports()
-    all_events = get_all_events()
-    
-    heat_points = []
-    for port in ports:
-        port_events = _filter_events(
-            all_events,
-            from_ts=from_ts,
-            to_ts=to_ts,
-            port_id=port.id,
-            violation_type=violation_type,
-            severity=severity,
-        )
-        score = compute_risk_score(port_events)
-        # intensity 0-1 for leaflet.heat; normalize by 50 for demo
-        intensity = min(1.0, score / 50.0) if score else 0
-        heat_points.append([port.lat, port.lng, intensity])
-    
-    return {
-        "points": heat_points,
-        "from": from_ts.isoformat(),
-        "to": to_ts.isoformat(),
-    }
+    return _respond(request, _cache_key(
+        view, "dashboard", from_ts, to_ts,
+        violation_type=violation_type, severity=severity, inspectors_limit=inspectors_limit,
+    ), build)
 
 
 @router.get("/kpis")
 def get_kpis(
+    request: Request,
     port_id: str = Query(..., description="Port ID"),
-    from_: str = Query(..., alias="from"),
-    to: str = Query(...),
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
 ):
     """Get KPIs for a specific port."""
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    port = get_port_by_id(port_id)
+    port = view.ports_by_id.get(port_id)
     if not port:
         raise HTTPException(
             status_code=404,
             detail={"error": "not_found", "message": f"Port {port_id} not found"}
         )
     
-    all_events = get_all_events()
-    events = _filter_events(
-        all_events,
-        from_ts=from_ts,
-        to_ts=to_ts,
-        port_id=port_id,
-        violation_type=violation_type,
-        severity=severity,
-    )
+    def build():
+        all_events = view.events
+        events = _filter_events(
+            all_events,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            port_id=port_id,
+            violation_type=violation_type,
+            severity=severity,
+        )
     
-    unique_inspectors = _get_unique_inspectors(events)
-    score = compute_risk_score(events)
-    level = risk_level(score)
+        agg = PortAggregate(
+            events,
+            _window_cells(view, from_ts, to_ts, port_id=port_id, violation_type=violation_type, severity=severity),
+        )
+        stats = agg.port(port_id)
+    
+        return {
+            "port_id": port_id,
+            "from": from_ts.isoformat(),
+            "to": to_ts.isoformat(),
+            "risk_score": round(stats.score, 2),
+            "risk_level": risk_level(stats.score),
+            "counts": agg.violations_breakdown(),
+            "total_events": stats.incident_count,
+            "unique_inspectors": stats.unique_inspectors,
+            "last_incident_at": stats.last_incident_at,
+        }
     
-    return {
-        "port_id": port_id,
-        "from": from_ts.isoformat(),
-        "to": to_ts.isoformat(),
-        "risk_score": round(score, 2),
-        "risk_level": level,
-        "counts": _get_violations_breakdown(events),
-        "total_events": len(events),
-        "unique_inspectors": len(unique_inspectors),
-        "last_incident_at": _get_last_incident_at(events),
-    }
+    return _respond(request, _cache_key(view, "kpis", from_ts, to_ts, port_id=port_id, violation_type=violation_type, severity=severity), build)
 
 
 @router.get("/incidents")
 def get_incidents(
+    request: Request,
     port_id: str = Query(..., description="Port ID"),
-    from_: str = Query(..., alias="from"),
-    to: str = Query(...),
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
     violation_type: Optional[str] = Query(None, alias="violationType"),
     severity: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """Get incidents for a port."""
-    from_ts = _parse_dt(from_)
-    to_ts = _parse_dt(to)
-    
-    if from_ts > to_ts:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "invalid_range", "message": "from must be before to"}
-        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    view = get_view()
     
-    port = get_port_by_id(port_id)
+    port = view.ports_by_id.get(port_id)
     if not port:
         raise HTTPException(
             status_code=404,
             detail={"error": "not_found", "message": f"Port {port_id} not found"}
         )
     
-    all_events = get_all_events()
-    events = _filter_events(
-        all_events,
-        from_ts=from_ts,
-        to_ts=to_ts,
-        port_id=port_id,
-        violation_type=violation_type,
-        severity=severity,
-    )
+    def build():
+        all_events = view.events
+        events, next_cursor = _incidents_page(
+            all_events,
+            limit,
+            cursor,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            port_id=port_id,
+            violation_type=violation_type,
+            severity=severity,
+        )
     
-    sorted_events = sorted(events, key=lambda e: e.timestamp, reverse=True)[:limit]
+        return {
+            "port_id": port_id,
+            "from": from_ts.isoformat(),
+            "to": to_ts.isoformat(),
+            "incidents": events.to_records(),
+            "next_cursor": next_cursor,
+        }
     
-    return {
-        "port_id": port_id,
-        "from": from_ts.isoformat(),
-        "to": to_ts.isoformat(),
-        "incidents": [e.model_dump(mode="json") for e in sorted_events],
-    }
+    return _respond(request, _cache_key(
+        view, "incidents", from_ts, to_ts,
+        port_id=port_id, violation_type=violation_type, severity=severity, limit=limit, cursor=cursor,
+    ), build)
+
+
+# =============================================================================
+# GET /api/export - Bulk export of filtered events
+# =============================================================================
+@router.get("/export")
+def export_events(
+    from_: Optional[str] = Query(None, alias="from", description="ISO date"),
+    to: Optional[str] = Query(None, description="ISO date"),
+    window: Optional[str] = Query(None, description="Rolling window instead of from/to: 24h | 7d | 30d"),
+    port_id: Optional[str] = Query(None),
+    violation_type: Optional[str] = Query(None, alias="violationType"),
+    severity: Optional[str] = Query(None),
+    inspector_id: Optional[str] = Query(None),
+    format: str = Query("ndjson", description="csv | ndjson | arrow"),
+):
+    """
+    Stream every event matching the filters, oldest first, as CSV, NDJSON
+    or an Arrow IPC stream. Rows are read and encoded a chunk at a time
+    from one store view, so the export is consistent and memory stays flat.
+    """
+    export_format = FORMATS.get(format)
+    if export_format is None:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_format", "message": f"format must be one of {', '.join(FORMATS)}"}
+        )
+    if format == "arrow" and not arrow_available():
+        raise HTTPException(
+            status_code=501,
+            detail={"error": "arrow_unavailable", "message": "Arrow export needs pyarrow installed on the server"}
+        )
+    from_ts, to_ts = _resolve_range(from_, to, window)
+    events = get_view().events
+    codes = _filter_codes(events, from_ts, to_ts, port_id, violation_type, severity, inspector_id)
+
+    def chunks():
+        # Rows older than the store loaded come first, read from the backend a chunk at a time
+        history = scan_history(events, settings.export_chunk_rows, **codes) or ()
+        for chunk in history:
+            record_scanned(len(chunk))
+            yield chunk
+        for chunk in events.scan(settings.export_chunk_rows, **codes):
+            record_scanned(len(chunk))
+            yield chunk
+
+    return StreamingResponse(
+        export_format.encode(chunks(), events),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="nabeeh-events.{export_format.extension}"'},
+    )
+
+
+# =============================================================================
+# GET /api/cache/stats - Response cache counters
+# =============================================================================
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss/eviction counters for sizing the response cache."""
+    return {**response_cache.stats(), "rolling": rolling_aggregator.stats()}
+
+
+# =============================================================================
+# GET /api/offload/stats - Where responses were computed, and how fast
+# =============================================================================
+@router.get("/offload/stats")
+def get_offload_stats():
+    """Pool state, the offload threshold, and per-route latency of computed responses by placement."""
+    return offloader.stats()
@@ -0,0 +1,117 @@
+"""
+Events API: ingestion of detections.
+A batch is validated as a whole and either accepted in full or rejected;
+a stream is validated line by line and stored as it arrives.
+"""
+from collections import Counter
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+
+from app.config import settings
+from app.data.store import ReadOnlyStoreError, add_events, get_ports_map
+from app.models import ALL_VIOLATION_TYPES, Event, IngestResult
+from app.services.ingest import StreamStats, ingest_writer, ndjson_lines
+
+router = APIRouter(prefix="/api", tags=["events"])
+
+
+def _reject(error: str, message: str, values: List[str]) -> None:
+    raise HTTPException(
+        status_code=422,
+        detail={"error": error, "message": message, "values": values[:20]}
+    )
+
+
+@router.post("/events:batch", response_model=IngestResult)
+def ingest_events(events: List[Event]):
+    """
+    Append a batch of events to the store in one step.
+    Events may arrive out of time order; they are merged into place.
+    """
+    if len(events) > settings.ingest_max_batch:
+        raise HTTPException(
+            status_code=413,
+            detail={"error": "batch_too_large", "message": f"at most {settings.ingest_max_batch} events per batch"}
+        )
+    
+    ports = get_ports_map()
+    unknown_ports = sorted({e.port_id for e in events} - ports.keys())
+    if unknown_ports:
+        _reject("unknown_port", "events reference ports that do not exist", unknown_ports)
+    
+    unknown_types = sorted({e.type for e in events} - ALL_VIOLATION_TYPES)
+    if unknown_types:
+        _reject("unknown_violation_type", "events use types outside the violation taxonomy", unknown_types)
+    
+    duplicates = sorted(event_id for event_id, n in Counter(e.id for e in events).items() if n > 1)
+    if duplicates:
+        _reject("duplicate_id", "event ids must be unique within a batch", duplicates)
+    
+    try:
+        ingested = add_events(events)
+    except ReadOnlyStoreError as e:
+        raise HTTPException(status_code=503, detail={"error": "read_only_worker", "message": str(e)})
+    return IngestResult(accepted=ingested.stored, data_version=ingested.version)
+
+
+def _validation_message(e: ValidationError) -> str:
+    first = e.errors(include_url=False)[0]
+    loc = ".".join(str(part) for part in first["loc"])
+    return f"{loc}: {first['msg']}" if loc else first["msg"]
+
+
+@router.post("/events:stream")
+async def ingest_stream(request: Request):
+    """
+    Ingest newline-delimited JSON events from a (typically chunked) request body.
+    Lines are parsed as they arrive and queued in chunks for the store
+    writer; while the queue is full the body is not read, which slows the
+    client down. Bad lines are rejected individually. Responds once
+    everything accepted is stored, with per-stream counts and throughput.
+    """
+    if not ingest_writer.running:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "ingest_unavailable", "message": "ingest writer is not running"}
+        )
+    
+    ports = get_ports_map()
+    stats = StreamStats()
+    chunk: List[Event] = []
+    line_no = 0
+    async for line in ndjson_lines(request.stream(), settings.ingest_max_line_bytes):
+        line_no += 1
+        if line is None:
+            stats.reject(line_no, "line_too_long")
+            continue
+        if not line.strip():
+            continue
+        try:
+            event = Event.model_validate_json(line)
+        except ValidationError as e:
+            stats.reject(line_no, f"invalid_event: {_validation_message(e)}")
+            continue
+        if event.port_id not in ports:
+            stats.reject(line_no, f"unknown_port: {event.port_id}")
+            continue
+        if event.type not in ALL_VIOLATION_TYPES:
+            stats.reject(line_no, f"unknown_violation_type: {event.type}")
+            continue
+        chunk.append(event)
+        if len(chunk) >= settings.ingest_chunk_size:
+            await ingest_writer.put(chunk, stats)
+            chunk = []
+    
+    if chunk:
+        await ingest_writer.put(chunk, stats)
+    version = await ingest_writer.flush()
+    stats.finish()
+    return stats.summary(version)
+
+
+@router.get("/events:stream")
+def ingest_stream_stats():
+    """Writer queue depth and totals."""
+    return ingest_writer.stats()
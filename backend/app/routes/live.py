@@ -0,0 +1,70 @@
+"""
+Live API: per-port risk updates pushed as Server-Sent Events.
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.services.live import live_hub
+from app.services.rolling import ROLLING_WINDOWS
+
+router = APIRouter(prefix="/api", tags=["live"])
+
+
+@router.get("/live")
+async def live_updates(
+    window: str = Query(..., description="Rolling window: 24h | 7d | 30d"),
+    violation_type: Optional[str] = Query(None, alias="violationType"),
+    severity: Optional[str] = Query(None),
+):
+    """
+    Server-Sent Events stream for a rolling window and filters. The first
+    `snapshot` event carries every port; each `delta` event carries only the
+    ports whose risk_score, incident_count or risk_level changed. Event ids
+    are store data versions. Idle streams get a comment line as keep-alive.
+    """
+    if window not in ROLLING_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_window", "message": f"window must be one of {', '.join(ROLLING_WINDOWS)}"}
+        )
+    if not live_hub.running:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "live_unavailable", "message": "live updates are not running"}
+        )
+
+    key = (window, violation_type, severity)
+
+    async def stream():
+        # Joined only once the response is being sent: a client gone before then never subscribes
+        subscriber = None
+        try:
+            subscriber = await live_hub.subscribe(key)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), settings.live_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            if subscriber is not None:
+                live_hub.unsubscribe(key, subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/live/stats")
+def live_stats():
+    """Open topics and subscribers, and messages fanned out so far."""
+    return live_hub.stats()
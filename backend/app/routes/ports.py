@@ -1,13 +1,14 @@
 """
 Ports API.
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
 from app.data.store import get_all_ports
+from app.services.encoding import dumps
 
 router = APIRouter(prefix="/api", tags=["ports"])
 
 
 @router.get("/ports")
 def list_ports():
-    return [p.model_dump(mode="json") for p in get_all_ports()]
+    return Response(content=dumps(get_all_ports()), media_type="application/json")
@@ -0,0 +1,212 @@
+"""
+Nabeeh aggregation engine.
+Groups a filtered event window by port (or inspector) in a single
+vectorized pass; routes build their responses from the result.
+Counts and scores come from the hourly rollup for whole hours, with
+only the partial edge hours read from raw events (those the store left
+on disk included).
+"""
+from functools import cached_property
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.data.columns import EventTable, from_epoch_us
+from app.data.rollup import HOUR_US, CellTotals, HourlyRollup, concat_cells, group_cells, pack_cells
+from app.data.store import select_with_history
+from app.services.risk import event_contributions
+from app.services.topk import top_k
+
+# Marker for "no incident" in last-timestamp arrays
+NO_TS = np.iinfo(np.int64).min
+
+_PAIR_SHIFT = 32
+
+
+class PortStats(NamedTuple):
+    score: float
+    incident_count: int
+    unique_inspectors: int
+    last_incident_at: Optional[str]
+
+
+class InspectorStats(NamedTuple):
+    id: str
+    score: float
+    incident_count: int
+    last_incident_at: Optional[str]
+
+
+def _iso(ts: int) -> Optional[str]:
+    return None if ts == NO_TS else from_epoch_us(ts).isoformat()
+
+
+def pack_pairs(port: np.ndarray, inspector: np.ndarray) -> np.ndarray:
+    """(port, inspector) code pairs packed into one int64."""
+    return (port.astype(np.int64) << _PAIR_SHIFT) | inspector.astype(np.int64)
+
+
+def raw_cells(events: EventTable) -> CellTotals:
+    """Cell totals straight from raw events."""
+    return group_cells(
+        pack_cells(events.port, events.type, events.severity),
+        np.ones(len(events), dtype=np.int64),
+        event_contributions(events),
+        events.ts,
+    )
+
+
+def window_cells(
+    events: EventTable,
+    rollup: HourlyRollup,
+    from_us: int,
+    to_us: int,
+    **codes: Optional[int],
+) -> CellTotals:
+    """
+    Cell totals for [from_us, to_us] under the given code filters.
+    Whole hours come from the rollup; the partial hours at either edge
+    are aggregated from raw events.
+    """
+    first_hour = -(-from_us // HOUR_US)
+    end_hour = (to_us + 1) // HOUR_US
+    if first_hour >= end_hour:
+        return raw_cells(select_with_history(events, from_us, to_us, **codes))
+    return concat_cells(
+        rollup.totals(first_hour, end_hour, **codes),
+        raw_cells(select_with_history(events, from_us, first_hour * HOUR_US - 1, **codes)),
+        raw_cells(select_with_history(events, end_hour * HOUR_US, to_us, **codes)),
+    )
+
+
+def port_scores(cells: CellTotals, n_ports: int) -> np.ndarray:
+    """Summed risk contribution per port code."""
+    return np.bincount(cells.port, weights=cells.sums, minlength=n_ports)
+
+
+class PortAggregate:
+    """
+    Per-port score, incident count, distinct inspectors and last incident for one window.
+    `events` is the filtered window; `cells` its pre-aggregated totals
+    (derived from `events` when omitted) and `pairs` its distinct packed
+    (port, inspector) pairs. Pairs need raw rows, so when not supplied
+    they are only computed if distinct-inspector counts are asked for;
+    when they are supplied, `events` only provides the dictionaries.
+    """
+
+    def __init__(
+        self,
+        events: EventTable,
+        cells: Optional[CellTotals] = None,
+        pairs: Optional[np.ndarray] = None,
+    ):
+        if cells is None:
+            cells = raw_cells(events)
+        n_ports = len(events.ports)
+        port = cells.port
+        self._events = events
+        self._pairs = pairs
+        self._ports = events.ports
+        self._types = events.types
+        self._severities = events.severities
+
+        self.counts = np.bincount(port, weights=cells.counts, minlength=n_ports).astype(np.int64)
+        self.scores = np.bincount(port, weights=cells.sums, minlength=n_ports)
+        self.last_ts = np.full(n_ports, NO_TS, dtype=np.int64)
+        np.maximum.at(self.last_ts, port, cells.last_ts)
+        self.type_counts = np.bincount(cells.type, weights=cells.counts, minlength=len(events.types)).astype(np.int64)
+        self.severity_counts = np.bincount(
+            cells.severity, weights=cells.counts, minlength=len(events.severities)
+        ).astype(np.int64)
+
+    @cached_property
+    def pairs(self) -> np.ndarray:
+        if self._pairs is None:
+            return np.unique(pack_pairs(self._events.port, self._events.inspector))
+        return self._pairs
+
+    @cached_property
+    def inspector_counts(self) -> np.ndarray:
+        """Distinct inspectors per port, from distinct (port, inspector) pairs."""
+        return np.bincount(self.pairs >> _PAIR_SHIFT, minlength=len(self.counts))
+
+    @cached_property
+    def total_inspectors(self) -> int:
+        return len(np.unique(self.pairs & 0xFFFFFFFF))
+
+    def port(self, port_id: str) -> PortStats:
+        code = self._ports.lookup(port_id)
+        if code < 0 or code >= len(self.counts):
+            return PortStats(0.0, 0, 0, None)
+        return PortStats(
+            score=float(self.scores[code]),
+            incident_count=int(self.counts[code]),
+            unique_inspectors=int(self.inspector_counts[code]),
+            last_incident_at=_iso(int(self.last_ts[code])),
+        )
+
+    @property
+    def total_score(self) -> float:
+        return float(self.scores.sum())
+
+    @property
+    def total_incidents(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def ports_affected(self) -> int:
+        return int(np.count_nonzero(self.counts))
+
+    @property
+    def last_incident_at(self) -> Optional[str]:
+        return _iso(int(self.last_ts.max())) if len(self.last_ts) else None
+
+    def violations_breakdown(self) -> dict:
+        return {self._types.decode(c): int(n) for c, n in enumerate(self.type_counts.tolist()) if n}
+
+    def severity_breakdown(self) -> dict:
+        counts = {"LOW": 0, "MEDIUM": 0, "HIGH": 0}
+        counts.update({self._severities.decode(c): int(n) for c, n in enumerate(self.severity_counts.tolist()) if n})
+        return counts
+
+
+def aggregate_by_inspector(
+    events: EventTable,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[int, int, str]] = None,
+) -> List[InspectorStats]:
+    """
+    Per-inspector score and incident count, ordered by incident count then
+    recency, then inspector id. Groups are counted straight off the dense
+    inspector codes and only the `limit` leaders are ranked. `after` is an
+    (incident count, last timestamp, inspector id) key: only inspectors
+    ranked below it are returned.
+    """
+    n_codes = len(events.inspectors)
+    counts = np.bincount(events.inspector, minlength=n_codes)
+    last = np.full(n_codes, NO_TS, dtype=np.int64)
+    np.maximum.at(last, events.inspector, events.ts)
+    keep = counts > 0
+    if after is not None:
+        count, last_ts, inspector_id = after
+        tied = (counts == count) & (last == last_ts)
+        keep &= (counts < count) | ((counts == count) & (last < last_ts)) | tied
+        # Codes follow first-seen order, which differs between processes; ids do not
+        for code in np.flatnonzero(tied):
+            keep[code] = events.inspectors.decode(int(code)) > inspector_id
+    codes = np.flatnonzero(keep)
+    counts = counts[codes]
+    last = last[codes]
+    scores = np.bincount(events.inspector, weights=event_contributions(events), minlength=n_codes)[codes]
+    # Negated so top_k, which ranks descending, puts the smallest id first
+    id_rank = -events.inspectors.sort_ranks()[codes]
+
+    return [
+        InspectorStats(
+            id=events.inspectors.decode(int(codes[k])),
+            score=float(scores[k]),
+            incident_count=int(counts[k]),
+            last_incident_at=_iso(int(last[k])),
+        )
+        for k in top_k((counts, last, id_rank), limit)
+    ]
@@ -0,0 +1,78 @@
+"""
+Nabeeh response encoding.
+Analytics handlers build plain dicts and lists, which are encoded straight
+to bytes with orjson (stdlib json when orjson is not installed); the
+response_model on each route only documents the schema. Static per-port
+fields are pre-encoded once as fragments and spliced into responses.
+"""
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.models import Port
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# Leading fields shared by PortSummary and PortDetail, in schema order
+PORT_FIELDS = ("id", "name_ar", "name_en", "lat", "lng")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON (orjson writes NaN as null where the stdlib path raises)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+# port id -> (port it was encoded from, fragment)
+_port_fragments: Dict[str, Tuple[Port, bytes]] = {}
+
+
+def port_fragment(port: Port) -> bytes:
+    """
+    `{"id":..,"name_ar":..,"name_en":..,"lat":..,"lng":..` without the
+    closing brace, encoded once per Port object.
+    """
+    cached = _port_fragments.get(port.id)
+    if cached is None or cached[0] is not port:
+        cached = _port_fragments[port.id] = (port, dumps({f: getattr(port, f) for f in PORT_FIELDS})[:-1])
+    return cached[1]
+
+
+def with_port(port: Port, fields: Dict[str, Any]) -> bytes:
+    """One object: the port's static fields followed by `fields`."""
+    rest = dumps(fields)
+    return port_fragment(port) + (b"," + rest[1:] if len(rest) > 2 else b"}")
+
+
+def join_array(items) -> bytes:
+    """JSON array from already-encoded items."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def join_object(members: Dict[str, bytes]) -> bytes:
+    """JSON object from already-encoded member values."""
+    return b"{" + b",".join(dumps(key) + b":" + value for key, value in members.items()) + b"}"
@@ -0,0 +1,118 @@
+"""
+Nabeeh bulk export.
+Filtered events are streamed as CSV, NDJSON or an Arrow IPC stream, one
+chunk of the event table at a time, so server memory is bounded by the
+chunk size rather than the number of rows exported. Columns follow the
+Event model. Arrow needs pyarrow (in requirements.txt), which is imported
+only when an Arrow export is requested.
+"""
+import csv
+import io
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple
+
+import numpy as np
+
+from app.data.columns import CONFIDENCE_DECIMALS, NULL_CODE, EventTable
+from app.services.encoding import dumps
+
+# Event model fields, in order
+FIELDS = (
+    "id", "port_id", "inspector_id", "timestamp", "source", "type", "severity", "confidence", "short_description",
+)
+
+
+def to_csv(chunks: Iterable[EventTable]) -> Iterator[bytes]:
+    """CSV with a header row; a missing short_description is an empty field."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for chunk in chunks:
+        writer.writerows([record[f] for f in FIELDS] for record in chunk.to_records())
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def to_ndjson(chunks: Iterable[EventTable]) -> Iterator[bytes]:
+    """One JSON event per line, as /api/incidents encodes them."""
+    for chunk in chunks:
+        yield b"".join(dumps(record) + b"\n" for record in chunk.to_records())
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def to_arrow(chunks: Iterable[EventTable], events: EventTable) -> Iterator[bytes]:
+    """
+    Arrow IPC stream, one record batch per chunk. Code columns go out as
+    dictionary arrays over the table's dictionaries as they stand when the
+    export starts, which covers every row of the (immutable) view; the
+    timestamp is microseconds since the epoch, UTC.
+    """
+    import pyarrow as pa
+
+    dictionaries = {
+        name: pa.array(list(getattr(events, attr).values), type=pa.string())
+        for name, attr in (
+            ("port_id", "ports"), ("inspector_id", "inspectors"), ("source", "sources"),
+            ("type", "types"), ("severity", "severities"), ("short_description", "descriptions"),
+        )
+    }
+    codes = {
+        "port_id": "port", "inspector_id": "inspector", "source": "source",
+        "type": "type", "severity": "severity", "short_description": "description",
+    }
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("port_id", pa.dictionary(pa.int32(), pa.string())),
+        ("inspector_id", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("type", pa.dictionary(pa.int32(), pa.string())),
+        ("severity", pa.dictionary(pa.int32(), pa.string())),
+        ("confidence", pa.float64()),
+        ("short_description", pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+    def column(chunk: EventTable, field: str):
+        if field == "id":
+            return pa.array(chunk.ids).cast(pa.string())
+        if field == "timestamp":
+            return pa.array(chunk.ts, type=pa.timestamp("us", tz="UTC"))
+        if field == "confidence":
+            return pa.array(np.round(chunk.confidence.astype(np.float64), CONFIDENCE_DECIMALS))
+        values = getattr(chunk, codes[field]).astype(np.int32)
+        missing = values == NULL_CODE
+        return pa.DictionaryArray.from_arrays(
+            pa.array(values, type=pa.int32(), mask=missing if missing.any() else None),
+            dictionaries[field],
+        )
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.record_batch([column(chunk, f) for f in FIELDS], schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    encode: Callable[[Iterable[EventTable], EventTable], Iterator[bytes]]
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("text/csv; charset=utf-8", "csv", lambda chunks, events: to_csv(chunks)),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", lambda chunks, events: to_ndjson(chunks)),
+    "arrow": ExportFormat("application/vnd.apache.arrow.stream", "arrows", to_arrow),
+}
@@ -0,0 +1,145 @@
+"""
+Nabeeh streaming ingest.
+Streams hand validated chunks to a bounded queue drained by one writer
+task; a full queue makes producers wait, so a slow writer throttles the
+clients feeding it instead of growing memory.
+"""
+import asyncio
+import time
+from typing import AsyncIterator, List, NamedTuple, Optional, Union
+
+from app.config import settings
+from app.data.store import add_events, get_data_version
+from app.models import Event
+
+
+class StreamStats:
+    """
+    Per-stream counters. `accepted` counts events the writer has stored,
+    which leaves out events the store already held (a resent stream).
+    """
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    def reject(self, line: Optional[int], error: str, keep: int = 20) -> None:
+        self.rejected += 1
+        if len(self.errors) < keep:
+            self.errors.append({"line": line, "error": error})
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    def summary(self, data_version: int) -> dict:
+        seconds = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "events_per_second": round(self.accepted / seconds, 1) if seconds > 0 else 0.0,
+            "data_version": data_version,
+        }
+
+
+class _Chunk(NamedTuple):
+    events: List[Event]
+    stats: StreamStats
+
+
+class IngestWriter:
+    """Single writer draining a bounded queue of chunks into the store."""
+
+    def __init__(self, max_chunks: int):
+        self.max_chunks = max_chunks
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.chunks_written = 0
+        self.events_written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the writer on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_chunks)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Drain what is queued, then stop."""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, events: List[Event], stats: StreamStats) -> None:
+        """Queue a chunk; waits while the queue is full."""
+        await self._queue.put(_Chunk(events, stats))
+
+    async def flush(self) -> int:
+        """Wait until everything queued before this call is stored; returns the data version."""
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(done)
+        return await done
+
+    async def _run(self) -> None:
+        while True:
+            item: Union[_Chunk, asyncio.Future, None] = await self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, asyncio.Future):
+                item.set_result(get_data_version())
+                continue
+            try:
+                ingested = await asyncio.to_thread(add_events, item.events)
+            except Exception as e:  # keep draining; the stream reports the loss
+                item.stats.rejected += len(item.events)
+                item.stats.errors.append({"line": None, "error": f"write_failed: {e}"})
+                continue
+            item.stats.accepted += ingested.stored
+            self.chunks_written += 1
+            self.events_written += ingested.stored
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued_chunks": self._queue.qsize() if self._queue else 0,
+            "max_chunks": self.max_chunks,
+            "chunks_written": self.chunks_written,
+            "events_written": self.events_written,
+        }
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into lines as chunks arrive (one item per line,
+    blank lines included so callers can number them). Lines longer than
+    max_line_bytes are yielded as None and their bytes dropped.
+    """
+    pending = b""
+    oversized = False
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if oversized or len(line) > max_line_bytes:
+                oversized = False
+                yield None
+            else:
+                yield line
+        if len(pending) > max_line_bytes:
+            pending = b""
+            oversized = True
+    if oversized:
+        yield None
+    elif pending:
+        yield pending
+
+
+ingest_writer = IngestWriter(max_chunks=settings.ingest_queue_chunks)
@@ -0,0 +1,194 @@
+"""
+Nabeeh live updates.
+Dashboards subscribe to a rolling window plus filters and receive per-port
+deltas as Server-Sent Events. Subscribers with identical filters share one
+topic: the hub recomputes each topic once per store version (through the
+rolling aggregator, so a step costs only the events that entered or left
+the window), encodes the delta once and hands the same bytes to every
+subscriber queue. A port is only sent when its rounded score, incident
+count or risk level changed.
+
+A subscriber that falls `live_queue_messages` behind is disconnected
+rather than buffered; EventSource reconnects and starts from a fresh
+snapshot.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+from app.config import settings
+from app.data.store import StoreView, get_view
+from app.services.encoding import dumps
+from app.services.risk import risk_level
+from app.services.rolling import resolve_window, rolling_aggregator
+
+logger = logging.getLogger(__name__)
+
+# (window, violation type, severity)
+TopicKey = Tuple[str, Optional[str], Optional[str]]
+# port id -> (risk score, incident count, risk level) as last sent
+PortState = Dict[str, Tuple[float, int, str]]
+
+
+def sse_message(event: str, data: bytes, event_id: Optional[int] = None) -> bytes:
+    """One Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + data + b"\n\n"
+
+
+class Subscriber:
+    """One open stream: a bounded queue of encoded messages."""
+
+    def __init__(self, max_messages: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_messages)
+        self.dropped = False
+
+    def offer(self, message: bytes) -> None:
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream instead of buffering
+            self.dropped = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class _Topic:
+    def __init__(self, key: TopicKey):
+        self.key = key
+        self.subscribers: Set[Subscriber] = set()
+        self.ports: Optional[PortState] = None
+        self.version: Optional[int] = None
+        self.to_us: Optional[int] = None
+
+
+class LiveHub:
+    """Shared fan-out of per-port deltas, one topic per distinct filter set."""
+
+    def __init__(self, poll_seconds: float, max_messages: int):
+        self.poll_seconds = poll_seconds
+        self.max_messages = max_messages
+        self._topics: Dict[TopicKey, _Topic] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Serializes topic refreshes between the poller and new subscribers
+        self._refreshing = asyncio.Lock()
+        self.messages_sent = 0
+        self.computes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling for new versions on the running event loop."""
+        self._refreshing = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def subscribe(self, key: TopicKey) -> Subscriber:
+        """
+        Join the topic for `key`; the subscriber's first message is a
+        snapshot of every port, later ones are deltas.
+        """
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = _Topic(key)
+        if topic.ports is None:
+            await self._refresh(topic)
+        subscriber = Subscriber(self.max_messages)
+        topic.subscribers.add(subscriber)
+        subscriber.offer(sse_message("snapshot", _encode(topic.version, topic.ports), topic.version))
+        return subscriber
+
+    def unsubscribe(self, key: TopicKey, subscriber: Subscriber) -> None:
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+        topic.subscribers.discard(subscriber)
+        if not topic.subscribers:
+            del self._topics[key]
+
+    async def publish(self) -> None:
+        """Recompute every topic whose window or store version moved and fan out the deltas."""
+        for topic in list(self._topics.values()):
+            if not topic.subscribers:
+                continue
+            changed = await self._refresh(topic)
+            if changed:
+                message = sse_message("delta", _encode(topic.version, changed), topic.version)
+                for subscriber in list(topic.subscribers):
+                    subscriber.offer(message)
+                self.messages_sent += len(topic.subscribers)
+
+    async def _refresh(self, topic: _Topic) -> PortState:
+        """Bring the topic up to date; returns the ports whose state changed."""
+        async with self._refreshing:
+            view = get_view()
+            from_us, to_us = resolve_window(topic.key[0])
+            if topic.version == view.version and topic.to_us == to_us:
+                return {}
+            ports = await asyncio.to_thread(_port_states, view, topic.key, from_us, to_us)
+            self.computes += 1
+            previous = topic.ports or {}
+            changed = {port_id: state for port_id, state in ports.items() if previous.get(port_id) != state}
+            topic.ports, topic.version, topic.to_us = ports, view.version, to_us
+            return changed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.publish()
+            except Exception:  # keep serving; the next poll retries
+                logger.exception("live update failed")
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(t.subscribers) for t in self._topics.values()),
+            "messages_sent": self.messages_sent,
+            "computes": self.computes,
+        }
+
+
+def _port_states(view: StoreView, key: TopicKey, from_us: int, to_us: int) -> PortState:
+    """Per-port state for the topic's window, shared with /api/ports?window=... polls."""
+    _, violation_type, severity = key
+    events = view.events
+    agg = rolling_aggregator.aggregate(
+        view,
+        to_us - from_us,
+        to_us,
+        type=events.types.lookup(violation_type) if violation_type else None,
+        severity=events.severities.lookup(severity) if severity else None,
+    )
+    states = {}
+    for port in view.ports:
+        stats = agg.port(port.id)
+        score = round(stats.score, 2)
+        states[port.id] = (score, stats.incident_count, risk_level(stats.score))
+    return states
+
+
+def _encode(version: Optional[int], ports: PortState) -> bytes:
+    return dumps({
+        "data_version": version,
+        "ports": [
+            {"id": port_id, "risk_score": score, "incident_count": count, "risk_level": level}
+            for port_id, (score, count, level) in ports.items()
+        ],
+    })
+
+
+live_hub = LiveHub(settings.live_poll_seconds, settings.live_queue_messages)
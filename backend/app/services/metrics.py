@@ -0,0 +1,276 @@
+"""
+Nabeeh request instrumentation.
+MetricsMiddleware gives every HTTP request a timing record in a context
+variable; code on the request path wraps its stages in `stage(name)` and
+reports rows it read with `record_scanned(n)`. The middleware turns the
+record into a Server-Timing header and folds it into process-wide
+counters, which `render_metrics()` exposes in the Prometheus text format.
+
+Outside a request `stage` and `record_scanned` do nothing; a pool process
+collects them with `collect_timings` and the request folds them in with
+`record_timings` (see app.services.offload). Stages may nest
+(e.g. "filter" runs inside "compute"), so their durations are not additive.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Request latency buckets, seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestTimings:
+    """
+    Stage durations (seconds, summed per name) and rows scanned for one
+    request, and where its response was computed, if it was.
+    """
+    __slots__ = ("stages", "scanned", "placement")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.scanned = 0
+        self.placement: Optional[str] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("nabeeh_request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as stage `name` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_scanned(rows: int) -> None:
+    """Count event rows read while serving the current request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.scanned += rows
+
+
+@contextmanager
+def collect_timings() -> Iterator[RequestTimings]:
+    """
+    Record the stages and rows scanned of the enclosed block in a record of
+    its own, for a block run outside any request (a build in a pool process)
+    whose counters are handed back to the request with `record_timings`.
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record_timings(stages: Dict[str, float], scanned: int) -> None:
+    """Fold stage durations and rows scanned recorded elsewhere into the current request."""
+    timings = _current.get()
+    if timings is not None:
+        for name, spent in stages.items():
+            timings.add(name, spent)
+        timings.scanned += scanned
+
+
+def record_placement(placement: str) -> None:
+    """Note where the current request's response was computed (see app.services.offload)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.placement = placement
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide request metrics. Only the middleware writes them, from the
+    event loop thread, so updates need no lock.
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.stage_seconds: Dict[Tuple[str, str], float] = {}
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.scanned: Dict[str, int] = {}
+        self.placement_latency: Dict[Tuple[str, str], Histogram] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[str, float]]]] = []
+
+    def observe(self, route: str, method: str, status: int, seconds: float, timings: RequestTimings) -> None:
+        key = (route, method)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(seconds)
+        self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+        if timings.scanned:
+            self.scanned[route] = self.scanned.get(route, 0) + timings.scanned
+        for name, spent in timings.stages.items():
+            self.stage_seconds[(route, name)] = self.stage_seconds.get((route, name), 0.0) + spent
+        if timings.placement:
+            key = (route, timings.placement)
+            histogram = self.placement_latency.get(key)
+            if histogram is None:
+                histogram = self.placement_latency[key] = Histogram()
+            histogram.observe(seconds)
+
+    def placement_stats(self) -> Dict[str, Dict[str, dict]]:
+        """Count and mean latency of computed (uncached) requests, by route and placement."""
+        stats: Dict[str, Dict[str, dict]] = {}
+        for (route, placement), h in sorted(self.placement_latency.items()):
+            stats.setdefault(route, {})[placement] = {
+                "count": h.count,
+                "mean_ms": round(h.total / h.count * 1000, 3),
+            }
+        return stats
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Dict[str, float]]) -> None:
+        """
+        Register gauges read at scrape time. `read` returns {label value: value};
+        the label is "" for an unlabelled gauge, otherwise it is exported as `kind`.
+        """
+        self._gauges.append((name, help_text, read))
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.stage_seconds.clear()
+        self.requests.clear()
+        self.scanned.clear()
+        self.placement_latency.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = [
+            "# HELP nabeeh_request_duration_seconds Request latency by route.",
+            "# TYPE nabeeh_request_duration_seconds histogram",
+        ]
+        for (route, method), h in sorted(self.latency.items()):
+            lines += _histogram_lines("nabeeh_request_duration_seconds", f'route="{_escape(route)}",method="{method}"', h)
+
+        lines += [
+            "# HELP nabeeh_requests_total Requests by route and status.",
+            "# TYPE nabeeh_requests_total counter",
+        ]
+        for (route, method, status), n in sorted(self.requests.items()):
+            lines.append(f'nabeeh_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {n}')
+
+        lines += [
+            "# HELP nabeeh_stage_seconds_total Time spent per request stage (stages may nest).",
+            "# TYPE nabeeh_stage_seconds_total counter",
+        ]
+        for (route, name), spent in sorted(self.stage_seconds.items()):
+            lines.append(f'nabeeh_stage_seconds_total{{route="{_escape(route)}",stage="{name}"}} {spent:.6f}')
+
+        lines += [
+            "# HELP nabeeh_events_scanned_total Event rows read to answer requests.",
+            "# TYPE nabeeh_events_scanned_total counter",
+        ]
+        for route, n in sorted(self.scanned.items()):
+            lines.append(f'nabeeh_events_scanned_total{{route="{_escape(route)}"}} {n}')
+
+        lines += [
+            "# HELP nabeeh_computed_request_duration_seconds Latency of requests that computed their response, by where.",
+            "# TYPE nabeeh_computed_request_duration_seconds histogram",
+        ]
+        for (route, placement), h in sorted(self.placement_latency.items()):
+            labels = f'route="{_escape(route)}",placement="{placement}"'
+            lines += _histogram_lines("nabeeh_computed_request_duration_seconds", labels, h)
+
+        for name, help_text, read in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for label, value in read().items():
+                lines.append(f'{name}{{kind="{label}"}} {value}' if label else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, labels: str, h: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(LATENCY_BUCKETS, h.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+    lines.append(f"{name}_sum{{{labels}}} {h.total:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    parts = [f"{name};dur={spent * 1000:.2f}" for name, spent in timings.stages.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: opens a RequestTimings for each HTTP request, adds the
+    Server-Timing header and records the request under its route template
+    (e.g. /api/ports/{port_id}/details) so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.metrics.observe(
+                getattr(route, "path", "unmatched"),
+                scope["method"],
+                status,
+                time.perf_counter() - start,
+                timings,
+            )
+
+
+metrics = Metrics()
@@ -0,0 +1,182 @@
+"""
+Nabeeh compute offload.
+Analytics builds run in Starlette's threadpool, so a build that spends a
+long time in Python (a large window without a port filter) holds the GIL
+and stalls every other request on the worker. Builds expected to read at
+least `offload_min_rows` event rows go to a pool of processes instead;
+each attaches the shared store (app.data.shared) read-only, so the pool
+costs no extra copy of the data. Cheaper builds stay inline, where they
+cost less than a round trip to the pool.
+
+A pool process only computes against the version the request read. If it
+cannot attach that version (the writer has not published it yet), the
+build runs inline. Responses are encoded in the pool process and come back
+as bytes, with the stage timings and rows scanned the build recorded there,
+which are added to the request's own.
+
+Every computed response is recorded with where it ran (inline, process,
+or fallback when the pool could not take it) in per-route latency
+histograms, so the threshold can be tuned from /metrics or
+/api/offload/stats.
+"""
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.data.shared import SharedStore
+from app.data.store import StoreView, get_view
+from app.services.encoding import dumps
+from app.services.metrics import collect_timings, metrics, record_placement, record_timings
+
+logger = logging.getLogger(__name__)
+
+INLINE = "inline"
+PROCESS = "process"
+FALLBACK = "fallback"
+
+# A route's response builder: build(view, *args) -> JSON-ready data or encoded bytes
+Build = Callable[..., Any]
+
+# Modules the builds sent to the pool are defined in; a pool process imports them when it starts
+_BUILD_MODULES = ("app.routes.analytics",)
+
+
+class _Failed(NamedTuple):
+    """An HTTPException raised in a pool process (HTTPException itself does not pickle)."""
+    status_code: int
+    detail: Any
+
+
+class _Built(NamedTuple):
+    """A pool process's encoded response (or failure) and the counters its build recorded."""
+    result: Any
+    stages: Dict[str, float]
+    scanned: int
+
+
+# Pool process side: the store this process attached
+_attached: Optional[SharedStore] = None
+
+
+def _init_process(directory: str) -> None:
+    global _attached
+    _attached = SharedStore(directory, publish_seconds=0, attach_timeout_seconds=0)
+    _attached.refresh()
+
+
+def _warm_up() -> int:
+    """
+    Load what a first build would: the modules builds come from (and the
+    services they import), then the store version attached; returns it.
+    """
+    for module in _BUILD_MODULES:
+        importlib.import_module(module)
+    return get_view().version
+
+
+def _build_in_process(version: int, build: Build, args: tuple) -> Optional[_Built]:
+    """Encoded response for store `version`, or None when this process cannot read that version."""
+    if _attached.version != version:
+        _attached.refresh()
+    view = get_view()
+    if view.version != version:
+        return None
+    with collect_timings() as timings:
+        try:
+            result = build(view, *args)
+        except HTTPException as exc:
+            result = _Failed(exc.status_code, exc.detail)
+        else:
+            result = result if isinstance(result, bytes) else dumps(result)
+    return _Built(result, timings.stages, timings.scanned)
+
+
+class Offloader:
+    """Runs expensive builds in a process pool and cheap ones inline."""
+
+    def __init__(self, workers: int, min_rows: int):
+        self.workers = workers
+        self.min_rows = min_rows
+        self._directory: Optional[str] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self, directory: Optional[str]) -> None:
+        """Start the pool over the store shared through `directory`; without one every build runs inline."""
+        if self.workers <= 0:
+            return
+        if not directory:
+            logger.warning("offload needs a shared store (shared_dir); computing inline")
+            return
+        self._directory = directory
+        self._start_pool()
+
+    def _start_pool(self) -> None:
+        # Spawned, not forked: a fork would inherit the writer lock and the event loop's threads
+        self._pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(self._directory,),
+        )
+        # Spawn, attach and import in every process now rather than on the first heavy requests
+        for _ in range(self.workers):
+            self._pool.submit(_warm_up).add_done_callback(_log_warm_up)
+
+    def stop(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def run(self, view: StoreView, rows: int, build: Build, *args: Any) -> Any:
+        """
+        `build(view, *args)`, in a pool process when it is expected to read
+        at least `min_rows` event rows. Blocks the calling thread without
+        holding the GIL while the pool computes.
+        """
+        if self._pool is None or rows < self.min_rows:
+            record_placement(INLINE)
+            return build(view, *args)
+        try:
+            result = self._pool.submit(_build_in_process, view.version, build, args).result()
+        except BrokenProcessPool:
+            logger.exception("offload pool broke; restarting it")
+            self._start_pool()
+            result = None
+        if result is None:
+            record_placement(FALLBACK)
+            return build(view, *args)
+        record_placement(PROCESS)
+        record_timings(result.stages, result.scanned)
+        if isinstance(result.result, _Failed):
+            raise HTTPException(status_code=result.result.status_code, detail=result.result.detail)
+        return result.result
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers if self.running else 0,
+            "min_rows": self.min_rows,
+            "routes": metrics.placement_stats(),
+        }
+
+
+def _log_warm_up(future) -> None:
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error("offload process failed to start", exc_info=future.exception())
+    else:
+        logger.info("offload process ready at store version %d", future.result())
+
+
+offloader = Offloader(settings.offload_workers, settings.offload_min_rows)
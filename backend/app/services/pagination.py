@@ -0,0 +1,112 @@
+"""
+Nabeeh keyset pagination.
+Listings page by the sort key of the last row served rather than by offset,
+so a page costs the same wherever it falls and rows ingested meanwhile
+neither shift nor repeat pages. Cursors are opaque to clients: the key,
+tagged with the listing it belongs to, as unpadded base64url JSON.
+
+- incidents: newest first, ordered by (timestamp, event id) descending
+- inspectors: ordered by (incident count, last incident) descending, then
+  by inspector id ascending, as `aggregate_by_inspector` ranks them; the
+  key holds no dictionary codes, so a cursor reads the same in every
+  worker process
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.data.columns import EventTable, to_epoch_us
+from app.services.aggregate import InspectorStats, aggregate_by_inspector
+
+INCIDENTS = "incidents"
+INSPECTORS = "inspectors"
+
+
+class CursorError(ValueError):
+    """A cursor that is malformed or belongs to another listing."""
+
+
+def encode_cursor(kind: str, *key) -> str:
+    raw = json.dumps([kind, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, kind: str, types: Tuple[type, ...]) -> tuple:
+    """The key in a cursor for listing `kind`, checked against `types`."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        tag, *key = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise CursorError("cursor is not valid") from exc
+    if tag != kind or len(key) != len(types) or not all(
+        type(value) is expected for value, expected in zip(key, types)
+    ):
+        raise CursorError(f"cursor is not a {kind} cursor")
+    return tuple(key)
+
+
+def incidents_page(
+    events: EventTable,
+    limit: int,
+    cursor: Optional[str] = None,
+    from_us: Optional[int] = None,
+    to_us: Optional[int] = None,
+    **codes: Optional[int],
+) -> Tuple[EventTable, Optional[str]]:
+    """
+    Up to `limit` matching events after `cursor`, newest first, and the
+    cursor for the next page (None on the last one). Rows come off the time
+    order via `EventTable.latest_rows`; only events sharing a timestamp with a
+    page edge are read beyond the page itself.
+    """
+    parts = []
+    if cursor is not None:
+        after_ts, after_id = decode_cursor(cursor, INCIDENTS, (int, str))
+        # Remainder of the timestamp the previous page stopped in
+        ties = _rows_at(events, after_ts, from_us, to_us, codes)
+        parts.append(ties[events.take(ties).ids < after_id.encode()])
+        to_us = after_ts - 1 if to_us is None else min(to_us, after_ts - 1)
+    older = events.latest_rows(limit + 1, from_us, to_us, **codes)
+    if len(older):
+        # Complete the oldest timestamp read so ties order by id, not position
+        older_ts = events.take(older).ts
+        edge = int(older_ts[-1])
+        parts += [older[older_ts > edge], _rows_at(events, edge, from_us, to_us, codes)]
+
+    rows = np.concatenate(parts) if parts else older
+    found = events.take(rows)
+    order = np.lexsort((found.ids, found.ts))[::-1]
+    if len(rows) <= limit:
+        return found.take(order), None
+    page = found.take(order[:limit])
+    return page, encode_cursor(INCIDENTS, int(page.ts[-1]), page.ids[-1].decode())
+
+
+def _rows_at(events: EventTable, ts: int, from_us: Optional[int], to_us: Optional[int], codes: dict) -> np.ndarray:
+    """Positions of matching rows stamped exactly `ts`, if it lies in the window."""
+    if (from_us is not None and ts < from_us) or (to_us is not None and ts > to_us):
+        return np.arange(0)
+    return events.latest_rows(events.scan_size(ts, ts, **codes), ts, ts, **codes)
+
+
+def inspectors_page(
+    events: EventTable,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[InspectorStats], Optional[str]]:
+    """Up to `limit` inspectors ranked after `cursor`, and the next page's cursor."""
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor, INSPECTORS, (int, int, str))
+    ranked = aggregate_by_inspector(events, limit=limit + 1, after=after)
+    if len(ranked) <= limit:
+        return ranked, None
+    ranked = ranked[:limit]
+    last = ranked[-1]
+    return ranked, encode_cursor(
+        INSPECTORS, last.incident_count, to_epoch_us(datetime.fromisoformat(last.last_incident_at)), last.id,
+    )
@@ -3,8 +3,12 @@ Nabeeh risk and KPI logic.
 All weights, severity multipliers, and thresholds live here.
 Domain logic is separate from UI; safe against requirement changes.
 """
-from typing import Dict
+import zlib
+from typing import Dict, Iterable, Tuple, Union
 
+import numpy as np
+
+from app.data.columns import CONFIDENCE_DECIMALS, EventTable
 from app.models import Event, Severity
 
 # -----------------------------------------------------------------------------
@@ -44,8 +48,45 @@ def event_contribution(event: Event) -> float:
     return w * m * event.confidence
 
 
-def compute_risk_score(events: list[Event]) -> float:
+def weights_version() -> int:
+    """
+    Fingerprint of the weight tables. Stored contribution columns are
+    tagged with it and rebuilt when it changes.
+    """
+    table = (
+        sorted(VIOLATION_WEIGHTS.items()),
+        sorted((s.value, m) for s, m in SEVERITY_MULTIPLIERS.items()),
+    )
+    return zlib.crc32(repr(table).encode())
+
+
+def weight_tables() -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Violation weights and severity multipliers keyed by their string values."""
+    return dict(VIOLATION_WEIGHTS), {s.value: m for s, m in SEVERITY_MULTIPLIERS.items()}
+
+
+def compute_contributions(events: EventTable) -> np.ndarray:
+    """Vectorized event_contribution over a column table."""
+    weights = np.array([VIOLATION_WEIGHTS.get(t, 1.0) for t in events.types.values], dtype=np.float64)
+    multipliers = np.array(
+        [SEVERITY_MULTIPLIERS.get(Severity(s), 0.3) for s in events.severities.values],
+        dtype=np.float64,
+    )
+    confidence = np.round(events.confidence.astype(np.float64), CONFIDENCE_DECIMALS)
+    return weights[events.type] * multipliers[events.severity] * confidence
+
+
+def event_contributions(events: EventTable) -> np.ndarray:
+    """Per-event contributions: the precomputed column when its weights are current."""
+    if events.contribution_version == weights_version():
+        return events.contribution
+    return compute_contributions(events)
+
+
+def compute_risk_score(events: Union[EventTable, Iterable[Event]]) -> float:
     """Sum contributions of all events to get raw risk score."""
+    if isinstance(events, EventTable):
+        return float(event_contributions(events).sum())
     return sum(event_contribution(e) for e in events)
 
 
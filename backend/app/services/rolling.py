@@ -0,0 +1,160 @@
+"""
+Nabeeh rolling windows.
+`?window=24h|7d|30d` resolves to [now - window, now] with "now" snapped
+down to a configurable granularity, so polls within one step share a
+window (and a cache entry). Per window + filter set, the last aggregate
+is kept and advanced by adding the events that entered and subtracting
+those that aged out, instead of being recomputed on every poll.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.data.columns import EventTable
+from app.data.rollup import CellTotals, concat_cells
+from app.data.rollup import HourlyRollup
+from app.data.store import StoreView, get_earliest_write_since, select_with_history
+from app.services.aggregate import PortAggregate, pack_pairs, raw_cells, window_cells
+
+ROLLING_WINDOWS: Dict[str, timedelta] = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+# Incremental sums drift slightly; recompute from scratch every so often
+MAX_INCREMENTAL_STEPS = 500
+
+
+def snapped_now_us(granularity_seconds: Optional[int] = None) -> int:
+    """Current time in epoch microseconds, floored to the window granularity."""
+    step = (granularity_seconds or settings.window_granularity_seconds) * 1_000_000
+    return (time.time_ns() // 1000) // step * step
+
+
+class _WindowState:
+    """Aggregate of one filtered window: cell totals plus (port, inspector) pair counts."""
+
+    def __init__(self, from_us: int, to_us: int, version: int, cells: CellTotals, pairs: Dict[int, int]):
+        self.from_us = from_us
+        self.to_us = to_us
+        self.version = version
+        self.cells = cells
+        self.pairs = pairs
+        self.steps = 0
+
+
+def _pair_counts(events: EventTable) -> Dict[int, int]:
+    keys, counts = np.unique(pack_pairs(events.port, events.inspector), return_counts=True)
+    return dict(zip(keys.tolist(), counts.tolist()))
+
+
+def _negate(cells: CellTotals) -> CellTotals:
+    return CellTotals(cells.cells, -cells.counts, -cells.sums, cells.last_ts)
+
+
+class RollingAggregator:
+    """Keeps the latest aggregate per (window, filters) and advances it by edge deltas."""
+
+    def __init__(self, max_states: int = 64):
+        self.max_states = max_states
+        self._states: "OrderedDict[Hashable, _WindowState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_computes = 0
+        self.incremental_steps = 0
+
+    def aggregate(self, view: StoreView, window_us: int, to_us: int, **codes: Optional[int]) -> PortAggregate:
+        """PortAggregate of `view` for [to_us - window_us, to_us] under the given code filters."""
+        key = (window_us, tuple(sorted(codes.items())))
+        from_us = to_us - window_us
+        events, version = view.events, view.version
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or not self._can_advance(state, from_us, to_us, version):
+                state = self._compute(events, view.rollup, from_us, to_us, version, codes)
+                self.full_computes += 1
+            elif (state.from_us, state.to_us, state.version) != (from_us, to_us, version):
+                self._advance(state, events, from_us, to_us, version, codes)
+                self.incremental_steps += 1
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+
+            pairs = np.array(sorted(p for p, n in state.pairs.items() if n > 0), dtype=np.int64)
+            return PortAggregate(events, state.cells, pairs)
+
+    def _can_advance(self, state: _WindowState, from_us: int, to_us: int, version: int) -> bool:
+        if to_us < state.to_us or from_us > state.to_us or state.steps >= MAX_INCREMENTAL_STEPS:
+            return False
+        if version < state.version:
+            # The state was built from a newer view than this reader holds
+            return False
+        # A write that landed inside the part we already counted invalidates it
+        earliest = get_earliest_write_since(state.version)
+        return earliest is None or earliest > state.to_us
+
+    def _compute(
+        self,
+        events: EventTable,
+        rollup: HourlyRollup,
+        from_us: int,
+        to_us: int,
+        version: int,
+        codes: Dict[str, Optional[int]],
+    ) -> _WindowState:
+        cells = window_cells(events, rollup, from_us, to_us, **codes)
+        pairs = _pair_counts(select_with_history(events, from_us, to_us, **codes))
+        return _WindowState(from_us, to_us, version, cells, pairs)
+
+    def _advance(
+        self,
+        state: _WindowState,
+        events: EventTable,
+        from_us: int,
+        to_us: int,
+        version: int,
+        codes: Dict[str, Optional[int]],
+    ) -> None:
+        entered = events.select(state.to_us + 1, to_us, **codes)
+        # Rows ageing out may be old enough to have been left on disk
+        aged_out = select_with_history(events, state.from_us, from_us - 1, **codes)
+
+        merged = concat_cells(state.cells, raw_cells(entered), _negate(raw_cells(aged_out)))
+        keep = merged.counts > 0
+        state.cells = CellTotals(*(col[keep] for col in merged))
+
+        for pair, n in _pair_counts(entered).items():
+            state.pairs[pair] = state.pairs.get(pair, 0) + n
+        for pair, n in _pair_counts(aged_out).items():
+            remaining = state.pairs.get(pair, 0) - n
+            if remaining > 0:
+                state.pairs[pair] = remaining
+            else:
+                state.pairs.pop(pair, None)
+
+        state.from_us, state.to_us, state.version = from_us, to_us, version
+        state.steps += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "states": len(self._states),
+                "full_computes": self.full_computes,
+                "incremental_steps": self.incremental_steps,
+            }
+
+
+rolling_aggregator = RollingAggregator()
+
+
+def resolve_window(window: str, granularity_seconds: Optional[int] = None) -> Tuple[int, int]:
+    """(from_us, to_us) for a named rolling window ending at the snapped 'now'."""
+    to_us = snapped_now_us(granularity_seconds)
+    return to_us - ROLLING_WINDOWS[window] // timedelta(microseconds=1), to_us
@@ -0,0 +1,31 @@
+"""
+Nabeeh top-K selection.
+Panels that show the first N of a ranking (top inspectors, most recent
+incidents) select those N without ordering everything else: candidates
+are cut with a linear-time partition on the primary key and only they are
+sorted. "Most recent" needs no ranking at all, since rows are time
+ordered; see `EventTable.latest`.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def top_k(keys: Sequence[np.ndarray], k: Optional[int] = None) -> np.ndarray:
+    """
+    Positions of the k largest entries ranked by `keys` (primary key first),
+    in descending order; entries tied on every key keep their original order.
+    Same result as `np.lexsort([-key for key in reversed(keys)])[:k]` but
+    O(n + m log m), where m is k plus the entries tied with the k-th.
+    """
+    primary = keys[0]
+    n = len(primary)
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.arange(0)
+    else:
+        kth = np.partition(primary, n - k)[n - k]
+        candidates = np.flatnonzero(primary >= kth)
+    order = np.lexsort([-key[candidates] for key in reversed(keys)])
+    return candidates[order[:k]]
@@ -0,0 +1,6 @@
+"""
+Endpoint benchmarks for the Nabeeh API.
+
+    python -m benchmarks.run --scales 10k,1m --out bench.json
+    python -m benchmarks.compare bench.json benchmarks/baseline.json --threshold 0.25
+"""
@@ -0,0 +1,62 @@
+"""
+Compare a benchmark run against a baseline.
+A case regresses when its median latency grows by more than the threshold
+(0.25 = 25% slower). Exits 1 if any case regressed.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class Change(NamedTuple):
+    scale: str
+    route: str
+    case: str
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ms / self.baseline_ms if self.baseline_ms else float("inf")
+
+
+def _by_case(results: List[dict]) -> Dict[Tuple[str, str, str], dict]:
+    return {(r["scale"], r["route"], r["case"]): r for r in results}
+
+
+def compare(current: dict, baseline: dict, threshold: float, metric: str = "p50_ms") -> Tuple[List[Change], List[Change]]:
+    """(regressions, all matched changes) between two result documents."""
+    base = _by_case(baseline["results"])
+    changes = [
+        Change(key[0], key[1], key[2], base[key][metric], r[metric])
+        for key, r in _by_case(current["results"]).items()
+        if key in base
+    ]
+    regressions = [c for c in changes if c.ratio > 1 + threshold]
+    return regressions, changes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "mean_ms"])
+    args = parser.parse_args(argv)
+
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions, changes = compare(current, baseline, args.threshold, args.metric)
+
+    for c in sorted(changes, key=lambda c: -c.ratio):
+        flag = "REGRESSION" if c in regressions else ""
+        print(f"{c.scale:>5} {c.route:<28} {c.case:<26} {c.baseline_ms:9.2f} -> {c.current_ms:9.2f} ms  x{c.ratio:5.2f} {flag}")
+    print(f"{len(changes)} cases compared, {len(regressions)} regressed beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Benchmark every analytics route at several data scales.
+Each scale runs in a fresh process: the store is bulk-loaded from the
+synthetic generator, then every (route, time range, filter) case is
+requested through the ASGI app with the response cache cleared, so the
+numbers are compute latency rather than cache hits.
+
+Latencies only compare on one host, so no baseline is kept in the repo:
+--baseline-ref runs the same scales at another commit (checked out in a
+temporary git worktree) right after this one, and compares against that.
+
+    python -m benchmarks.run --scales 10k,1m,10m --out bench.json
+    python -m benchmarks.run --scales 10k --baseline-ref main --threshold 0.25
+    python -m benchmarks.run --scales 10k --baseline bench-main.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DAYS = 90
+RANGES = {"24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+FILTERS = {
+    "all": {},
+    "severity=HIGH": {"severity": "HIGH"},
+    "type=smoking": {"violationType": "smoking"},
+    "HIGH+smoking": {"severity": "HIGH", "violationType": "smoking"},
+}
+
+
+def parse_scale(label: str) -> int:
+    """'10k' -> 10_000, '1m' -> 1_000_000."""
+    units = {"k": 1_000, "m": 1_000_000}
+    label = label.strip().lower()
+    if label[-1] in units:
+        return int(float(label[:-1]) * units[label[-1]])
+    return int(label)
+
+
+def _backend_for(events: int, end: datetime):
+    """A generated backend sized to roughly `events` rows over DAYS days."""
+    from app.data.backends import GeneratedBackend
+    from app.data.columns import EventTable
+
+    probe = EventTable()
+    GeneratedBackend(n_ports=12, days=DAYS, seed=1, end=end).load_into(probe)
+    per_port_day = len(probe) / (12 * DAYS)
+    n_ports = min(2000, max(12, events // 10_000))
+    scale = events / (per_port_day * n_ports * DAYS)
+    return GeneratedBackend(n_ports=n_ports, days=DAYS, scale=scale, seed=1, end=end)
+
+
+def _cases(port_id: str, inspector_id: str) -> Iterator[Tuple[str, str, str, Dict[str, str]]]:
+    routes = [
+        ("/api/summary", {}),
+        ("/api/ports", {}),
+        ("/api/heatmap", {}),
+        ("/api/inspectors", {}),
+        ("/api/dashboard", {}),
+        ("/api/ports/{port}/details", {}),
+        ("/api/inspectors/{inspector}", {}),
+        ("/api/kpis", {"port_id": port_id}),
+        ("/api/incidents", {"port_id": port_id}),
+    ]
+    now = datetime.now(timezone.utc)
+    for route, extra in routes:
+        path = route.format(port=port_id, inspector=inspector_id)
+        for range_name, span in RANGES.items():
+            for filter_name, filters in FILTERS.items():
+                params = {"from": (now - span).isoformat(), "to": now.isoformat(), **extra, **filters}
+                yield route, f"{range_name} {filter_name}", path, params
+        # Rolling windows advance incrementally between requests
+        yield route, "window=7d", path, {"window": "7d", **extra}
+
+
+def run_scale(label: str, repeat: int, warmup: int) -> List[dict]:
+    """Load the store at one scale and time every case (call in a fresh process)."""
+    import numpy as np
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.data import store
+    from app.main import app
+    from app.services.cache import response_cache
+
+    settings.snapshot_path = None
+    target = parse_scale(label)
+    started = time.perf_counter()
+    store.init_store(backend=_backend_for(target, datetime.now(timezone.utc)))
+    load_seconds = time.perf_counter() - started
+    table = store.get_event_table()
+    port_id = table.ports.values[0]
+    busiest = np.bincount(table.inspector[table.inspector >= 0]).argmax()
+    inspector_id = table.inspectors.decode(int(busiest))
+
+    client = TestClient(app)
+    results = []
+    for route, case, path, params in _cases(port_id, inspector_id):
+        timings = []
+        for i in range(warmup + repeat):
+            response_cache.clear()
+            t0 = time.perf_counter()
+            response = client.get(path, params=params)
+            elapsed = time.perf_counter() - t0
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} {params} -> {response.status_code}: {response.text[:200]}")
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+        timings.sort()
+        mean = statistics.fmean(timings)
+        results.append({
+            "scale": label,
+            "events": len(table),
+            "load_seconds": round(load_seconds, 3),
+            "route": route,
+            "case": case,
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+            "mean_ms": round(mean, 3),
+            "rps": round(1000 / mean, 1) if mean else None,
+            "bytes": len(response.content),
+        })
+    return results
+
+
+def _meta(cwd: Optional[str] = None) -> dict:
+    import numpy
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_scales(scales: List[str], repeat: int, warmup: int, cwd: Optional[str] = None) -> dict:
+    """Result document for every scale, each run in a fresh process from the backend directory `cwd`."""
+    results = []
+    for label in scales:
+        print(f"scale {label} ...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", label,
+             "--repeat", str(repeat), "--warmup", str(warmup)],
+            cwd=cwd, capture_output=True, text=True, check=True,
+        )
+        scale_results = json.loads(child.stdout)
+        results.extend(scale_results)
+        slowest = max(scale_results, key=lambda r: r["p50_ms"])
+        print(
+            f"  {scale_results[0]['events']:,} events, loaded in {scale_results[0]['load_seconds']} s; "
+            f"slowest p50 {slowest['p50_ms']} ms ({slowest['route']} {slowest['case']})",
+            file=sys.stderr,
+        )
+    return {"meta": _meta(cwd), "results": results}
+
+
+def run_at_ref(ref: str, scales: List[str], repeat: int, warmup: int) -> dict:
+    """run_scales() at git commit `ref`, checked out in a temporary worktree."""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    root = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=backend, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    with tempfile.TemporaryDirectory(prefix="nabeeh-bench-") as tmp:
+        worktree = os.path.join(tmp, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, ref], cwd=root, capture_output=True, check=True)
+        try:
+            print(f"baseline at {ref}:", file=sys.stderr)
+            return run_scales(scales, repeat, warmup, cwd=os.path.join(worktree, os.path.relpath(backend, root)))
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=root, capture_output=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10k,1m,10m", help="comma-separated event counts, e.g. 10k,1m,10m")
+    parser.add_argument("--repeat", type=int, default=5, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed requests per case")
+    parser.add_argument("--out", default="bench.json")
+    baseline = parser.add_mutually_exclusive_group()
+    baseline.add_argument("--baseline", help="compare against this result file (taken on this host)")
+    baseline.add_argument("--baseline-ref", help="benchmark this git commit too and compare against it")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run_scale(args.child, args.repeat, args.warmup), sys.stdout)
+        return 0
+
+    scales = args.scales.split(",")
+    document = run_scales(scales, args.repeat, args.warmup)
+    with open(args.out, "w") as f:
+        json.dump(document, f, indent=1)
+    print(f"wrote {len(document['results'])} results to {args.out}", file=sys.stderr)
+
+    baseline_path = args.baseline
+    if args.baseline_ref:
+        baseline_path = f"{os.path.splitext(args.out)[0]}-baseline.json"
+        with open(baseline_path, "w") as f:
+            json.dump(run_at_ref(args.baseline_ref, scales, args.repeat, args.warmup), f, indent=1)
+        print(f"wrote the baseline to {baseline_path}", file=sys.stderr)
+    if baseline_path:
+        from benchmarks.compare import main as compare_main
+
+        return compare_main([args.out, baseline_path, "--threshold", str(args.threshold)])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
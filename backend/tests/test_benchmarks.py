@@ -0,0 +1,30 @@
+"""Benchmark result comparison."""
+from benchmarks.compare import compare
+from benchmarks.run import parse_scale
+
+
+def _doc(*latencies):
+    return {"results": [
+        {"scale": "10k", "route": "/api/summary", "case": f"case{i}", "p50_ms": ms}
+        for i, ms in enumerate(latencies)
+    ]}
+
+
+def test_parse_scale():
+    assert parse_scale("10k") == 10_000
+    assert parse_scale("1.5M") == 1_500_000
+    assert parse_scale("2500") == 2500
+
+
+def test_compare_flags_only_cases_beyond_threshold():
+    regressions, changes = compare(_doc(12.0, 13.0, 5.0), _doc(10.0, 10.0, 10.0), threshold=0.25)
+    assert len(changes) == 3
+    assert [c.case for c in regressions] == ["case1"]
+
+    regressions, _ = compare(_doc(12.0, 13.0), _doc(10.0, 10.0), threshold=0.1)
+    assert len(regressions) == 2
+
+
+def test_compare_ignores_cases_missing_from_baseline():
+    regressions, changes = compare(_doc(10.0, 99.0), _doc(10.0), threshold=0.25)
+    assert len(changes) == 1 and not regressions
@@ -0,0 +1,70 @@
+"""Response cache: ETag / 304 behaviour and counters."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.store import init_store
+from app.main import app
+from app.services.cache import ResponseCache, etag_matches
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_store()
+    with TestClient(app) as c:
+        yield c
+
+
+def _range(days: int = 7) -> dict:
+    to = datetime.now(timezone.utc)
+    return {"from": (to - timedelta(days=days)).isoformat(), "to": to.isoformat()}
+
+
+def test_etag_and_not_modified(client):
+    params = _range()
+    first = client.get("/api/summary", params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/summary", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    stale = client.get("/api/summary", params=params, headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert stale.json() == first.json()
+
+
+def test_stats_count_hits(client):
+    params = _range(30)
+    before = client.get("/api/cache/stats").json()
+    client.get("/api/ports", params=params)
+    client.get("/api/ports", params=params)
+    after = client.get("/api/cache/stats").json()
+    assert after["hits"] >= before["hits"] + 1
+    assert after["misses"] >= before["misses"] + 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.encode())
+    assert cache.get("a") is None
+    assert cache.get("c").body == b"c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", b"a")
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_if_none_match_parsing():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
@@ -0,0 +1,232 @@
+"""Ingest: batches and streams must show up in indexes, rollup-backed aggregates and caches."""
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.columns import to_epoch_us
+from app.data.store import Ingested, add_events, get_event_table, get_inspector_by_id, get_rollup, get_view, init_store
+from app.main import app
+from app.models import Event
+from app.services import ingest
+from app.services.aggregate import raw_cells, window_cells
+from app.services.rolling import RollingAggregator
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_store()
+    with TestClient(app) as c:
+        yield c
+
+
+def _events(prefix: str, n: int, start: datetime, **overrides) -> list:
+    return [
+        {
+            "id": f"{prefix}-{i}",
+            "port_id": "port_03",
+            "inspector_id": f"INS-{prefix.upper()}{i % 3}",
+            "timestamp": (start + timedelta(minutes=7 * i)).isoformat(),
+            "source": "video",
+            "type": "smoking",
+            "severity": "HIGH",
+            "confidence": 0.9,
+            **overrides,
+        }
+        for i in range(n)
+    ]
+
+
+def test_batch_is_visible_everywhere(client):
+    to = datetime.now(timezone.utc)
+    params = {"from": (to - timedelta(days=3)).isoformat(), "to": to.isoformat()}
+    before = client.get("/api/ports/port_03/details", params=params)
+    rolling = RollingAggregator()
+    events = get_event_table()
+    to_us = int(events.ts[-1])
+    rolling.aggregate(get_view(), 24 * 3600 * 1_000_000, to_us, type=None, severity=None)
+
+    # Late events, out of order, spanning whole and partial hours
+    batch = _events("late", 40, to - timedelta(days=2))[::-1]
+    r = client.post("/api/events:batch", json=batch)
+    assert r.status_code == 200
+    assert r.json()["accepted"] == 40
+
+    after = client.get("/api/ports/port_03/details", params=params, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["incident_count"] == before.json()["incident_count"] + 40
+    assert get_inspector_by_id("INS-LATE0").port_id == "port_03"
+
+    events = get_event_table()
+    merged = events.compacted()
+    assert len(merged) == len(events) and (merged.ts[1:] >= merged.ts[:-1]).all()
+    port = events.ports.lookup("port_03")
+    assert merged.indexes["port"].get(port).tolist() == np.flatnonzero(merged.port == port).tolist()
+    lo, hi = int(events.ts[0]) + 17, int(events.ts[-1])
+    assert window_cells(events, get_rollup(), lo, hi).counts.tolist() == raw_cells(events.select(lo, hi)).counts.tolist()
+
+    # The write landed inside the rolling window's data, so it is recomputed
+    rolled = rolling.aggregate(get_view(), 24 * 3600 * 1_000_000, to_us, type=None, severity=None)
+    assert rolling.full_computes == 2
+    assert rolled.total_incidents == len(events.select(to_us - 24 * 3600 * 1_000_000, to_us))
+
+
+def test_invalid_batches_are_rejected_whole(client):
+    size = len(get_event_table())
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    cases = [
+        (_events("bad", 3, start) + _events("bad", 1, start, id="x", port_id="port_99"), "unknown_port"),
+        (_events("bad", 3, start, type="napping"), "unknown_violation_type"),
+        (_events("bad", 3, start) + _events("bad", 1, start), "duplicate_id"),
+    ]
+    for batch, error in cases:
+        r = client.post("/api/events:batch", json=batch)
+        assert r.status_code == 422
+        assert r.json()["detail"]["error"] == error
+    assert client.post("/api/events:batch", json=_events("bad", 2, start, confidence=3)).status_code == 422
+    assert len(get_event_table()) == size
+
+
+def test_stream_reports_counts_and_skips_bad_lines(client):
+    start = datetime.now(timezone.utc) - timedelta(hours=5)
+    good = _events("stream", 2500, start, timestamp=None)
+    for i, event in enumerate(good):
+        event["timestamp"] = (start + timedelta(seconds=i)).isoformat()
+    lines = [json.dumps(e) for e in good]
+    lines[10] = "{not json"
+    lines[20] = json.dumps({**good[20], "port_id": "port_99"})
+    lines[30] = "x" * 70_000
+    body = ("\n".join(lines) + "\n").encode()
+
+    def chunked():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    size = len(get_event_table())
+    r = client.post("/api/events:stream", content=chunked())
+    assert r.status_code == 200
+    report = r.json()
+    assert report["accepted"] == 2497 and report["rejected"] == 3
+    assert [e["line"] for e in report["errors"]] == [11, 21, 31]
+    assert report["errors"][1]["error"] == "unknown_port: port_99"
+    assert report["events_per_second"] > 0
+    assert len(get_event_table()) == size + 2497
+
+
+def test_stream_from_interleaved_detectors(client):
+    # Two detectors stream through one connection; one clock runs 40 s behind,
+    # so nearly every 1000-event chunk carries rows older than the newest one stored
+    start = datetime.now(timezone.utc) - timedelta(hours=4)
+    lines = []
+    for i in range(3000):
+        for source, lag in (("video", 0), ("audio", 40)):
+            event = _events(f"detector-{source}", 1, start, id=f"detector-{source}-{i}", source=source)[0]
+            event["timestamp"] = (start + timedelta(seconds=i - lag)).isoformat()
+            lines.append(json.dumps(event))
+    body = ("\n".join(lines) + "\n").encode()
+
+    before = get_event_table()
+    size, late = len(before), len(before.late) if before.late is not None else 0
+    r = client.post("/api/events:stream", content=[body[i:i + 65536] for i in range(0, len(body), 65536)])
+    assert r.status_code == 200 and r.json()["accepted"] == 6000
+
+    events = get_event_table()
+    assert len(events) == size + 6000
+    # The lagging rows were set aside, not merged into the columns one chunk at a time
+    assert events.late is not None and len(events.late) > late
+    lo, hi = to_epoch_us(start - timedelta(minutes=1)), to_epoch_us(start + timedelta(hours=1))
+    window = events.select(lo, hi, port=events.ports.lookup("port_03"))
+    assert (window.ts[1:] >= window.ts[:-1]).all()
+    assert {f"detector-{s}-{i}" for s in ("video", "audio") for i in range(3000)} <= set(window.event_ids())
+    assert window_cells(events, get_rollup(), lo, hi).counts.tolist() == raw_cells(events.select(lo, hi)).counts.tolist()
+
+
+def test_retried_batches_and_streams_are_stored_once(client):
+    batch = _events("retry", 3, datetime.now(timezone.utc) - timedelta(hours=2))
+    size = len(get_event_table())
+    first = client.post("/api/events:batch", json=batch).json()
+    again = client.post("/api/events:batch", json=batch).json()
+    assert first["accepted"] == 3 and again["accepted"] == 0
+    assert again["data_version"] == first["data_version"]
+
+    # A resent stream stores only the lines it did not deliver before
+    lines = batch + _events("retry-more", 2, datetime.now(timezone.utc) - timedelta(hours=1))
+    body = "".join(json.dumps(e) + "\n" for e in lines).encode()
+    report = client.post("/api/events:stream", content=body).json()
+    assert report["accepted"] == 2 and report["rejected"] == 0
+    assert len(get_event_table()) == size + 5
+
+
+def test_full_queue_holds_back_producers(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(ingest, "add_events", lambda events: release.wait(5) and Ingested(0, len(events)))
+
+    async def scenario():
+        writer = ingest.IngestWriter(max_chunks=1)
+        writer.start()
+        stats = ingest.StreamStats()
+        await writer.put([None], stats)  # taken by the writer, which then blocks
+        await asyncio.sleep(0.01)
+        await writer.put([None], stats)  # fills the queue
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(writer.put([None], stats), 0.05)
+        release.set()
+        await writer.flush()
+        await writer.stop()
+        return stats.accepted
+
+    assert asyncio.run(scenario()) == 2
+
+
+def _rollup_count(view) -> int:
+    return sum(int(cells.counts.sum()) for cells in view.rollup.hours.values())
+
+
+def test_views_are_isolated_from_later_writes(client):
+    old = get_view()
+    size, port_rows = len(old.events), old.events.select(port=old.events.ports.lookup("port_05")).event_ids()
+    assert np.shares_memory(old.events.ts, get_event_table().ts)
+    assert not old.events.ts.flags.writeable
+
+    now = datetime.now(timezone.utc)
+    in_order = _events("iso-new", 5, now + timedelta(minutes=1), port_id="port_05")
+    late = _events("iso-late", 5, now - timedelta(days=20), port_id="port_05")
+    add_events([Event.model_validate(e) for e in in_order])
+    add_events([Event.model_validate(e) for e in late])
+
+    new = get_view()
+    assert new.version == old.version + 2
+    assert len(new.events) == size + 10 and _rollup_count(new) == len(new.events)
+    assert len(old.events) == size and _rollup_count(old) == size
+    assert old.events.select(port=old.events.ports.lookup("port_05")).event_ids() == port_rows
+    assert get_inspector_by_id("INS-ISO-NEW0") is not None and "INS-ISO-NEW0" not in old.inspectors_by_id
+
+
+def test_concurrent_readers_never_see_partial_writes(client):
+    start = datetime.now(timezone.utc) + timedelta(hours=1)
+    batches = [
+        [Event.model_validate(e) for e in _events(f"race{b}", 50, start + timedelta(hours=b))]
+        for b in range(40)
+    ]
+    torn = []
+
+    def read():
+        while not done.is_set():
+            view = get_view()
+            if _rollup_count(view) != len(view.events) or len(view.events.port) != len(view.events.ts):
+                torn.append(view.version)
+
+    done = threading.Event()
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for t in readers:
+        t.start()
+    for batch in batches:
+        add_events(batch)
+    done.set()
+    for t in readers:
+        t.join()
+    assert not torn
@@ -0,0 +1,110 @@
+"""Live updates: one shared computation per filter set, deltas only for ports that changed."""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.data.store import add_events, init_store
+from app.models import Event
+from app.services import live
+from app.routes.live import live_updates
+from app.services.live import LiveHub
+from app.services.rolling import resolve_window
+
+
+@pytest.fixture(autouse=True)
+def frozen_windows(monkeypatch):
+    # Keep "now" still so only ingest moves the windows
+    windows = {name: resolve_window(name) for name in ("24h", "7d")}
+    monkeypatch.setattr(live, "resolve_window", windows.__getitem__)
+
+
+def _data(message: bytes) -> dict:
+    event, data = message.decode().split("\n")[-4:-2]
+    return {"event": event.removeprefix("event: "), **json.loads(data.removeprefix("data: "))}
+
+
+def _smoking(prefix: str, port_id: str, n: int) -> list:
+    now = datetime.now(timezone.utc) - timedelta(hours=1)
+    return [
+        Event.model_validate({
+            "id": f"{prefix}-{i}", "port_id": port_id, "inspector_id": "INS-LIVE1",
+            "timestamp": (now + timedelta(seconds=i)).isoformat(),
+            "source": "video", "type": "smoking", "severity": "HIGH", "confidence": 0.9,
+        })
+        for i in range(n)
+    ]
+
+
+def test_subscribers_share_a_topic_and_get_only_changed_ports():
+    init_store()
+    hub = LiveHub(poll_seconds=60, max_messages=8)
+    key = ("24h", None, None)
+
+    async def scenario():
+        first, second = await hub.subscribe(key), await hub.subscribe(key)
+        snapshot = _data(first.queue.get_nowait())
+        assert snapshot["event"] == "snapshot"
+        assert _data(second.queue.get_nowait()) == snapshot
+        assert hub.stats() == {"topics": 1, "subscribers": 2, "messages_sent": 0, "computes": 1}
+
+        await hub.publish()
+        assert first.queue.empty()
+
+        add_events(_smoking("live", "port_05", 5))
+        await hub.publish()
+        delta = first.queue.get_nowait()
+        assert second.queue.get_nowait() is delta
+        body = _data(delta)
+        assert body["event"] == "delta"
+        assert [p["id"] for p in body["ports"]] == ["port_05"]
+        before = next(p for p in snapshot["ports"] if p["id"] == "port_05")
+        assert body["ports"][0]["incident_count"] == before["incident_count"] + 5
+        assert hub.computes == 2
+
+        hub.unsubscribe(key, first)
+        hub.unsubscribe(key, second)
+        assert hub.stats()["topics"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_disconnected():
+    init_store()
+    hub = LiveHub(poll_seconds=60, max_messages=2)
+    key = ("7d", "smoking", None)
+
+    async def scenario():
+        slow = await hub.subscribe(key)
+        for i in range(3):
+            add_events(_smoking(f"slow{i}", "port_02", 1))
+            await hub.publish()
+        messages = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+        assert slow.dropped and messages[-1] is None
+
+    asyncio.run(scenario())
+
+
+def test_stream_subscribes_only_while_it_is_sent(monkeypatch):
+    init_store()
+    hub = LiveHub(poll_seconds=60, max_messages=8)
+    monkeypatch.setattr("app.routes.live.live_hub", hub)
+
+    async def scenario():
+        hub.start()
+        try:
+            # A client that disconnects before the body starts leaves nothing behind
+            await live_updates(window="24h", violation_type=None, severity=None)
+            assert hub.stats()["subscribers"] == 0
+
+            response = await live_updates(window="24h", violation_type=None, severity=None)
+            body = response.body_iterator
+            assert _data(await body.__anext__())["event"] == "snapshot"
+            assert hub.stats()["subscribers"] == 1
+            await body.aclose()
+            assert hub.stats() == {**hub.stats(), "topics": 0, "subscribers": 0}
+        finally:
+            await hub.stop()
+
+    asyncio.run(scenario())
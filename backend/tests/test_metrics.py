@@ -0,0 +1,50 @@
+"""Server-Timing headers and the Prometheus /metrics endpoint."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.store import init_store
+from app.main import app
+from app.services.cache import response_cache
+from app.services.metrics import record_scanned, stage
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_store()
+    with TestClient(app) as c:
+        yield c
+
+
+def _stages(header: str) -> dict:
+    return {name: float(dur.split("=")[1]) for name, dur in (part.strip().split(";") for part in header.split(","))}
+
+
+def test_server_timing_reports_stages(client):
+    response_cache.clear()
+    response = client.get("/api/ports/port_01/details", params={"window": "30d"})
+    assert response.status_code == 200
+    stages = _stages(response.headers["server-timing"])
+    assert {"parse", "filter", "build", "encode", "total"} <= stages.keys()
+    assert stages["total"] >= stages["build"] >= stages["filter"]
+
+    # A cache hit skips the compute stages
+    again = client.get("/api/ports/port_01/details", params={"window": "30d"})
+    assert "build" not in _stages(again.headers["server-timing"])
+
+
+def test_metrics_exposition(client):
+    client.get("/api/ports/port_02/details", params={"window": "7d"})
+    client.get("/api/ports/port_404/details", params={"window": "7d"})
+    text = client.get("/metrics").text
+
+    route = 'route="/api/ports/{port_id}/details"'
+    assert f'nabeeh_request_duration_seconds_bucket{{{route},method="GET",le="+Inf"}}' in text
+    assert f'nabeeh_requests_total{{{route},method="GET",status="404"}} 1' in text
+    assert f"nabeeh_events_scanned_total{{{route}}}" in text
+    assert 'nabeeh_store_size{kind="events"}' in text
+    assert "# TYPE nabeeh_request_duration_seconds histogram" in text
+
+
+def test_hooks_are_inert_outside_requests():
+    with stage("filter"):
+        record_scanned(10)
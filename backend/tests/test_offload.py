@@ -0,0 +1,79 @@
+"""Offload: heavy builds computed in the process pool must match inline ones byte for byte."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+RANGE = "from=2020-01-01T00:00:00Z&to=2030-01-01T00:00:00Z"
+
+# Run as its own process: the app there is the shared store's writer with a one-process pool
+_SERVER = f"""
+import json
+from fastapi.testclient import TestClient
+from app.data.store import get_view
+from app.main import app
+from app.services.cache import response_cache
+from app.services.metrics import metrics
+from app.services.offload import _warm_up, offloader
+
+paths = [
+    "/api/dashboard?{RANGE}",
+    "/api/summary?{RANGE}",
+    "/api/inspectors?{RANGE}&limit=5",
+    "/api/inspectors?{RANGE}&cursor=not-a-cursor",
+]
+with TestClient(app) as client:
+    warmed = offloader._pool.submit(_warm_up).result()
+    offloaded = [client.get(path) for path in paths]
+    scanned = dict(metrics.scanned)
+    response_cache.clear()
+    offloader.min_rows = 10 ** 12
+    inline = [client.get(path) for path in paths]
+    print(json.dumps({{
+        "statuses": [r.status_code for r in offloaded],
+        "same": [a.content == b.content for a, b in zip(offloaded, inline)],
+        "warmed": warmed == get_view().version,
+        "timing": offloaded[0].headers["server-timing"],
+        "scanned": scanned,
+        "stats": client.get("/api/offload/stats").json(),
+    }}))
+"""
+
+
+def test_offloaded_builds_match_inline(tmp_path):
+    env = {
+        **os.environ,
+        "NABEEH_SHARED_DIR": str(tmp_path / "shared"),
+        "NABEEH_OFFLOAD_WORKERS": "1",
+        "NABEEH_OFFLOAD_MIN_ROWS": "0",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", _SERVER], cwd=Path(__file__).parents[1], env=env,
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+    result = json.loads(out.stdout.splitlines()[-1])
+    assert result["statuses"] == [200, 200, 200, 400]
+    assert all(result["same"]) and result["warmed"]
+    # Stages and rows scanned in the pool process count towards the request
+    assert "filter;dur=" in result["timing"]
+    assert result["scanned"]["/api/dashboard"] > 0 and result["scanned"]["/api/inspectors"] > 0
+    stats = result["stats"]
+    assert stats["running"] and stats["workers"] == 1
+    assert stats["routes"]["/api/dashboard"]["process"]["count"] == 1
+    assert stats["routes"]["/api/dashboard"]["inline"]["count"] == 1
+    assert stats["routes"]["/api/inspectors"]["process"]["count"] == 2
+
+
+def test_builds_stay_inline_without_a_pool():
+    with TestClient(app) as client:
+        client.get(f"/api/ports?{RANGE}&severity=LOW")
+        stats = client.get("/api/offload/stats").json()
+        body = client.get("/metrics").text
+    assert not stats["running"]
+    assert stats["routes"]["/api/ports"]["inline"]["count"] >= 1
+    assert 'nabeeh_computed_request_duration_seconds_count{route="/api/ports",placement="inline"}' in body
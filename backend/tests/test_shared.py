@@ -0,0 +1,93 @@
+"""Shared store: workers attach one published copy, and writes reach it through the backend."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Each worker is its own process, as under uvicorn --workers; it answers one command per line on stdin
+_WORKER = """
+import json, sys, zlib
+from app.data.shared import shared_store
+from app.data.store import add_events, get_view
+from app.models import Event
+
+shared_store.open()
+for line in sys.stdin:
+    command = line.strip()
+    if command == "add":
+        add_events([Event.model_validate({
+            "id": "shared-1", "port_id": "port_03", "inspector_id": "INS-SHARED",
+            "timestamp": "2026-01-01T12:00:00+00:00", "source": "video", "type": "smoking",
+            "severity": "HIGH", "confidence": 0.8,
+        })])
+    elif command == "step":
+        shared_store.step()
+    view = get_view()
+    print(json.dumps({
+        "role": shared_store.role, "version": view.version, "events": len(view.events),
+        "inspector": "INS-SHARED" in view.inspectors_by_id,
+        "aside": len(view.events.late) if view.events.late is not None else 0,
+        "digest": zlib.crc32("\\n".join(sorted(view.events.event_ids())).encode()),
+        "rollup": int(view.rollup.totals(0, 2 ** 62).counts.sum()),
+        "shared": shared_store.stats(),
+    }), flush=True)
+"""
+
+
+class Worker:
+    def __init__(self, tmp_path: Path):
+        env = {
+            **os.environ,
+            "NABEEH_STORAGE_BACKEND": "sqlite",
+            "NABEEH_SQLITE_PATH": str(tmp_path / "nabeeh.db"),
+            "NABEEH_SHARED_DIR": str(tmp_path / "shared"),
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", _WORKER], cwd=Path(__file__).parents[1], env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+
+    def send(self, command: str) -> dict:
+        self.process.stdin.write(command + "\n")
+        self.process.stdin.flush()
+        return json.loads(self.process.stdout.readline())
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait(timeout=30)
+
+
+def test_reader_attaches_and_its_writes_are_published_by_the_writer(tmp_path):
+    writer = Worker(tmp_path)
+    first = writer.send("status")
+    reader = Worker(tmp_path)
+    try:
+        attached = reader.send("status")
+        assert first["role"] == "writer" and attached["role"] == "reader"
+        assert attached["version"] == first["version"] and attached["events"] == first["events"]
+
+        # The reader only stores the batch; the writer's next poll publishes it
+        assert reader.send("add") == attached
+        published = writer.send("step")
+        assert published["version"] == first["version"] + 1
+        assert published["events"] == first["events"] + 1 and published["inspector"]
+
+        # Only the new row is published; the reader adds it beside the mapped base
+        assert published["shared"]["deltas"] == 1 and published["shared"]["rebases"] == 1
+        refreshed = reader.send("step")
+        assert refreshed["version"] == published["version"] and refreshed["events"] == published["events"]
+        assert refreshed["inspector"] and refreshed["aside"] == 1
+        assert refreshed["digest"] == published["digest"] and refreshed["rollup"] == published["events"]
+        assert refreshed["shared"]["base"] == attached["shared"]["base"]
+        assert sorted(f.name for f in (tmp_path / "shared").glob("*.snap")) == [
+            f"delta-{published['version']}.snap", f"store-{first['version']}.snap",
+        ]
+
+        # Once the writer is gone a reader takes over, numbering on from the last version
+        writer.close()
+        promoted = reader.send("step")
+        assert promoted["role"] == "writer" and promoted["version"] == published["version"]
+    finally:
+        writer.process.kill()
+        reader.close()
@@ -1,11 +1,15 @@
 """Smoke test: verify the core heatmap API contract is functional."""
+import csv
+import io
+import json
 from datetime import datetime, timedelta, timezone
 
 import pytest
 from fastapi.testclient import TestClient
 
-from app.data.store import init_store
+from app.data.store import get_event_table, init_store
 from app.main import app
+from app.models import InspectorDetail, NationwideSummary, PortDetail, PortSummary
 
 
 @pytest.fixture(scope="module")
@@ -92,3 +96,75 @@ def test_violation_type_filter_applied(client):
     r = client.get("/api/heatmap", params=params)
     assert r.status_code == 200
     assert "points" in r.json()
+
+
+def test_responses_match_response_models(client):
+    """Handlers encode directly, so check the bytes still satisfy the documented schema."""
+    params = _range(30)
+    NationwideSummary.model_validate(client.get("/api/summary", params=params).json())
+    ports = [PortSummary.model_validate(p) for p in client.get("/api/ports", params=params).json()]
+    PortDetail.model_validate(client.get(f"/api/ports/{ports[0].id}/details", params=params).json())
+    table = get_event_table()
+    inspector_id = table.inspectors.decode(int(table.inspector[-1]))
+    InspectorDetail.model_validate(client.get(f"/api/inspectors/{inspector_id}", params=params).json())
+
+
+def test_incident_records_match_event_models(client):
+    table = get_event_table()
+    recent = table.take(slice(len(table) - 5, len(table)))
+    assert recent.to_records() == [e.model_dump(mode="json") for e in recent.to_events()]
+
+
+def test_incidents_page_with_cursors(client):
+    port_id = client.get("/api/ports", params=_range(30)).json()[0]["id"]
+    params = {**_range(30), "port_id": port_id}
+    everything = client.get("/api/incidents", params={**params, "limit": 100}).json()["incidents"]
+    seen, cursor = [], None
+    while True:
+        r = client.get("/api/incidents", params={**params, "limit": 7, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += r.json()["incidents"]
+        cursor = r.json()["next_cursor"]
+        if cursor is None:
+            break
+    assert [i["id"] for i in seen][:len(everything)] == [i["id"] for i in everything]
+    assert len({i["id"] for i in seen}) == len(seen)
+    r = client.get("/api/incidents", params={**params, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert r.json()["detail"]["error"] == "invalid_cursor"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "arrow"])
+def test_export_streams_every_matching_event(client, fmt):
+    params = {**_range(30), "severity": "HIGH"}
+    r = client.get("/api/export", params={**params, "format": fmt})
+    assert r.status_code == 200
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(r.text)))
+    elif fmt == "ndjson":
+        rows = [json.loads(line) for line in r.text.splitlines()]
+    else:
+        pa = pytest.importorskip("pyarrow")
+        rows = pa.ipc.open_stream(r.content).read_all().to_pylist()
+    table = get_event_table()
+    want = [e.id for e in table.to_events()
+            if e.severity.value == "HIGH" and params["from"] <= e.timestamp.isoformat() <= params["to"]]
+    assert [row["id"] for row in rows] == want
+    assert {row["severity"] for row in rows} == {"HIGH"}
+
+
+def test_export_rejects_unknown_format(client):
+    r = client.get("/api/export", params={**_range(), "format": "xml"})
+    assert r.status_code == 400
+    assert r.json()["detail"]["error"] == "invalid_format"
+
+
+@pytest.mark.parametrize("params", [{**_range(7), "violationType": "smoking"}, {"window": "30d", "severity": "HIGH"}])
+def test_dashboard_matches_individual_routes(client, params):
+    r = client.get("/api/dashboard", params={**params, "inspectors_limit": 5})
+    assert r.status_code == 200
+    dashboard = r.json()
+    assert dashboard["summary"] == client.get("/api/summary", params=params).json()
+    assert dashboard["ports"] == client.get("/api/ports", params=params).json()
+    assert dashboard["heatmap"] == client.get("/api/heatmap", params=params).json()
+    assert dashboard["inspectors"] == client.get("/api/inspectors", params={**params, "limit": 5}).json()
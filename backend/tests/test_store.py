@@ -0,0 +1,571 @@
+"""Store tests: the columnar event table must agree with plain Event lists."""
+from datetime import datetime, timedelta, timezone
+
+import itertools
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.data.backends import GeneratedBackend, MemoryBackend, SQLiteBackend
+from app.data.columns import EventRecord, EventTable, to_epoch_us
+from app.data.rollup import HourlyRollup, pack_cells
+from app.data.seed import seed_all
+from app.data.snapshot import SnapshotError, read_snapshot, write_snapshot
+from app.models import Inspector
+from app.routes.analytics import _filter_events
+from app.services.aggregate import PortAggregate, aggregate_by_inspector, raw_cells, window_cells
+from app.services.risk import (
+    VIOLATION_WEIGHTS,
+    compute_contributions,
+    compute_risk_score,
+    event_contributions,
+    weight_tables,
+    weights_version,
+)
+from app.services.pagination import CursorError, incidents_page, inspectors_page
+from app.services.topk import top_k
+
+
+@pytest.fixture(scope="module")
+def events():
+    _, _, events = seed_all(days_back=30, seed_value=7)
+    return events
+
+
+def test_round_trip(events):
+    table = EventTable.from_events(events)
+    assert len(table) == len(events)
+    assert table.to_events() == sorted(events, key=lambda e: e.timestamp)
+
+
+def test_filter_matches_list_semantics(events):
+    table = EventTable.from_events(events)
+    to = datetime.now(timezone.utc)
+    from_ = to - timedelta(days=7)
+    expected = [
+        e for e in events
+        if from_ <= e.timestamp <= to and e.port_id == "port_01" and e.severity.value == "HIGH"
+    ]
+    filtered = _filter_events(table, from_ts=from_, to_ts=to, port_id="port_01", severity="HIGH")
+    assert sorted(e.id for e in filtered.to_events()) == sorted(e.id for e in expected)
+    assert compute_risk_score(filtered) == pytest.approx(compute_risk_score(expected))
+
+
+def test_filter_unknown_value_matches_nothing(events):
+    table = EventTable.from_events(events)
+    assert len(_filter_events(table, port_id="port_99")) == 0
+    assert len(_filter_events(table, violation_type="not_a_type")) == 0
+
+
+def test_late_events_are_merged_in_time_order(events):
+    newest_first = sorted(events, key=lambda e: e.timestamp, reverse=True)
+    table = EventTable.from_events(newest_first[: len(events) // 2])
+    table.append(newest_first[len(events) // 2:])
+    merged = table.compacted()
+    assert len(merged) == len(table) == len(events) and merged.late is None
+    assert (merged.ts[1:] >= merged.ts[:-1]).all()
+    assert sorted(table.event_ids()) == sorted(e.id for e in events)
+
+
+def test_time_range_is_inclusive(events):
+    table = EventTable.from_events(events)
+    lo, hi = int(table.ts[10]), int(table.ts[20])
+    window = table.take(table.time_range(lo, hi))
+    assert window.ts[0] == lo and window.ts[-1] == hi
+    assert len(window) == int(((table.ts >= lo) & (table.ts <= hi)).sum())
+
+
+def test_posting_indexes_survive_late_merges(events):
+    newest_first = sorted(events, key=lambda e: e.timestamp, reverse=True)
+    table = EventTable()
+    for start in range(0, len(newest_first), 25):
+        table.append(newest_first[start:start + 25])
+    for part in (table, table.late, table.compacted()):
+        for name in EventTable.INDEXED:
+            column = getattr(part, name)
+            for code in set(column.tolist()):
+                assert part.indexes[name].get(code).tolist() == np.flatnonzero(column == code).tolist()
+
+
+def _slightly_out_of_order(events, batch_size=200, seed=5):
+    """Time-ordered batches, each with a few events delayed into the next ones."""
+    rng = np.random.default_rng(seed)
+    ordered = sorted(events, key=lambda e: e.timestamp)
+    delay = rng.integers(0, 3 * batch_size, len(ordered)) * (rng.random(len(ordered)) < 0.05)
+    arrival = np.argsort(np.arange(len(ordered)) + delay, kind="stable")
+    return [[ordered[i] for i in arrival[start:start + batch_size].tolist()]
+            for start in range(0, len(ordered), batch_size)]
+
+
+def test_late_rows_read_like_a_merged_table(events):
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    for batch in _slightly_out_of_order(events):
+        table.append(batch)
+    assert table.late is not None and len(table.late)
+    merged = table.compacted()
+    lo, hi = int(merged.ts[len(merged) // 4]), int(merged.ts[-len(merged) // 4])
+    port = table.ports.lookup("port_02")
+    high = table.severities.lookup("HIGH")
+    for codes in ({}, {"port": port}, {"severity": high}, {"port": port, "severity": high}):
+        assert table.select(lo, hi, **codes).ids.tolist() == merged.select(lo, hi, **codes).ids.tolist()
+        assert table.scan_size(lo, hi, **codes) == merged.scan_size(lo, hi, **codes)
+        assert (np.concatenate([chunk.ids for chunk in table.scan(64, lo, hi, **codes)]).tolist()
+                == merged.select(lo, hi, **codes).ids.tolist())
+        for limit in (1, 10, 500):
+            assert table.latest(limit, lo, hi, **codes).ids.tolist() == merged.latest(limit, lo, hi, **codes).ids.tolist()
+    got, _ = _walk(lambda cursor: _ids(*incidents_page(table, 7, cursor, lo, hi, port=port)))
+    want, _ = _walk(lambda cursor: _ids(*incidents_page(merged, 7, cursor, lo, hi, port=port)))
+    assert got == want
+    assert table.contribution_version == weights_version()
+    assert event_contributions(table.select()).tolist() == compute_contributions(merged).tolist()
+
+    table.compact()
+    assert table.late is None and table.ids.tolist() == merged.ids.tolist()
+
+
+def test_slightly_out_of_order_batches_ingest_at_append_speed():
+    # A large table fed 1000-event batches, each with one event a few seconds late:
+    # late rows must not cost a pass over every row
+    rng = np.random.default_rng(11)
+
+    def batch(ts):
+        n = len(ts)
+        return {
+            "ids": np.char.add(b"e", ts.astype("S")), "ts": ts,
+            "port": rng.integers(0, 20, n, dtype=np.int32), "inspector": rng.integers(0, 200, n, dtype=np.int32),
+            "type": np.zeros(n, dtype=np.int16), "severity": np.zeros(n, dtype=np.int8),
+            "source": np.zeros(n, dtype=np.int8), "confidence": np.ones(n, dtype=np.float32),
+            "description": np.full(n, -1, dtype=np.int32),
+        }
+
+    table = EventTable()
+    table.append_columns(batch(np.arange(1_000_000, dtype=np.int64) * 1_000_000))
+    now = int(table.ts[-1])
+    elapsed = {}
+    for late in (False, True):
+        start = time.perf_counter()
+        for _ in range(100):
+            ts = now + np.arange(1, 1001, dtype=np.int64) * 1000
+            now = int(ts[-1])
+            if late:
+                ts[0] -= 10_000_000
+            table.append_columns(batch(ts))
+        elapsed[late] = time.perf_counter() - start
+    assert len(table) == 1_200_000 and len(table.late) == 100
+    assert elapsed[True] < 4 * elapsed[False] + 0.05
+
+
+def test_select_via_index_matches_mask(events):
+    table = EventTable.from_events(events)
+    port = table.ports.lookup("port_02")
+    low = table.severities.lookup("LOW")
+    lo, hi = int(table.ts[len(table) // 4]), int(table.ts[len(table) // 2])
+    via_index = table.select(lo, hi, port=port, severity=low)
+    mask = (table.ts >= lo) & (table.ts <= hi) & (table.port == port) & (table.severity == low)
+    assert via_index.ids.tolist() == table.ids[mask].tolist()
+
+
+def test_latest_matches_reversed_select(events):
+    table = EventTable.from_events(events)
+    lo, hi = int(table.ts[len(table) // 5]), int(table.ts[-len(table) // 5])
+    high = table.severities.lookup("HIGH")
+    for codes in ({}, {"port": table.ports.lookup("port_03")}, {"severity": high},
+                  {"port": table.ports.lookup("port_01"), "severity": high}):
+        everything = table.select(lo, hi, **codes).ids[::-1].tolist()
+        for limit in (1, 10, 50, len(table)):
+            assert table.latest(limit, lo, hi, **codes).ids.tolist() == everything[:limit]
+    assert len(table.latest(5, port=table.ports.lookup("port_99"))) == 0
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(3)
+    counts = rng.integers(0, 5, 200)
+    last = rng.integers(0, 3, 200)
+    full = np.lexsort((-last, -counts))
+    for k in (None, 0, 1, 7, 50, 200, 500):
+        assert top_k((counts, last), k).tolist() == full[:k].tolist()
+
+
+def test_aggregate_by_inspector_ranks_like_a_full_sort(events):
+    table = EventTable.from_events(events)
+    ranked = aggregate_by_inspector(table)
+    assert len(ranked) == len({e.inspector_id for e in events})
+    assert sum(s.incident_count for s in ranked) == len(events)
+    keys = [(-s.incident_count, -datetime.fromisoformat(s.last_incident_at).timestamp(), s.id) for s in ranked]
+    assert keys == sorted(keys)
+    assert aggregate_by_inspector(table, limit=5) == ranked[:5]
+
+
+def _walk(fetch):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(cursor)
+        rows += page
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_incident_pages_cover_ties_in_key_order(events):
+    # Coarse timestamps so many events share one, split across page edges
+    coarse = [e.model_copy(update={"timestamp": e.timestamp.replace(minute=0, second=0, microsecond=0)})
+              for e in events]
+    table = EventTable.from_events(coarse)
+    port = table.ports.lookup("port_02")
+    lo, hi = int(table.ts[len(table) // 3]), int(table.ts[-1])
+    want = sorted(((e.timestamp, e.id) for e in coarse
+                   if e.port_id == "port_02" and lo <= to_epoch_us(e.timestamp) <= hi), reverse=True)
+    got, pages = _walk(lambda cursor: _ids(*incidents_page(table, 3, cursor, lo, hi, port=port)))
+    assert got == [event_id for _, event_id in want]
+    assert pages == -(-len(want) // 3)
+
+
+def _ids(page, cursor):
+    return page.event_ids(), cursor
+
+
+def test_inspector_pages_match_full_ranking(events):
+    table = EventTable.from_events(events)
+    ranked = aggregate_by_inspector(table)
+    got, _ = _walk(lambda cursor: inspectors_page(table, 4, cursor))
+    assert got == ranked
+    with pytest.raises(CursorError):
+        inspectors_page(table, 4, incidents_page(table, 1)[1])
+
+
+def test_inspector_cursors_carry_over_between_dictionaries(events):
+    # Day-stamped events tie inspectors on count and recency; the reversed load codes them differently
+    daily = [e.model_copy(update={"timestamp": e.timestamp.replace(hour=0, minute=0, second=0, microsecond=0)})
+             for e in events]
+    table, other = EventTable.from_events(daily), EventTable.from_events(daily[::-1])
+    assert table.inspectors.values != other.inspectors.values
+    # Scores may differ in the last bit: rows are summed in another order
+    ranked = [s.id for s in aggregate_by_inspector(table)]
+    assert [s.id for s in aggregate_by_inspector(other)] == ranked
+    assert len({(s.incident_count, s.last_incident_at) for s in aggregate_by_inspector(table)}) < len(ranked)
+
+    # Each page is read from the other table than the one that issued its cursor
+    tables, got, cursor = [table, other], [], None
+    while True:
+        page, cursor = inspectors_page(tables[len(got) % 2], 3, cursor)
+        got += [s.id for s in page]
+        if cursor is None:
+            break
+    assert got == ranked
+
+
+def test_port_aggregate_matches_per_port_filtering(events):
+    table = EventTable.from_events(events)
+    agg = PortAggregate(table)
+    for port_id in {e.port_id for e in events}:
+        port_events = [e for e in events if e.port_id == port_id]
+        stats = agg.port(port_id)
+        assert stats.incident_count == len(port_events)
+        assert stats.unique_inspectors == len({e.inspector_id for e in port_events})
+        assert stats.score == pytest.approx(compute_risk_score(port_events))
+        assert stats.last_incident_at == max(e.timestamp for e in port_events).isoformat()
+    assert agg.port("port_99").incident_count == 0
+    assert agg.total_inspectors == len({e.inspector_id for e in events})
+
+
+def test_rollup_window_matches_raw_aggregation(events):
+    table = EventTable.from_events(events)
+    rollup = HourlyRollup()
+    rollup.add(table.ts, pack_cells(table.port, table.type, table.severity), event_contributions(table))
+    span = int(table.ts[-1] - table.ts[0])
+    for lo_frac, hi_frac, codes in (
+        (0.0, 1.0, {}),
+        (0.13, 0.71, {"severity": table.severities.lookup("HIGH")}),
+        (0.4, 0.41, {"port": table.ports.lookup("port_01")}),
+    ):
+        lo = int(table.ts[0] + span * lo_frac) + 17
+        hi = int(table.ts[0] + span * hi_frac)
+        got = window_cells(table, rollup, lo, hi, **codes)
+        want = raw_cells(table.select(lo, hi, **codes))
+        assert got.cells.tolist() == want.cells.tolist()
+        assert got.counts.tolist() == want.counts.tolist()
+        assert got.last_ts.tolist() == want.last_ts.tolist()
+        assert np.allclose(got.sums, want.sums)
+
+
+def test_contributions_rebuilt_when_weights_change(events, monkeypatch):
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    table.append(events)
+    assert table.contribution_version == weights_version()
+    assert np.allclose(event_contributions(table), compute_contributions(table))
+    before = compute_risk_score(table)
+
+    monkeypatch.setitem(VIOLATION_WEIGHTS, "violence", 50.0)
+    assert table.contribution_version != weights_version()
+    assert compute_risk_score(table) > before  # stale column is not used
+    table.rescore(compute_contributions, weights_version())
+    assert compute_risk_score(table) == pytest.approx(compute_risk_score(events))
+
+
+def _allocated_per_row(build, rows: int) -> float:
+    tracemalloc.start()
+    try:
+        kept = build()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(kept) == rows
+    return allocated / rows
+
+
+def test_event_record_memory_budget(events):
+    table = EventTable.from_events(events)
+    records = table.to_rows()
+    assert [r.to_event() for r in records] == table.to_events()
+    assert EventRecord.from_event(events[0]) == EventRecord.from_event(events[0].model_copy())
+
+    # Identifiers are interned: one string object per distinct port / type
+    assert len({id(r.port_id) for r in records}) == len({r.port_id for r in records})
+    assert len({id(r.type) for r in records}) == len({r.type for r in records})
+
+    per_record = _allocated_per_row(table.to_rows, len(table))
+    per_model = _allocated_per_row(table.to_events, len(table))
+    assert per_record <= 256
+    assert per_record * 4 <= per_model
+
+    # The store itself keeps columns plus posting lists, well under a record per event
+    columns = sum(getattr(table, name).nbytes for name in EventTable.COLUMNS)
+    postings = sum(a.nbytes for index in table.indexes.values() for a in index.to_csr())
+    assert (columns + postings) / len(table) <= 96
+
+
+def test_sqlite_backend_round_trip_and_pushdown(tmp_path):
+    path = str(tmp_path / "nabeeh.db")
+    backend = SQLiteBackend(path, days_back=10, seed_value=3)
+    _, _, seeded = seed_all(days_back=10, seed_value=3)
+    extra = [e.model_copy(update={"id": f"extra_{e.id}", "inspector_id": "INS-NEW001"}) for e in seeded[:50]]
+    backend.save([EventRecord.from_event(e) for e in extra], [Inspector(id="INS-NEW001", port_id="port_01", created_at=extra[0].timestamp)])
+    assert backend._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    backend.close()
+
+    reopened = SQLiteBackend(path, days_back=10, seed_value=3)
+    ports, inspectors = reopened.load_entities()
+    assert len(ports) == 12 and inspectors[-1].id == "INS-NEW001"
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    for batch in reopened.load_events(batch_size=400):
+        table.append(batch)
+    assert sorted(table.event_ids()) == sorted(e.id for e in seeded + extra)
+    assert table.select(inspector=table.inspectors.lookup("INS-NEW001")).to_events() == sorted(
+        extra, key=lambda e: e.timestamp
+    )
+
+    expected = HourlyRollup()
+    expected.add(table.ts, pack_cells(table.port, table.type, table.severity), table.contribution)
+    hours = dict(reopened.hourly_cells(table, *weight_tables()))
+    assert sorted(hours) == sorted(expected.hours)
+    for hour, cells in hours.items():
+        assert cells.cells.tolist() == expected.hours[hour].cells.tolist()
+        assert cells.counts.tolist() == expected.hours[hour].counts.tolist()
+        assert cells.last_ts.tolist() == expected.hours[hour].last_ts.tolist()
+        assert np.allclose(cells.sums, expected.hours[hour].sums)
+    reopened.close()
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: MemoryBackend(days_back=3, seed_value=3),
+    lambda tmp_path: GeneratedBackend(n_ports=2, days=7, seed=3),
+    lambda tmp_path: SQLiteBackend(str(tmp_path / "nabeeh.db"), days_back=3, seed_value=3),
+], ids=["memory", "generated", "sqlite"])
+def test_backends_store_retried_batches_once(make, tmp_path):
+    backend = make(tmp_path)
+    held = list(itertools.islice(itertools.chain.from_iterable(backend.load_events(batch_size=3)), 3))
+    fresh = [EventRecord(f"retry_{e.id}", e.port_id, e.inspector_id, e.ts, e.source, e.type, e.severity, e.confidence)
+             for e in held]
+    assert [e.id for e in backend.save(fresh[:2] + held, [])] == [e.id for e in fresh[:2]]
+    assert [e.id for e in backend.save(fresh, [])] == [fresh[2].id]
+    assert backend.save(fresh, []) == []
+    backend.close()
+
+
+def test_sqlite_backend_skips_retried_batches(tmp_path):
+    path = str(tmp_path / "nabeeh.db")
+    # Processes opening a new file at once: one seeds it, the others find it seeded
+    with ThreadPoolExecutor(4) as pool:
+        backends = list(pool.map(lambda _: SQLiteBackend(path, days_back=3, seed_value=3), range(4)))
+    _, _, seeded = seed_all(days_back=3, seed_value=3)
+    backend = backends[0]
+    assert backend.position() == len(seeded)
+
+    batch = [EventRecord.from_event(e.model_copy(update={"id": f"retry_{e.id}"})) for e in seeded[:20]]
+    assert backend.save(batch[:5], []) == batch[:5]
+    assert backend.save(batch, []) == batch[5:]
+    assert backends[1].position() == len(seeded) + 20
+    for b in backends:
+        b.close()
+
+    # A file from before ids were unique keeps the first copy of each id
+    legacy = sqlite3.connect(str(tmp_path / "legacy.db"))
+    legacy.executescript(
+        "CREATE TABLE ports (id TEXT PRIMARY KEY, name_ar TEXT NOT NULL, name_en TEXT NOT NULL,"
+        " country TEXT NOT NULL, lat REAL NOT NULL, lng REAL NOT NULL);"
+        "CREATE TABLE events (id TEXT NOT NULL, port_id TEXT NOT NULL, inspector_id TEXT NOT NULL,"
+        " ts INTEGER NOT NULL, source TEXT NOT NULL, type TEXT NOT NULL, severity TEXT NOT NULL,"
+        " confidence REAL NOT NULL, short_description TEXT);"
+        "INSERT INTO ports VALUES ('port_01', '', '', '', 0, 0);"
+    )
+    legacy.executemany(
+        "INSERT INTO events VALUES (?, 'port_01', 'INS-1', ?, 'video', 'smoking', 'LOW', 0.5, NULL)",
+        [("a", 1), ("b", 2), ("a", 3)],
+    )
+    legacy.commit()
+    legacy.close()
+    migrated = SQLiteBackend(str(tmp_path / "legacy.db"))
+    assert [r.ts for batch in migrated.load_events() for r in batch] == [1, 2]
+    assert migrated.save([EventRecord("a", "port_01", "INS-1", 4, "video", "smoking", "LOW", 0.5)], []) == []
+    migrated.close()
+
+
+# Run as its own process so the store loads from the configured SQLite file
+_SQLITE_SERVER = """
+import json, sys
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+import app.services.rolling as rolling
+from app.data.store import get_view
+from app.main import app
+
+# Both runs read the same clock: rolling windows end at it, and it dates the mid-hour edge
+clock = [int(sys.argv[1])]
+rolling.time = type("Clock", (), {"time_ns": staticmethod(lambda: clock[0])})
+now = datetime.fromtimestamp(clock[0] / 1e9, timezone.utc)
+EDGE = "from=" + (now - timedelta(days=14)).replace(minute=17).isoformat().replace("+", "%2B") + "&to=" + now.isoformat().replace("+", "%2B")
+RANGE = "from=2020-01-01T00:00:00Z&to=2030-01-01T00:00:00Z"
+paths = [
+    f"/api/summary?{RANGE}", f"/api/ports/port_01/details?{RANGE}", f"/api/inspectors?{RANGE}",
+    f"/api/kpis?{RANGE}&port_id=port_02", f"/api/inspectors/INS-71YZOY?{RANGE}",
+    f"/api/export?{RANGE}&port_id=port_03", f"/api/export?{RANGE}&severity=HIGH&format=csv",
+    f"/api/summary?{EDGE}", f"/api/heatmap?{EDGE}", f"/api/ports?{EDGE}&severity=HIGH",
+    "/api/summary?window=30d", "/api/ports?window=30d",
+]
+with TestClient(app) as client:
+    responses = [client.get(path).text for path in paths]
+    # Two hours on, the rolling windows advance: what ages out of them was left on disk
+    clock[0] += 2 * 3600 * 10 ** 9
+    responses += [client.get("/api/summary?window=30d").text, client.get("/api/ports?window=30d").text]
+    responses.append(json.dumps(client.get("/api/cache/stats").json()["rolling"]))
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/api/incidents?{RANGE}&port_id=port_01&limit=7" + (f"&cursor={cursor}" if cursor else "")).json()
+        pages.append(page["incidents"])
+        cursor = page["next_cursor"]
+    print(json.dumps({"loaded": len(get_view().events), "responses": responses, "pages": pages}))
+"""
+
+
+def _same_body(got: str, want: str) -> bool:
+    """Equal responses, up to the last cent of a score: codes, and so summation order, differ by load."""
+    def same(a, b) -> bool:
+        if isinstance(a, float) or isinstance(b, float):
+            return abs(a - b) <= 0.0100001
+        if isinstance(a, dict):
+            return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+        if isinstance(a, list):
+            return isinstance(b, list) and len(a) == len(b) and all(map(same, a, b))
+        return a == b
+
+    try:
+        return same(json.loads(got), json.loads(want))
+    except ValueError:
+        return got == want
+
+
+def test_sqlite_history_beyond_resident_days_is_read_from_disk(tmp_path):
+    def serve(**env) -> dict:
+        out = subprocess.run(
+            [sys.executable, "-c", _SQLITE_SERVER, str(now)], cwd=Path(__file__).parents[1],
+            env={**os.environ, "NABEEH_STORAGE_BACKEND": "sqlite", "NABEEH_SQLITE_PATH": str(path), **env},
+            capture_output=True, text=True, timeout=120, check=True,
+        )
+        return json.loads(out.stdout.splitlines()[-1])
+
+    path = tmp_path / "nabeeh.db"
+    now = time.time_ns()
+    everything = serve()
+    recent = serve(NABEEH_SQLITE_RESIDENT_DAYS="10")
+    assert 0 < recent["loaded"] < everything["loaded"]
+    assert len(recent["responses"]) == len(everything["responses"])
+    for got, want in zip(recent["responses"], everything["responses"]):
+        assert _same_body(got, want), (got, want)
+    assert json.loads(recent["responses"][-1])["incremental_steps"] > 0
+    assert recent["pages"] == everything["pages"] and len(recent["pages"]) > 2
+
+    # Only the rows left on disk are read back
+    backend = SQLiteBackend(str(path), resident_days=10)
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    backend.load_into(table)
+    before, _ = backend.history_bounds
+    assert len(table) == recent["loaded"] and int(table.ts.min()) >= before
+    stored = [r for batch in backend.load_history(0, 2 ** 62, backend.history_bounds, port_id="port_04") for r in batch]
+    assert stored and all(r.port_id == "port_04" and r.ts < before for r in stored)
+    backend.close()
+
+
+def test_snapshot_of_a_view_holds_only_its_rows_after_failover(events, tmp_path):
+    ordered = sorted(events, key=lambda e: e.timestamp)
+    head, tail = ordered[: len(ordered) // 2], ordered[len(ordered) // 2:]
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    table.append(head[::2])
+    table.append(head[1::2])  # older than the first batch's end: kept aside
+    view = table.frozen()
+
+    # The writer publishes a base from its view while ingest keeps appending
+    table.append(tail[: len(tail) // 2])
+    path = str(tmp_path / "store.snap")
+    write_snapshot(path, [], [], view, HourlyRollup())
+    loaded = read_snapshot(path, scorer=compute_contributions).events
+    for index in loaded.indexes.values():
+        keys, offsets, rows = index.to_csr()
+        assert len(rows) == len(head) and rows.max() < len(head)
+
+    # The next writer ingests everything stored after the base onto its lists
+    loaded.append(tail)
+    assert len(loaded) == len(ordered)
+    for port in range(len(loaded.ports)):
+        assert loaded.select(port=port).event_ids() == loaded.take(loaded.port == port).event_ids()
+    inspector = loaded.inspectors.lookup(tail[-1].inspector_id)
+    assert loaded.select(inspector=inspector).event_ids() == loaded.take(loaded.inspector == inspector).event_ids()
+
+
+def test_snapshot_round_trip_is_mapped_and_writable(events, tmp_path):
+    table = EventTable(scorer=compute_contributions, scorer_version=weights_version())
+    table.append(events)
+    rollup = HourlyRollup()
+    rollup.add(table.ts, pack_cells(table.port, table.type, table.severity), table.contribution)
+    ports, inspectors, _ = seed_all(days_back=1, seed_value=7)
+    path = str(tmp_path / "store.snap")
+    write_snapshot(path, ports, inspectors, table, rollup, backend_position=42)
+
+    snap = read_snapshot(path, scorer=compute_contributions)
+    loaded = snap.events
+    assert snap.backend_position == 42 and snap.ports == ports and snap.inspectors == inspectors
+    assert not loaded.ts.flags.owndata and not loaded.ts.flags.writeable  # file-backed
+    assert loaded.to_events() == table.to_events()
+    port = table.ports.lookup("port_02")
+    assert loaded.select(port=port).event_ids() == table.select(port=port).event_ids()
+    assert sorted(snap.rollup.hours) == sorted(rollup.hours)
+    assert snap.rollup.totals(0, 2 ** 40).counts.tolist() == rollup.totals(0, 2 ** 40).counts.tolist()
+
+    late = [e.model_copy(update={"id": f"late-{e.id}-with-a-longer-id"}) for e in events[:30]]
+    loaded.append(late)
+    table.append(late)
+    assert loaded.event_ids() == table.event_ids()
+    assert loaded.indexes["port"].get(port).tolist() == table.indexes["port"].get(port).tolist()
+
+    with open(path, "r+b") as f:
+        f.write(b"NOTASNAP")
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
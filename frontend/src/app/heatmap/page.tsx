@@ -6,10 +6,9 @@ import { HeatmapMap } from "@/features/heatmap/components/HeatmapMap";
 import { PortDetailsPanel } from "@/features/heatmap/components/PortDetailsPanel";
 import { useI18n } from "@/lib/i18n/context";
 import {
-  useSummary,
-  usePorts,
+  useDashboard,
+  useLiveUpdates,
   usePortDetails,
-  useHeatmap,
 } from "@/features/heatmap/api/useHeatmap";
 import type { FilterParams } from "@/lib/api/client";
 
@@ -18,14 +17,6 @@ const MAP_CENTER: [number, number] = [24.5, 46.5];
 type RangeKey = "7d" | "30d";
 type ViolationType = "violence" | "camera_blocking" | "camera_misuse" | "camera_shake" | "smoking" | "shouting" | "abusive_language";
 
-function toISORange(range: RangeKey): { from: string; to: string } {
-  const to = new Date();
-  const from = new Date();
-  if (range === "7d") from.setDate(from.getDate() - 7);
-  else from.setDate(from.getDate() - 30);
-  return { from: from.toISOString(), to: to.toISOString() };
-}
-
 const VIOLATION_TYPES: ViolationType[] = [
   "violence", "camera_blocking", "camera_misuse", "camera_shake", 
   "smoking", "shouting", "abusive_language"
@@ -55,24 +46,26 @@ export default function HeatmapPage() {
   const [activeKpi, setActiveKpi] = useState<string | null>(null);
 
   // Build filter params
-  const { from, to } = useMemo(() => toISORange(timeRange), [timeRange]);
+  // Rolling window: the server snaps "now", so polls share cached results
   const filterParams: FilterParams = useMemo(
     () => ({ 
-      from, 
-      to,
+      window: timeRange,
       violationType: violationType ?? undefined,
     }),
-    [from, to, violationType]
+    [timeRange, violationType]
   );
 
   // Data fetching
-  const { data: summary } = useSummary(filterParams);
-  const { data: ports = [] } = usePorts(filterParams);
+  // Summary, ports and heatmap come from one /api/dashboard request
+  const { data: dashboard } = useDashboard(filterParams);
+  useLiveUpdates(filterParams);
+  const summary = dashboard?.summary;
+  const ports = useMemo(() => dashboard?.ports ?? [], [dashboard]);
+  const heatmapData = dashboard?.heatmap;
   const { data: portDetail, isLoading: portDetailLoading } = usePortDetails(
     selectedPortId,
     filterParams
   );
-  const { data: heatmapData } = useHeatmap(filterParams);
 
   // Derived data
   const heatmapPoints = useMemo(
@@ -1,14 +1,18 @@
 /**
  * React Query hooks for Nabeeh API.
  */
-import { keepPreviousData, useQuery } from "@tanstack/react-query";
+import { useEffect } from "react";
+import { keepPreviousData, useQuery, useQueryClient } from "@tanstack/react-query";
 import {
+  fetchDashboard,
   fetchSummary,
   fetchPorts,
   fetchPortDetails,
   fetchInspectorDetails,
   fetchInspectors,
   fetchHeatmap,
+  liveUpdatesUrl,
+  type DashboardResponse,
   type FilterParams,
   type NationwideSummary,
   type PortSummary,
@@ -16,6 +20,7 @@ import {
   type InspectorDetail,
   type InspectorsListResponse,
   type HeatmapData,
+  type LiveUpdate,
 } from "@/lib/api/client";
 
 const DEFAULTS = {
@@ -25,6 +30,45 @@ const DEFAULTS = {
   refetchOnWindowFocus: false,
 } as const;
 
+/** Summary, ports, heatmap and top inspectors from one request. */
+export function useDashboard(params: FilterParams & { inspectorsLimit?: number }) {
+  return useQuery<DashboardResponse>({
+    queryKey: ["dashboard", params],
+    queryFn: () => fetchDashboard(params),
+    ...DEFAULTS,
+  });
+}
+
+/**
+ * Patch the dashboard's ports in place from the server's live stream, so
+ * scores and counts move as events arrive instead of on the next poll.
+ */
+export function useLiveUpdates(params: FilterParams) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const rollingWindow = params.window;
+    if (!rollingWindow) return;
+    const source = new EventSource(liveUpdatesUrl({ ...params, window: rollingWindow }));
+    const apply = (message: MessageEvent<string>) => {
+      const update: LiveUpdate = JSON.parse(message.data);
+      const changed = new Map(update.ports.map((p) => [p.id, p]));
+      queryClient.setQueryData<DashboardResponse>(["dashboard", params], (old) =>
+        old && {
+          ...old,
+          ports: old.ports.map((p) => {
+            const next = changed.get(p.id);
+            return next ? { ...p, ...next } : p;
+          }),
+        }
+      );
+    };
+    source.addEventListener("snapshot", apply);
+    source.addEventListener("delta", apply);
+    return () => source.close();
+  }, [queryClient, params]);
+}
+
 export function useSummary(params: FilterParams) {
   return useQuery<NationwideSummary>({
     queryKey: ["summary", params],
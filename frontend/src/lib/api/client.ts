@@ -90,11 +90,38 @@ export interface HeatmapData {
 export interface InspectorsListResponse {
   total_unique_inspectors: number;
   inspectors: InspectorSummary[];
+  /** Pass back as `cursor` for the next page; null on the last page. */
+  next_cursor: string | null;
 }
 
+export interface DashboardResponse {
+  summary: NationwideSummary;
+  ports: PortSummary[];
+  heatmap: HeatmapData;
+  inspectors: InspectorsListResponse;
+}
+
+/** Port fields carried by /api/live snapshot and delta events. */
+export interface LivePortUpdate {
+  id: string;
+  risk_score: number;
+  incident_count: number;
+  risk_level: PortSummary["risk_level"];
+}
+
+export interface LiveUpdate {
+  data_version: number;
+  ports: LivePortUpdate[];
+}
+
+export type RollingWindow = "24h" | "7d" | "30d";
+
 export interface FilterParams {
-  from: string;
-  to: string;
+  /** Explicit range; ignored by the server when `window` is set. */
+  from?: string;
+  to?: string;
+  /** Rolling window snapped server-side, so repeated polls share cache entries. */
+  window?: RollingWindow;
   violationType?: string;
   severity?: string;
   portId?: string;
@@ -123,6 +150,34 @@ function buildUrl(endpoint: string, params: Record<string, string | undefined>):
   return url.toString();
 }
 
+/**
+ * Get summary, ports, heatmap and top inspectors in one request.
+ */
+export async function fetchDashboard(
+  params: FilterParams & { inspectorsLimit?: number }
+): Promise<DashboardResponse> {
+  const url = buildUrl("/api/dashboard", {
+    from: params.from,
+    to: params.to,
+    window: params.window,
+    violationType: params.violationType,
+    severity: params.severity,
+    inspectors_limit: params.inspectorsLimit?.toString(),
+  });
+  return fetchJson<DashboardResponse>(url);
+}
+
+/**
+ * URL of the Server-Sent Events stream of per-port updates (rolling windows only).
+ */
+export function liveUpdatesUrl(params: FilterParams & { window: RollingWindow }): string {
+  return buildUrl("/api/live", {
+    window: params.window,
+    violationType: params.violationType,
+    severity: params.severity,
+  });
+}
+
 /**
  * Get nationwide summary with KPI metrics.
  */
@@ -130,6 +185,7 @@ export async function fetchSummary(params: FilterParams): Promise<NationwideSumm
   const url = buildUrl("/api/summary", {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
   });
@@ -143,6 +199,7 @@ export async function fetchPorts(params: FilterParams): Promise<PortSummary[]> {
   const url = buildUrl("/api/ports", {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
   });
@@ -159,6 +216,7 @@ export async function fetchPortDetails(
   const url = buildUrl(`/api/ports/${portId}/details`, {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
   });
@@ -175,6 +233,7 @@ export async function fetchInspectorDetails(
   const url = buildUrl(`/api/inspectors/${inspectorId}`, {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
     port_id: params.portId,
@@ -186,15 +245,17 @@ export async function fetchInspectorDetails(
  * Get list of inspectors with incidents.
  */
 export async function fetchInspectors(
-  params: FilterParams & { limit?: number }
+  params: FilterParams & { limit?: number; cursor?: string }
 ): Promise<InspectorsListResponse> {
   const url = buildUrl("/api/inspectors", {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
     port_id: params.portId,
     limit: params.limit?.toString(),
+    cursor: params.cursor,
   });
   return fetchJson<InspectorsListResponse>(url);
 }
@@ -206,6 +267,7 @@ export async function fetchHeatmap(params: FilterParams): Promise<HeatmapData> {
   const url = buildUrl("/api/heatmap", {
     from: params.from,
     to: params.to,
+    window: params.window,
     violationType: params.violationType,
     severity: params.severity,
   });
@@ -231,13 +293,15 @@ export async function fetchIncidents(
   portId: string,
   from: string,
   to: string,
-  limit: number = 50
-): Promise<{ incidents: Incident[] }> {
+  limit: number = 50,
+  cursor?: string
+): Promise<{ incidents: Incident[]; next_cursor: string | null }> {
   const url = buildUrl("/api/incidents", {
     port_id: portId,
     from,
     to,
     limit: limit.toString(),
+    cursor,
   });
-  return fetchJson<{ incidents: Incident[] }>(url);
+  return fetchJson<{ incidents: Incident[]; next_cursor: string | null }>(url);
 }